@@ -0,0 +1,91 @@
+# bench_compact.py
+# noaa_weather_hourly
+# Compares the default float64 processing with -compact (float32 values and
+# categorical 'STATION') on a synthetic multi-year LCD v1 file (see
+# synthetic_lcd.py):  peak memory (tracemalloc) and wall time of process_lcd()
+# in memory and in chunks, plus the numeric drift of compact values against
+# float64 - the maximum absolute difference of the interpolated hourly values
+# (before rounding) and the share of output values that differ after rounding
+# to 2 decimal places.
+# Usage:  python benchmarks/bench_compact.py [-years 10] [-frequency H]
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+# the package is imported from this repository (no install or PYTHONPATH needed)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from noaa_weather_hourly.pipeline import *
+from synthetic_lcd import write_synthetic_lcd
+
+
+def measure(files, **process_kwargs):
+    """Returns tuple (df_out, seconds, peak_mb) of process_lcd(files,
+    **process_kwargs).  Peak memory is measured in a separate traced run."""
+    time_start = time.perf_counter()
+    df_out, report = process_lcd(files, **process_kwargs)
+    seconds = time.perf_counter() - time_start
+    tracemalloc.start()
+    process_lcd(files, **process_kwargs)
+    peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+    return df_out, seconds, peak_mb
+
+
+def value_drift(df, df_reference):
+    """Returns DataFrame of absolute differences of df to df_reference.  Columns
+    with a 'circular_mean' reducer (degrees) use the angular difference, so
+    that 359.99 and 0.0 differ by 0.01 rather than 359.99."""
+    diff = (df.astype(float) - df_reference.astype(float)).abs()
+    for col_ in df.columns:
+        # output columns have the 'Hourly' prefix removed
+        reducer_ = cols_reducer.get(col_, cols_reducer.get('Hourly' + col_))
+        if reducer_ == 'circular_mean':
+            diff[col_] = np.minimum(diff[col_] % 360, 360 - diff[col_] % 360)
+    return diff
+
+
+def hourly_values(files, compact=False):
+    """Returns interpolated hourly DataFrame of 'files' before rounding"""
+    ingest = ingest_lcd(files, compact=compact)
+    return interpolate_gaps(ingest['df_out'], max_records_to_interpolate)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares -compact with float64 processing.')
+    parser.add_argument('-years', type=int, default=10)
+    parser.add_argument('-frequency', default='H')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_temp:
+        files = write_synthetic_lcd(dir_temp, version=1, n_years=args.years, start_year=1990)
+        print(f'{args.years} year(s) LCD v1, {pathlib.Path(files[0]).stat().st_size / 1024**2:.0f} MB, '
+              f'-frequency {args.frequency}\n')
+        print(f'{"mode":<20}{"seconds":>10}{"peak MB":>10}')
+        outputs = {}
+        for chunked_ in [False, True]:
+            peaks_ = {}
+            for compact_ in [False, True]:
+                name_ = ('chunked ' if chunked_ else 'in memory ') + \
+                        ('compact' if compact_ else 'float64')
+                outputs[name_], seconds_, peaks_[compact_] = measure(
+                        files, freqstr=args.frequency, compact=compact_,
+                        chunksize=chunksize_rows if chunked_ else None)
+                print(f'{name_:<20}{seconds_:>10.2f}{peaks_[compact_]:>10.1f}')
+            print(f'{"peak memory ratio":<20}{peaks_[True] / peaks_[False]:>20.2f}\n')
+
+        df_64 = hourly_values(files)
+        df_32 = hourly_values(files, compact=True)
+        drift = value_drift(df_32, df_64).max()
+        print('Maximum absolute drift of interpolated hourly values (before rounding):')
+        print(drift.to_string(float_format=lambda x: f'{x:.2e}'))
+        out_64, out_32 = outputs['in memory float64'], outputs['in memory compact']
+        cols_ = out_64.select_dtypes('number').columns
+        diff = value_drift(out_32[cols_], out_64[cols_])
+        filter_nan = out_32[cols_].isna() != out_64[cols_].isna()
+        print(f'\nOutput values differing after rounding:  {int((diff > 0).sum().sum()):,} '
+              f'of {diff.size:,} ({(diff > 0).to_numpy().mean():.2%}), '
+              f'maximum {np.nanmax(diff.to_numpy()):.2f}, NaN mismatches {int(filter_nan.sum().sum())}')
@@ -0,0 +1,60 @@
+# bench_engine.py
+# noaa_weather_hourly
+# Compares the CSV engines of readers.py (-engine) on synthetic LCD files (see
+# synthetic_lcd.py):  a multi-year LCD v1 file and a multi-year set of LCD v2
+# year files.  Times csv read and numeric coercion (read_lcd_file(), best of
+# 'repeat' runs) for each engine.  That every engine returns the same
+# DataFrames and output as the 'default' engine is tested in
+# noaa_weather_hourly/tests/test_engine.py.
+# Usage:  python benchmarks/bench_engine.py [-years 10] [-repeat 3]
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+# the package is imported from this repository (no install or PYTHONPATH needed)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from noaa_weather_hourly.pipeline import *
+from synthetic_lcd import write_synthetic_lcd
+
+
+def read_files(files_usecols, engine):
+    """Returns list of coerced DataFrames of 'files_usecols' read with 'engine'"""
+    return [read_lcd_file(f_, cols_, engine=engine) for f_, cols_ in files_usecols.items()]
+
+
+def time_engine(files_usecols, engine, repeat=3):
+    """Returns best seconds of 'repeat' runs of read_files() with 'engine'"""
+    seconds = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        read_files(files_usecols, engine)
+        seconds.append(time.perf_counter() - time_start)
+    return min(seconds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares the LCD CSV engines.')
+    parser.add_argument('-years', type=int, default=10)
+    parser.add_argument('-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engines = [e_ for e_ in csv_engines if csv_engine_available(e_) == e_]
+    print(f'CSV engines available:  {", ".join(engines)}')
+    with tempfile.TemporaryDirectory() as dir_temp:
+        cases = {f'LCD v1, {args.years} years in 1 file' :
+                    write_synthetic_lcd(pathlib.Path(dir_temp) / 'v1', version=1,
+                                        n_years=args.years, start_year=1990),
+                 f'LCD v2, {args.years} year files' :
+                    write_synthetic_lcd(pathlib.Path(dir_temp) / 'v2', version=2,
+                                        n_years=args.years, start_year=1990)}
+        for name_, files_ in cases.items():
+            files_usecols = validate_files_usecols(read_files_columns(files_))
+            size_mb = sum(pathlib.Path(f_).stat().st_size for f_ in files_) / 1024**2
+            print(f'\n{name_}, {size_mb:.0f} MB')
+            print(f'{"engine":<10}{"seconds":>10}{"speedup":>10}')
+            seconds_default = None
+            for engine_ in engines:
+                seconds_ = time_engine(files_usecols, engine_, args.repeat)
+                seconds_default = seconds_default or seconds_
+                print(f'{engine_:<10}{seconds_:>10.2f}{seconds_default / seconds_:>10.2f}')
@@ -0,0 +1,81 @@
+# bench_import.py
+# noaa_weather_hourly
+# Guards the startup time of the command line script.  Help, argument errors,
+# the 'no files found' messages and -plan must be printed without importing
+# pandas, numpy or pyarrow (see discovery.py).  Each case is run in a fresh interpreter with
+# 'python -X importtime' and fails if any of 'modules_heavy' was imported.
+# The slowest imports and the total import time of each case are printed.
+# Usage:  python benchmarks/bench_import.py [-top 10]
+import argparse
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+
+dir_package = pathlib.Path(__file__).parents[1]
+modules_heavy = ['pandas', 'numpy', 'pyarrow']
+
+
+def import_times(argv, cwd):
+    """Returns list of (module, self microseconds, cumulative microseconds) of
+    every module imported by 'python -X importtime -m noaa_weather_hourly argv'
+    run in directory 'cwd'"""
+    env_ = dict(os.environ, PYTHONPATH=os.pathsep.join(
+                [str(dir_package)] + [os.environ.get('PYTHONPATH', '')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'noaa_weather_hourly']
+                            + argv, cwd=cwd, env=env_, capture_output=True, text=True)
+    times = []
+    for line_ in result.stderr.splitlines():
+        if not line_.startswith('import time:') or 'self [us]' in line_:
+            continue
+        self_, cumulative_, module_ = line_[len('import time:'):].split('|')
+        times.append((module_.strip(), int(self_), int(cumulative_)))
+    return times
+
+
+def check_case(name, argv, cwd, top=10):
+    """Returns True if running the script with 'argv' in 'cwd' did not import
+    any of 'modules_heavy'.  Prints the total and the 'top' slowest imports."""
+    times = import_times(argv, cwd)
+    heavy = sorted({module_.split('.')[0] for module_, self_, cumulative_ in times
+                    if module_.split('.')[0] in modules_heavy})
+    total_ms = sum(self_ for module_, self_, cumulative_ in times) / 1000
+    print(f'\n{name}:  {len(times)} modules imported in {total_ms:.1f} ms  '
+          + ('FAIL, imported ' + ', '.join(heavy) if heavy else 'OK'))
+    for module_, self_, cumulative_ in sorted(times, key=lambda x: -x[1])[:top]:
+        print(f'{module_:<50}{self_ / 1000:>10.1f} ms')
+    return len(heavy) < 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Checks that the command line '
+                                     'script starts without importing pandas or numpy.')
+    parser.add_argument('-top', type=int, default=10, help='Number of slowest imports to print')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_temp:
+        dir_empty = pathlib.Path(dir_temp) / 'empty'
+        dir_empty.mkdir()
+        # a directory with .csv files that are not LCD files
+        dir_no_lcd = pathlib.Path(dir_temp) / 'no_lcd'
+        dir_no_lcd.mkdir()
+        (dir_no_lcd / 'notes.csv').write_text('a,b\n1,2\n')
+        # a directory with an LCD file, for -plan
+        dir_lcd = pathlib.Path(dir_temp) / 'lcd'
+        dir_lcd.mkdir()
+        shutil.copy(dir_package / 'noaa_weather_hourly' / 'data' / '3876540.csv', dir_lcd)
+        cases = {'help (-h)' : (['-h'], dir_empty),
+                 'argument error' : (['-max_records_to_interpolate', 'x'], dir_empty),
+                 'no CSV files found' : ([], dir_empty),
+                 'no LCD files found' : ([], dir_no_lcd),
+                 'invalid -filename' : (['-filename', 'missing.csv'], dir_empty),
+                 # the output format is only checked once there is output to write
+                 'no LCD files found -format parquet' : (['-format', 'parquet'], dir_no_lcd),
+                 '-plan -format parquet' : (['-plan', '-format', 'parquet'], dir_lcd)}
+        passed = [check_case(name_, argv_, cwd_, args.top)
+                  for name_, (argv_, cwd_) in cases.items()]
+    print(f'\n{sum(passed)} of {len(passed)} cases started without importing '
+          f'{", ".join(modules_heavy)}')
+    sys.exit(0 if all(passed) else 1)
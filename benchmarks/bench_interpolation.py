@@ -0,0 +1,82 @@
+# bench_interpolation.py
+# noaa_weather_hourly
+# Compares the gap-aware interpolation of gaps.py (interpolate_short_gaps())
+# with DataFrame.interpolate(method='time', limit=) on a synthetic hourly
+# frame of 'years' years and 'columns' columns with random gaps of 1 to
+# 'max_gap' records.  Times both (best of 'repeat' runs) and checks that every
+# value filled by interpolate_short_gaps() is identical to pandas and that the
+# only values pandas fills and gaps.py does not are in gaps longer than
+# 'max_records_to_interpolate'.  Exits with status 1 if a check fails.
+# Usage:  python benchmarks/bench_interpolation.py [-years 30] [-columns 15]
+import argparse
+import pathlib
+import sys
+import time
+import numpy as np
+import pandas as pd
+# the package is imported from this repository (no install or PYTHONPATH needed)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from noaa_weather_hourly.gaps import interpolate_short_gaps
+
+
+def synthetic_hourly(years, columns, max_gap, seed=0):
+    """Returns hourly DataFrame of random values with random gaps of NaN values
+    of 1 to 'max_gap' records in every column"""
+    rng = np.random.default_rng(seed)
+    n_rows = 24 * 365 * years
+    values = rng.normal(size=(n_rows, columns)) * 10
+    # about 1 gap per 5 days per column
+    for _ in range(n_rows * columns // 120):
+        start_, length_ = rng.integers(n_rows), rng.integers(1, max_gap + 1)
+        values[start_ : start_ + length_, rng.integers(columns)] = np.nan
+    return pd.DataFrame(values, columns=[f'Hourly{i_}' for i_ in range(columns)],
+                        index=pd.date_range('1990-01-01', periods=n_rows, freq='H'))
+
+
+def best_seconds(func, repeat=3):
+    """Returns tuple (best seconds of 'repeat' runs of func(), last result)"""
+    seconds = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - time_start)
+    return min(seconds), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares gap-aware interpolation with pandas.')
+    parser.add_argument('-years', type=int, default=30)
+    parser.add_argument('-columns', type=int, default=15)
+    parser.add_argument('-max_gap', type=int, default=72)
+    parser.add_argument('-max_records_to_interpolate', type=int, default=24)
+    parser.add_argument('-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_hourly(args.years, args.columns, args.max_gap)
+    limit = args.max_records_to_interpolate
+    seconds_pandas, df_pandas = best_seconds(
+            lambda: df.interpolate(method='time', limit=limit), args.repeat)
+    seconds_gaps, (df_gaps_filled, df_gaps) = best_seconds(
+            lambda: interpolate_short_gaps(df, limit), args.repeat)
+    print(f'{args.years} years x {args.columns} columns ({df.size:,} values), '
+          f'{len(df_gaps):,} gaps, max_records_to_interpolate {limit}\n')
+    print(f'{"method":<24}{"seconds":>10}{"speedup":>10}')
+    print(f'{"pandas interpolate":<24}{seconds_pandas:>10.3f}{1:>10.2f}')
+    print(f'{"interpolate_short_gaps":<24}{seconds_gaps:>10.3f}'
+          f'{seconds_pandas / seconds_gaps:>10.2f}\n')
+
+    filter_filled = df.isna() & df_gaps_filled.notna()
+    same_ = (df_gaps_filled[filter_filled].fillna(0) == df_pandas[filter_filled].fillna(0))\
+                .all().all()
+    # values filled by pandas only must be in gaps longer than the limit
+    filter_long = pd.DataFrame(False, index=df.index, columns=df.columns)
+    for gap_ in df_gaps.loc[~df_gaps['interpolated']].itertuples():
+        filter_long.loc[gap_.start : gap_.end, gap_.column] = True
+    filter_pandas_only = df_pandas.notna() & df_gaps_filled.isna()
+    long_only_ = not (filter_pandas_only & ~filter_long).any().any()
+    print(f'Filled values identical to pandas:  {"yes" if same_ else "NO"} '
+          f'({int(filter_filled.sum().sum()):,} values)')
+    print(f'Values filled by pandas in gaps longer than {limit} records and left '
+          f'empty:  {int(filter_pandas_only.sum().sum()):,} '
+          f'({"all in long gaps" if long_only_ else "NOT all in long gaps"})')
+    sys.exit(0 if same_ and long_only_ else 1)
@@ -0,0 +1,56 @@
+# bench_parsing.py
+# noaa_weather_hourly
+# Compares the single-pass parse_lcd_values() with the previous per-column
+# pd.to_numeric() coercion on a multi-year LCD v1 file created by repeating
+# the bundled sample file with shifted dates.
+# Usage:  python benchmarks/bench_parsing.py [n_years]
+import pathlib
+import sys
+import tempfile
+import timeit
+import pandas as pd
+# the package is imported from this repository (no install or PYTHONPATH needed)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from noaa_weather_hourly.config import cols_noaa_processed, cols_date_station, cols_sunrise_sunset
+from noaa_weather_hourly.parsing import parse_lcd_values
+
+dir_data = pathlib.Path(__file__).parents[1] / 'noaa_weather_hourly' / 'data'
+
+
+def coerce_numeric_per_column(df, cols):
+    """Previous coercion - one pd.to_numeric() pass per column"""
+    df = df.copy()
+    for col_ in cols:
+        df[col_] = pd.to_numeric(df[col_], errors='coerce')
+        try:
+            df[col_] = df[col_].astype(float)
+        except:
+            pass
+    return df
+
+
+def multi_year_file(path, n_years):
+    """Saves the bundled v1 sample repeated 'n_years' times (8 repeats per year,
+    dates shifted by 7 weeks) to 'path'"""
+    df = pd.read_csv(dir_data / '3876540.csv', parse_dates=['DATE'], low_memory=False)
+    dfs = []
+    for n_ in range(n_years * 8):
+        df_ = df.copy()
+        df_['DATE'] = df_['DATE'] + pd.Timedelta(weeks=7 * n_)
+        dfs.append(df_)
+    pd.concat(dfs).to_csv(path, index=False)
+
+
+if __name__ == '__main__':
+    n_years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as dir_:
+        path_ = pathlib.Path(dir_) / '3876540.csv'
+        multi_year_file(path_, n_years)
+        df = pd.read_csv(path_, usecols=lambda c: c in cols_noaa_processed,
+                         parse_dates=['DATE'], index_col='DATE', low_memory=False)
+    cols = df.columns.difference(cols_sunrise_sunset + cols_date_station)
+    print(f'{n_years} years, {df.shape[0]:,} records, {len(cols)} columns')
+    for name_, func_ in [('per-column pd.to_numeric', coerce_numeric_per_column),
+                         ('parse_lcd_values', parse_lcd_values)]:
+        seconds = min(timeit.repeat(lambda: func_(df, cols), number=1, repeat=5))
+        print(f'{name_:<28} {seconds:.3f} s')
@@ -0,0 +1,170 @@
+# bench_pipeline.py
+# noaa_weather_hourly
+# Times and memory-profiles each stage of the processing pipeline on
+# synthetic LCD v2 files (see synthetic_lcd.py) of 1, 10 and 30 years.
+# Wall time is the best of 'repeat' runs.  Peak memory is measured in a
+# separate run with tracemalloc (which slows the run down) as the peak of
+# memory allocated during the stage.  Results are saved as JSON to
+# 'benchmarks/results' and can be compared with a previous results file.
+# Usage (Python 3.9+):
+# python benchmarks/bench_pipeline.py [-years 1 10 30] [-compare FILE]
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+# the package is imported from this repository (no install or PYTHONPATH needed)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from noaa_weather_hourly.pipeline import *
+from synthetic_lcd import write_synthetic_lcd
+
+dir_results = pathlib.Path(__file__).parent / 'results'
+stages = ['read', 'coerce', 'dedupe', 'sunrise_sunset', 'suspect_filter', 'resample',
+          'interpolate', 'stats', 'write']
+
+
+def n_rows(result):
+    """Returns count of rows of DataFrame 'result' or of the DataFrames in
+    list 'result'"""
+    if isinstance(result, list):
+        return sum(n_rows(r_) for r_ in result)
+    return len(result) if hasattr(result, '__len__') else None
+
+
+def count_records(file):
+    """Returns count of records (lines after the header) in csv 'file'"""
+    with open(file, 'rb') as infile:
+        return sum(block_.count(b'\n') for block_ in iter(lambda: infile.read(1024**2), b'')) - 1
+
+
+def run_stage(measurements, stage, func, *args, trace_memory=False):
+    """Returns result of func(*args) after adding its wall time, peak memory
+    (if 'trace_memory') and rows out to dictionary 'measurements[stage]'"""
+    if trace_memory:
+        tracemalloc.reset_peak()
+        memory_start = tracemalloc.get_traced_memory()[0]
+    time_start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - time_start
+    measurement = measurements.setdefault(stage, {})
+    measurement['seconds'] = seconds
+    measurement['rows_out'] = n_rows(result)
+    if trace_memory:
+        measurement['peak_mb'] = (tracemalloc.get_traced_memory()[1] - memory_start) / 1024**2
+    return result
+
+
+def run_pipeline(files, dir_out, trace_memory=False):
+    """Returns dictionary of stage measurements after processing LCD 'files'
+    stage by stage as in process_lcd() (in memory, without the parse cache)"""
+    m_ = {}
+    kw_ = {'trace_memory' : trace_memory}
+    files_usecols = validate_files_usecols(read_files_columns(files))
+    dfs = run_stage(m_, 'read', lambda: [pd.read_csv(f_, usecols=cols_, parse_dates=['DATE'],
+                                                     index_col='DATE', low_memory=False)
+                                         for f_, cols_ in files_usecols.items()], **kw_)
+    dfs = run_stage(m_, 'coerce', lambda: [coerce_numeric(df_) for df_ in dfs], **kw_)
+
+    def dedupe():
+        df = merge_sorted_frames(dfs, file_ranks(list(files_usecols)))
+        df = split_precipitation(df).drop(columns=['STATION', 'REPORT_TYPE', 'SOURCE'],
+                                          errors='ignore')
+        return dedupe_timestamps(df)
+    df = run_stage(m_, 'dedupe', dedupe, **kw_)
+    col_date_values = run_stage(m_, 'sunrise_sunset', extract_sunrise_sunset, df, **kw_)
+    df = df.drop(columns=cols_sunrise_sunset, errors='ignore')
+    df = run_stage(m_, 'suspect_filter', filter_suspect_timestamps, df,
+                   pct_null_timestamp_max, **kw_)
+    df_out = run_stage(m_, 'resample', resample_hourly, df, **kw_)
+    df_out = run_stage(m_, 'interpolate', interpolate_gaps, df_out,
+                       max_records_to_interpolate, **kw_)
+
+    def stats():
+        stats_pre = frame_column_stats(merge_precipitation(df))
+        return stats_comparison(column_stats_frame(stats_pre), column_pct_null(stats_pre),
+                                df_out)
+    run_stage(m_, 'stats', stats, **kw_)
+    df_out = add_sunrise_sunset(df_out.round(2), col_date_values)
+    run_stage(m_, 'write', write_output, df_out, pathlib.Path(dir_out) / 'out.csv', **kw_)
+    # rows of results that are not DataFrames
+    m_['sunrise_sunset']['rows_out'] = sum(len(dates_) for dates_, values_ in
+                                           col_date_values.values())
+    m_['write']['rows_out'] = len(df_out)
+    m_['read']['rows_in'] = sum(count_records(f_) for f_ in files)
+    return m_
+
+
+def benchmark(n_years, dir_work, repeat=3):
+    """Returns dictionary of measurements of every stage for 'n_years' of
+    synthetic LCD v2 data:  best wall time of 'repeat' runs and peak memory"""
+    dir_lcd = pathlib.Path(dir_work) / f'lcd_{n_years}'
+    files = sorted(dir_lcd.glob('LCD_*.csv')) if dir_lcd.is_dir() else []
+    if len(files) != n_years:
+        files = write_synthetic_lcd(dir_lcd, version=2, n_years=n_years, start_year=1990)
+    runs = [run_pipeline(files, dir_work) for _ in range(repeat)]
+    tracemalloc.start()
+    run_memory = run_pipeline(files, dir_work, trace_memory=True)
+    tracemalloc.stop()
+    results = {}
+    for stage_ in stages:
+        results[stage_] = {'seconds' : round(min(r_[stage_]['seconds'] for r_ in runs), 4),
+                           'peak_mb' : round(run_memory[stage_]['peak_mb'], 1),
+                           'rows_out' : runs[0][stage_]['rows_out']}
+    results['read']['rows_in'] = runs[0]['read']['rows_in']
+    return results
+
+
+def print_results(results, results_previous=None):
+    """Prints table of stage 'results' by number of years, with the ratio to
+    'results_previous' seconds if provided"""
+    for years_, stages_ in results.items():
+        print(f'\n{years_} year(s), {stages_["read"]["rows_in"]:,} source records')
+        print(f'{"stage":<16}{"seconds":>10}{"peak MB":>10}{"rows out":>12}'
+              + (f'{"previous":>10}{"ratio":>8}' if results_previous else ''))
+        for stage_, m_ in stages_.items():
+            line_ = f'{stage_:<16}{m_["seconds"]:>10.3f}{m_["peak_mb"]:>10.1f}{m_["rows_out"]:>12,}'
+            previous_ = (results_previous or {}).get(years_, {}).get(stage_)
+            if previous_:
+                line_ += f'{previous_["seconds"]:>10.3f}' \
+                         f'{m_["seconds"] / max(previous_["seconds"], 1e-9):>8.2f}'
+            print(line_)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks each pipeline stage.')
+    parser.add_argument('-years', type=int, nargs='+', default=[1, 10, 30])
+    parser.add_argument('-repeat', type=int, default=3)
+    parser.add_argument('-dir_work', help='Directory to keep the synthetic LCD files '
+                                          'between runs (default is a temporary directory)')
+    parser.add_argument('-compare', help='Previous results JSON file to compare with')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_temp:
+        dir_work = pathlib.Path(args.dir_work or dir_temp)
+        results = {str(n_): benchmark(n_, dir_work, args.repeat) for n_ in args.years}
+    results_previous = None
+    if args.compare:
+        with open(args.compare) as infile:
+            results_previous = json.load(infile)['results']
+    print_results(results, results_previous)
+
+    time_now = datetime.datetime.now()
+    report = {'created' : time_now.isoformat(timespec='seconds'),
+              'python' : sys.version.split()[0],
+              'pandas' : pd.__version__,
+              'numpy' : np.__version__,
+              'platform' : platform.platform(),
+              'processor' : platform.processor() or platform.machine(),
+              'repeat' : args.repeat,
+              'results' : results}
+    dir_results.mkdir(exist_ok=True)
+    file_results = dir_results / f'bench_pipeline_{time_now:%Y%m%d_%H%M%S}.json'
+    with open(file_results, 'w') as outfile:
+        json.dump(report, outfile, indent=1)
+    print(f'\nResults saved to: {file_results.as_posix()}')
@@ -0,0 +1,48 @@
+# bench_read_workers.py
+# noaa_weather_hourly
+# Times reading (csv read and numeric coercion) and merging the LCD v2 year
+# files of a synthetic multi-year station (see synthetic_lcd.py) with
+# read_lcd_files() for a range of 'read_workers' process counts.  Reading
+# scales with the number of available CPU cores, not with the number of
+# workers, so counts above os.cpu_count() are not expected to be faster.
+# Usage:  python benchmarks/bench_read_workers.py [-years 30] [-workers 1 2 4 8]
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+# the package is imported from this repository (no install or PYTHONPATH needed)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from noaa_weather_hourly.pipeline import *
+from synthetic_lcd import write_synthetic_lcd
+
+
+def time_read(files_usecols, read_workers, repeat=3):
+    """Returns tuple (best seconds of 'repeat' runs, rows) of read_lcd_files()
+    of 'files_usecols' with 'read_workers' processes (without the parse cache)"""
+    seconds = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        df = read_lcd_files(files_usecols, read_workers=read_workers)
+        seconds.append(time.perf_counter() - time_start)
+    return min(seconds), len(df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Times concurrent reading of LCD year files.')
+    parser.add_argument('-years', type=int, default=30)
+    parser.add_argument('-workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_temp:
+        files = write_synthetic_lcd(dir_temp, version=2, n_years=args.years, start_year=1990)
+        files_usecols = validate_files_usecols(read_files_columns(files))
+        print(f'{args.years} LCD v2 year files, {os.cpu_count()} CPU(s)\n')
+        print(f'{"read_workers":<14}{"seconds":>10}{"speedup":>10}{"rows":>12}')
+        seconds_sequential = None
+        for workers_ in args.workers:
+            seconds_, rows_ = time_read(files_usecols, workers_, args.repeat)
+            seconds_sequential = seconds_sequential or seconds_
+            print(f'{workers_:<14}{seconds_:>10.2f}{seconds_sequential / seconds_:>10.2f}{rows_:>12,}')
@@ -0,0 +1,317 @@
+# synthetic_lcd.py
+# noaa_weather_hourly
+# Generator of realistic synthetic LCD source files of any length for
+# benchmarks.  The column layout is copied from the headers of the bundled
+# sample files (124 columns for LCD v1, 125 columns for LCD v2) and values
+# follow the formats of the samples:  imperial units in v1, metric units in
+# v2, FM-15 routine observations, FM-16 specials, 3-hourly FM-12 synoptic
+# records, daily SOD and monthly SOM summary records with Sunrise / Sunset.
+# Options control the number of years, the observation cadence, gaps,
+# flagged values ('0.06s', 'VRB', 'M', 'T'), 23:59 placeholder records and
+# duplicate records.
+# Usage:  python benchmarks/synthetic_lcd.py DIR_OUT [-version 2] [-years 10]
+import argparse
+import csv
+import pathlib
+import numpy as np
+import pandas as pd
+
+dir_data = pathlib.Path(__file__).parents[1] / 'noaa_weather_hourly' / 'data'
+# bundled sample files - source of the header of each LCD version
+files_sample = {1 : dir_data / '3876540.csv', 2 : dir_data / 'LCD_USW00014939_2020.csv'}
+# station ids of the bundled samples, so that station details are found
+station_lcd = {1 : '72219013874', 2 : 'USW00014939'}
+station_v2_properties = {'LATITUDE' : '40.8508', 'LONGITUDE' : '-96.7475',
+                         'ELEVATION' : '362.7', 'NAME' : 'LINCOLN AIRPORT, NE US'}
+# record types in the order they appear for the same timestamp
+report_type_order = ['FM-12', 'FM-15', 'FM-16', 'SOD', 'SOM']
+# SOURCE code of each record type
+report_source = {1 : {'FM-12' : '4', 'FM-15' : '7', 'FM-16' : '7', 'SOD' : '6', 'SOM' : '6'},
+                 2 : {'FM-12' : '223', 'FM-15' : '343', 'FM-16' : '343', 'SOD' : '', 'SOM' : ''}}
+# columns reported by FM-12 synoptic records
+cols_synoptic = ['HourlyDewPointTemperature', 'HourlyDryBulbTemperature',
+                 'HourlyPressureChange', 'HourlyPressureTendency', 'HourlyRelativeHumidity',
+                 'HourlySeaLevelPressure', 'HourlyStationPressure', 'HourlyWindDirection',
+                 'HourlyWindSpeed']
+# columns that may carry a quality flag suffix and the suffixes used
+cols_flagged = ['HourlyAltimeterSetting', 'HourlyDewPointTemperature',
+                'HourlyDryBulbTemperature', 'HourlyPrecipitation', 'HourlyStationPressure',
+                'HourlyVisibility', 'HourlyWetBulbTemperature', 'HourlyWindSpeed']
+flag_suffixes = ['s', 'V', '*']
+
+
+def read_header(version):
+    """Returns list of column names (in file order, including repeated names)
+    of the bundled sample file of LCD 'version'"""
+    with open(files_sample[version], 'r', newline='') as infile:
+        return next(csv.reader(infile))
+
+
+def format_numbers(values, decimals):
+    """Returns object array of strings of float array 'values' rounded to
+    'decimals' places without trailing zeros (ie. '10', '29.92'), NaN is ''"""
+    rounded = np.round(values, decimals)
+    strs = np.char.mod('%g', np.where(np.isnan(rounded), 0, rounded)).astype(object)
+    strs[np.isnan(rounded)] = ''
+    return strs
+
+
+def smooth_noise(rng, n, scale, alpha=0.05):
+    """Returns slowly varying random series of length 'n' with standard
+    deviation of about 'scale'"""
+    noise = pd.Series(rng.normal(0, 1, n)).ewm(alpha=alpha).mean().to_numpy()
+    return noise / max(noise.std(), 1e-9) * scale
+
+
+def weather_values(times, rng):
+    """Returns dictionary of float arrays of metric weather values at numpy
+    datetime64 'times' with seasonal and daily cycles plus random weather"""
+    hours = (times - times.astype('datetime64[D]')).astype('timedelta64[m]').astype(float) / 60
+    day_of_year = (times.astype('datetime64[D]') - times.astype('datetime64[Y]')).astype(float)
+    n = len(times)
+    season = -np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    daily = np.sin(2 * np.pi * (hours - 9) / 24)
+    temp = 11 + 14 * season + 5 * daily + smooth_noise(rng, n, 4)
+    dew = temp - rng.gamma(2, 2, n)
+    rh = 100 * np.exp(17.625 * dew / (243.04 + dew)) / np.exp(17.625 * temp / (243.04 + temp))
+    station_pressure = 972 + smooth_noise(rng, n, 7, 0.02)
+    wind_speed = rng.gamma(2, 2, n)
+    wet = rng.random(n) < 0.06 + 0.04 * (smooth_noise(rng, n, 1) > 1)
+    precip = np.where(wet, rng.gamma(0.6, 1.2, n), 0.0)
+    return {'HourlyDryBulbTemperature' : temp,
+            'HourlyDewPointTemperature' : dew,
+            'HourlyWetBulbTemperature' : temp - (temp - dew) / 3,
+            'HourlyRelativeHumidity' : np.clip(rh, 5, 100),
+            'HourlyStationPressure' : station_pressure,
+            'HourlyAltimeterSetting' : station_pressure + 43.5,
+            'HourlySeaLevelPressure' : station_pressure + 44.1,
+            'HourlyPressureChange' : np.round(np.diff(station_pressure, prepend=station_pressure[0]) * 3, 1),
+            'HourlyPressureTendency' : rng.integers(0, 9, n).astype(float),
+            'HourlyWindSpeed' : np.where(wind_speed < 0.8, 0, wind_speed),
+            'HourlyWindDirection' : np.where(wind_speed < 0.8, 0,
+                                             np.round(rng.uniform(10, 360, n), -1)),
+            'HourlyWindGustSpeed' : np.where(wind_speed > 7, wind_speed * 1.6, np.nan),
+            'HourlyPrecipitation' : precip,
+            'HourlyVisibility' : np.where(wet, rng.uniform(1, 14, n), 16.093),
+            'wet' : wet}
+
+
+def values_text(values, version):
+    """Returns dictionary of object arrays of LCD text values of metric
+    'values' (see weather_values()) in the units of LCD 'version'"""
+    if version == 1:
+        # imperial units, temperatures are whole degrees F
+        temp_f = lambda x_ : format_numbers(x_ * 9 / 5 + 32, 0)
+        text = {'HourlyDryBulbTemperature' : temp_f(values['HourlyDryBulbTemperature']),
+                'HourlyDewPointTemperature' : temp_f(values['HourlyDewPointTemperature']),
+                'HourlyWetBulbTemperature' : temp_f(values['HourlyWetBulbTemperature'])}
+        for col_ in ['HourlyStationPressure', 'HourlyAltimeterSetting', 'HourlySeaLevelPressure']:
+            text[col_] = format_numbers(values[col_] * 0.02953, 2)
+        text['HourlyPressureChange'] = format_numbers(values['HourlyPressureChange'] * 0.02953, 2)
+        for col_ in ['HourlyWindSpeed', 'HourlyWindGustSpeed']:
+            text[col_] = format_numbers(values[col_] * 2.237, 0)
+        text['HourlyPrecipitation'] = format_numbers(values['HourlyPrecipitation'] / 25.4, 2)
+        text['HourlyVisibility'] = format_numbers(values['HourlyVisibility'] / 1.609, 2)
+    else:
+        text = {col_ : format_numbers(values[col_], 1) for col_ in
+                ['HourlyDryBulbTemperature', 'HourlyDewPointTemperature',
+                 'HourlyWetBulbTemperature', 'HourlyStationPressure', 'HourlyAltimeterSetting',
+                 'HourlySeaLevelPressure', 'HourlyPressureChange', 'HourlyWindSpeed',
+                 'HourlyWindGustSpeed', 'HourlyPrecipitation']}
+        text['HourlyVisibility'] = format_numbers(values['HourlyVisibility'], 3)
+    text['HourlyRelativeHumidity'] = format_numbers(values['HourlyRelativeHumidity'], 0)
+    text['HourlyPressureTendency'] = format_numbers(values['HourlyPressureTendency'], 0)
+    text['HourlyWindDirection'] = format_numbers(values['HourlyWindDirection'], 0)
+    wet = values['wet']
+    text['HourlyPresentWeatherType'] = np.where(wet, '-RA:02 |RA |RA', '').astype(object)
+    text['HourlySkyConditions'] = np.where(wet, 'OVC:08 1.22', 'CLR:00').astype(object)
+    return text
+
+
+def add_flags(text, rng, pct_flagged):
+    """Adds LCD value qualifiers to about 'pct_flagged' of the values of text
+    dictionary 'text':  suffixes 's', 'V', '*', missing 'M', variable wind
+    direction 'VRB' and trace precipitation 'T'"""
+    for col_ in cols_flagged:
+        values_ = text[col_]
+        idx_flag = np.flatnonzero((rng.random(len(values_)) < pct_flagged) & (values_ != ''))
+        suffix = rng.choice(flag_suffixes + [None], len(idx_flag))
+        for idx_, suffix_ in zip(idx_flag, suffix):
+            values_[idx_] = 'M' if suffix_ is None else values_[idx_] + suffix_
+    direction = text['HourlyWindDirection']
+    direction[rng.random(len(direction)) < pct_flagged] = 'VRB'
+    precip = text['HourlyPrecipitation']
+    precip[(rng.random(len(precip)) < pct_flagged * 5) & (precip == '0')] = 'T'
+
+
+def gap_mask(n, rng, pct_gaps, gap_records_max):
+    """Returns boolean array of length 'n' that is True for about 'pct_gaps'
+    of the records, in gaps of 1 to 'gap_records_max' consecutive records"""
+    if pct_gaps <= 0 or n < 1:
+        return np.zeros(n, dtype=bool)
+    n_gaps = max(1, int(pct_gaps * n / ((1 + gap_records_max) / 2)))
+    starts = rng.integers(0, n, n_gaps)
+    ends = np.minimum(starts + rng.integers(1, gap_records_max + 1, n_gaps), n)
+    depth = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(depth, starts, 1)
+    np.add.at(depth, ends, -1)
+    return np.cumsum(depth)[:n] > 0
+
+
+def sunrise_sunset_hhmm(dates):
+    """Returns tuple of int arrays (sunrise, sunset) in HHMM format for numpy
+    datetime64[D] 'dates' with a simple seasonal cycle"""
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(float)
+    half_day = 6.1 + 1.3 * -np.cos(2 * np.pi * (day_of_year - 10) / 365.25)
+    minutes_rise = np.round((12.3 - half_day) * 60).astype(int)
+    minutes_set = np.round((12.3 + half_day) * 60).astype(int)
+    return (minutes_rise // 60 * 100 + minutes_rise % 60,
+            minutes_set // 60 * 100 + minutes_set % 60)
+
+
+def year_records(year, version, header, rng, cadence_minutes=60, pct_gaps=0.01,
+                 gap_hours_max=48, pct_flagged=0.002, placeholder_2359=None,
+                 pct_duplicates=0.002, pct_specials=0.2):
+    """Returns 2-D object array of the text records (rows in file order, columns
+    of 'header') of a single calendar 'year' of synthetic LCD 'version' data"""
+    placeholder_2359 = version == 1 if placeholder_2359 is None else placeholder_2359
+    start = np.datetime64(f'{year}-01-01T00:00')
+    end = np.datetime64(f'{year + 1}-01-01T00:00')
+    # routine observations, hourly METAR reports are issued at minute 53
+    offset = np.timedelta64(53 if cadence_minutes == 60 else 0, 'm')
+    times = np.arange(start + offset, end, np.timedelta64(cadence_minutes, 'm'))
+    times = times[~gap_mask(len(times), rng, pct_gaps,
+                            max(1, gap_hours_max * 60 // cadence_minutes))]
+    types = np.full(len(times), 'FM-15', dtype=object)
+    # specials - extra observations at random minutes within the hour
+    idx_special = np.flatnonzero(rng.random(len(times)) < pct_specials)
+    times_special = times[idx_special] + rng.integers(5, 50, len(idx_special)).astype('timedelta64[m]')
+    # synoptic records every 3 hours on the hour
+    times_synoptic = np.arange(start, end, np.timedelta64(3, 'h'))
+    times_synoptic = times_synoptic[~gap_mask(len(times_synoptic), rng, pct_gaps,
+                                              max(1, gap_hours_max // 3))]
+    times = np.concatenate([times, times_special, times_synoptic])
+    types = np.concatenate([types, np.full(len(times_special), 'FM-16', dtype=object),
+                            np.full(len(times_synoptic), 'FM-12', dtype=object)])
+    # daily (SOD) and monthly (SOM) summaries, at 23:59 (v1) or midnight (v2)
+    dates = np.arange(np.datetime64(f'{year}-01-01'), np.datetime64(f'{year + 1}-01-01'))
+    months = np.arange(np.datetime64(f'{year}-01'), np.datetime64(f'{year + 1}-01'))
+    time_summary = np.timedelta64(23 * 60 + 59 if placeholder_2359 else 0, 'm')
+    times_sod = dates.astype('datetime64[m]') + time_summary
+    if placeholder_2359:
+        times_som = (months + 1).astype('datetime64[D]').astype('datetime64[m]') - \
+                    np.timedelta64(1, 'm')
+    else:
+        times_som = months.astype('datetime64[D]').astype('datetime64[m]')
+    n_obs = len(times)
+    times = np.concatenate([times, times_sod, times_som])
+    types = np.concatenate([types, np.full(len(times_sod), 'SOD', dtype=object),
+                            np.full(len(times_som), 'SOM', dtype=object)])
+    type_rank = np.array([report_type_order.index(t_) for t_ in types])
+    order = np.lexsort((type_rank, times))
+    times, types = times[order], types[order]
+    filter_obs = order < n_obs
+
+    n_rows = len(times)
+    records = np.full((n_rows, len(header)), '', dtype=object)
+    position = {}
+    for idx_, col_ in enumerate(header):
+        position.setdefault(col_, []).append(idx_)
+
+    def set_column(col_, values_):
+        # v1 repeats some column names (ie. 'REPORT_TYPE'), set every copy
+        for idx_ in position.get(col_, []):
+            records[:, idx_] = values_
+
+    set_column('STATION', station_lcd[version])
+    set_column('DATE', np.datetime_as_string(times, unit='s'))
+    set_column('REPORT_TYPE', types if version == 2 else
+                              np.array([f'{t_:<5}' if t_ in ('SOD', 'SOM') else t_
+                                        for t_ in types], dtype=object))
+    set_column('SOURCE', np.array([report_source[version][t_] for t_ in types], dtype=object))
+    if version == 2:
+        for col_, value_ in station_v2_properties.items():
+            set_column(col_, value_)
+
+    # hourly observations
+    text = values_text(weather_values(times[filter_obs], rng), version)
+    add_flags(text, rng, pct_flagged)
+    filter_synoptic = types[filter_obs] == 'FM-12'
+    for col_, values_ in text.items():
+        if col_ not in cols_synoptic:
+            values_[filter_synoptic] = ''
+        column_ = np.full(n_rows, '', dtype=object)
+        column_[filter_obs] = values_
+        set_column(col_, column_)
+
+    # daily summaries with sunrise and sunset
+    filter_sod = types == 'SOD'
+    sunrise, sunset = sunrise_sunset_hhmm(times[filter_sod].astype('datetime64[D]'))
+    for col_, values_ in [('Sunrise', sunrise), ('Sunset', sunset)]:
+        column_ = np.full(n_rows, '', dtype=object)
+        column_[filter_sod] = values_.astype(str)
+        set_column(col_, column_)
+    for col_ in ['DailyAverageDryBulbTemperature', 'DailyMaximumDryBulbTemperature',
+                 'DailyMinimumDryBulbTemperature', 'DailyPrecipitation']:
+        column_ = np.full(n_rows, '', dtype=object)
+        column_[filter_sod] = format_numbers(rng.normal(10, 8, filter_sod.sum()), 1)
+        set_column(col_, column_)
+
+    # exact duplicate records
+    idx_duplicate = np.flatnonzero(rng.random(n_rows) < pct_duplicates)
+    if len(idx_duplicate) > 0:
+        idx_rows = np.sort(np.concatenate([np.arange(n_rows), idx_duplicate]))
+        records = records[idx_rows]
+    return records
+
+
+def write_synthetic_lcd(dir_out, version=2, n_years=1, start_year=2000, seed=0, **kwargs):
+    """Writes synthetic LCD files of 'n_years' calendar years starting with
+    'start_year' to 'dir_out' and returns the list of file paths.  LCD v2 has
+    one file per year ('LCD_<STATION>_<YEAR>.csv') and LCD v1 a single file.
+    'kwargs' are passed on to year_records() (cadence_minutes, pct_gaps,
+    gap_hours_max, pct_flagged, placeholder_2359, pct_duplicates, pct_specials)."""
+    dir_out = pathlib.Path(dir_out)
+    dir_out.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    header = read_header(version)
+    files = []
+    outfile = None
+    for year_ in range(start_year, start_year + n_years):
+        if version == 2 or outfile is None:
+            file_ = dir_out / (f'LCD_{station_lcd[2]}_{year_}.csv' if version == 2
+                               else f'{9000000 + n_years}.csv')
+            if outfile is not None:
+                outfile.close()
+            outfile = open(file_, 'w', newline='')
+            writer = csv.writer(outfile)
+            writer.writerow(header)
+            files.append(file_)
+        writer.writerows(year_records(year_, version, header, rng, **kwargs).tolist())
+    outfile.close()
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Writes synthetic LCD files for benchmarks.')
+    parser.add_argument('dir_out', help='Directory of the synthetic LCD files')
+    parser.add_argument('-version', type=int, choices=[1, 2], default=2)
+    parser.add_argument('-years', type=int, default=1)
+    parser.add_argument('-start_year', type=int, default=2000)
+    parser.add_argument('-cadence_minutes', type=int, default=60)
+    parser.add_argument('-pct_gaps', type=float, default=0.01)
+    parser.add_argument('-gap_hours_max', type=int, default=48)
+    parser.add_argument('-pct_flagged', type=float, default=0.002)
+    parser.add_argument('-pct_duplicates', type=float, default=0.002)
+    parser.add_argument('-placeholder_2359', type=int, choices=[0, 1],
+                        help='1: SOD / SOM summary records at 23:59 (default for v1), 0: at midnight (default for v2)')
+    parser.add_argument('-seed', type=int, default=0)
+    args = parser.parse_args()
+    files = write_synthetic_lcd(args.dir_out, args.version, args.years, args.start_year,
+                                args.seed, cadence_minutes=args.cadence_minutes,
+                                pct_gaps=args.pct_gaps, gap_hours_max=args.gap_hours_max,
+                                pct_flagged=args.pct_flagged,
+                                pct_duplicates=args.pct_duplicates,
+                                placeholder_2359=None if args.placeholder_2359 is None
+                                                 else bool(args.placeholder_2359))
+    print('\n'.join(f_.as_posix() for f_ in files))
@@ -5,6 +5,7 @@
 # This script parses the Integrated Surface Database Station History 'isd-history.txt' file and returns:<BR>
 # 1. .csv table containing the columns below
 # 2. 'isd history definitions' containing all non-tabular data  
+# 3. 'isd-history-index.json' compact station index used for station lookups by WBAN and CALL
 #     
 # The table is used to lookup station details from a USAF id number.  The 'isd history definitions' is saved as a .txt file.
 # 
@@ -31,6 +32,7 @@
 from pandas import DataFrame, to_datetime
 from urllib.request import urlopen
 from pathlib import Path
+from noaa_weather_hourly.stations import write_station_index
 
 # single source of input
 target_url = 'https://www.ncei.noaa.gov/pub/data/noaa/isd-history.txt'
@@ -131,5 +133,9 @@ df.dropna(subset = ['BEGIN','END'], how='all', inplace=True)
 # save as 'isd_history.csv' to cwd (this avoids overwriting existing in 'data' but 
 # requires manually moving the file(s) after completion)
 df.to_csv(dir_cwd / "isd-history.csv")
+
+# ### Create compact station index 'isd-history-index.json'
+# built from the saved .csv so that values match those read by pandas
+write_station_index(dir_cwd / "isd-history.csv", dir_cwd / "isd-history-index.json")
 # END
 
@@ -0,0 +1,127 @@
+# append.py
+# noaa_weather_hourly
+# Incremental update of an existing hourly output file.  LCD v2 data is
+# delivered as one file per calendar year, so a refresh usually adds a new year
+# file or replaces the file of the current (partial) year.  Only the LCD files
+# modified after the existing output file was saved are processed.  Their
+# hourly records replace the existing output over the same date range and
+# interpolation is re-run only over the new records plus a window of
+# 'max_records_to_interpolate' hours on either side of each seam.
+import pathlib
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+from .pipeline import *
+from .formats import read_output_file
+
+
+def read_processed_output(file_out):
+    """Returns df_out DataFrame of processed output file 'file_out' (see
+    write_output()) with a DatetimeIndex and 'Sunrise' / 'Sunset' timestamps"""
+    df_out = read_output_file(file_out)
+    for col_ in cols_sunrise_sunset:
+        if col_ in df_out.columns:
+            df_out[col_] = pd.to_datetime(df_out[col_]).astype('datetime64[s]')
+    return df_out
+
+
+def select_append_files(files, file_out):
+    """Returns list of the LCD 'files' that were modified after output file
+    'file_out' was saved (ie. a new year file or an updated current year)"""
+    mtime_out = pathlib.Path(file_out).stat().st_mtime_ns
+    return [pathlib.Path(f_) for f_ in files
+            if pathlib.Path(f_).stat().st_mtime_ns > mtime_out]
+
+
+def splice_hourly(df_existing, idx_no_source_data, df_new, max_records_to_interpolate):
+    """Returns hourly DataFrame of existing processed values 'df_existing' with
+    the hourly records of 'df_new' (before interpolation) replacing those from
+    the first to the last timestamp of df_new.  Interpolation is run only over
+    the new records and 'max_records_to_interpolate' hours either side of them.
+    Existing hours in that window without source data ('idx_no_source_data')
+    were estimated without the new records and are interpolated again."""
+    start_new, end_new = df_new.index[0], df_new.index[-1]
+    window = pd.Timedelta(hours=max_records_to_interpolate)
+    cols_ = df_existing.columns.tolist() + [col_ for col_ in df_new.columns
+                                            if col_ not in df_existing.columns]
+    df_existing = df_existing.copy()
+    filter_window = (df_existing.index >= start_new - window) & \
+                    (df_existing.index <= end_new + window) & \
+                    df_existing.index.isin(idx_no_source_data)
+    df_existing.loc[filter_window] = np.nan
+    df_spliced = pd.concat([df_existing.loc[df_existing.index < start_new],
+                            df_new,
+                            df_existing.loc[df_existing.index > end_new]])
+    df_spliced = df_spliced.reindex(columns=cols_).asfreq('H')
+    # a second window of existing values either side provides the values that
+    # gaps at the edges of the window are interpolated from
+    df_interpolated = interpolate_gaps(df_spliced.loc[start_new - 2 * window :
+                                                      end_new + 2 * window],
+                                       max_records_to_interpolate)
+    df_spliced.loc[start_new - window : end_new + window] = \
+            df_interpolated.loc[start_new - window : end_new + window]
+    return df_spliced
+
+
+def append_lcd(file_out, files, freqstr=freqstr,
+               max_records_to_interpolate=max_records_to_interpolate,
+               pct_null_timestamp_max=pct_null_timestamp_max, chunksize=None,
+               memory_limit_mb=None, use_cache=False, trace_value=trace_value,
+               compact=False, precedence=merge_precedence, read_workers=read_workers,
+               engine=csv_engine, stats=True):
+    """Returns tuple (df_out, report) updating existing hourly output file
+    'file_out' with the LCD 'files' of the same station that were modified
+    after file_out was saved.  Returns (None, None) if no file was modified.
+    'report' statistics (df_comp) describe the appended records only.  Other
+    arguments are as in process_lcd().
+    Example Usage:  df_out, report = append_lcd(file_out, files_lcd_input)"""
+    if freqstr != 'H':
+        raise ValueError(f'Append is only available for hourly output, not "{freqstr}"')
+    file_out = pathlib.Path(file_out)
+    df_existing = read_processed_output(file_out)
+    if (np.diff(df_existing.index.asi8) != ns_hour).any():
+        raise ValueError(f'{file_out.name} is not an hourly output file')
+    files_append = select_append_files(files, file_out)
+    if len(files_append) < 1:
+        return None, None
+    ingest = ingest_lcd(files_append, pct_null_timestamp_max, chunksize, memory_limit_mb,
+                        use_cache, trace_value, compact=compact, precedence=precedence,
+                        read_workers=read_workers, engine=engine, stats=stats)
+    # existing values with the source ('Hourly') column names
+    cols_existing = {remove_hourly_prefix(col_) : col_ for col_ in cols_data}
+    cols_extra = cols_sunrise_sunset + ['No source data']
+    df_values = df_existing.drop(columns=cols_extra, errors='ignore')\
+                            .rename(columns=cols_existing)
+    idx_no_source_data = df_existing.index[df_existing['No source data']]
+    df_out = splice_hourly(df_values, idx_no_source_data, ingest['df_out'],
+                           max_records_to_interpolate)
+    start_new, end_new = ingest['df_out'].index[0], ingest['df_out'].index[-1]
+    df_comp = stats_comparison(ingest['df_stats_pre'], ingest['df_pct_null_pre'],
+                               df_out.loc[start_new : end_new]) if stats else None
+    df_out = format_output(df_out, ingest)
+
+    # existing records outside of the appended date range keep their
+    # sunrise / sunset and 'No source data' values
+    idx_keep = df_existing.index[(df_existing.index < start_new) |
+                                 (df_existing.index > end_new)]
+    cols_keep = [col_ for col_ in cols_extra if col_ in df_existing.columns]
+    df_out.loc[idx_keep, cols_keep] = df_existing.loc[idx_keep, cols_keep]
+    # sunrise / sunset values are carried forward to following hours
+    for col_ in cols_sunrise_sunset:
+        df_out[col_] = df_out[col_].ffill()
+    # hours between the existing and the appended records have no source data
+    filter_between = ~df_out.index.isin(df_existing.index) & \
+                     ((df_out.index < start_new) | (df_out.index > end_new))
+    df_out.loc[filter_between, 'No source data'] = True
+
+    report = {'files_lcd_input' : files_append,
+              'station_lcd' : ingest['station_lcd'],
+              'station_details' : station_details_lookup(ingest['station_lcd']),
+              'start_str' : df_out.index[0].strftime('%Y-%m-%d'),
+              'end_str' : df_out.index[-1].strftime('%Y-%m-%d'),
+              'freqstr' : freqstr,
+              'n_records_raw' : ingest['n_records_raw'],
+              'n_hours_no_source_data' : int(df_out['No source data'].sum()),
+              'df_comp' : df_comp}
+    return df_out, report
@@ -0,0 +1,86 @@
+# batch.py
+# noaa_weather_hourly
+# Process every LCD station found in a directory on a pool of worker
+# processes.  Each LCD v1 file and each group of LCD v2 files sharing a
+# station id is processed independently with process_lcd() and written to
+# its own output file (one per frequency, see process_lcd_frequencies()).
+import concurrent.futures
+import pathlib
+import time
+import pandas as pd
+# import modules specific to this package
+from .config import *
+from .pipeline import *
+from .profiling import start_profile, stop_profile, profile_report, write_profile
+
+
+def new_summary(files):
+    """Returns summary dictionary (see process_station()) of the LCD 'files' of
+    a single station before it is processed"""
+    return {'files' : ', '.join(pathlib.Path(f_).name for f_ in files),
+            'station' : None, 'start' : None, 'end' : None,
+            'records' : None, 'file_out' : None, 'error' : None}
+
+
+def process_station(files, dir_out, process_kwargs, file_format=output_format,
+                    profile=False, gaps=False, freqstrs=None):
+    """Returns summary dictionary after processing and saving the LCD 'files'
+    of a single station to 'dir_out' in 'file_format'.  'process_kwargs' are
+    passed on to process_lcd().  If list 'freqstrs' is provided, an output
+    file is saved for each of its frequencies (see process_lcd_frequencies()),
+    otherwise for the 'freqstr' of 'process_kwargs'.  If 'profile', a -profile
+    JSON report is saved next to the (first) output file, and if 'gaps', the
+    -gaps table.  Errors are captured in the 'error' value rather than
+    raised so that one bad station does not halt a batch."""
+    time_start = time.perf_counter()
+    summary = new_summary(files)
+    try:
+        if profile:
+            start_profile()
+        freqstrs = [process_kwargs.get('freqstr', freqstr)] if freqstrs is None else freqstrs
+        outputs = process_lcd_frequencies(files, freqstrs, **{k_ : v_ for k_, v_ in
+                                          process_kwargs.items() if k_ != 'freqstr'})
+        # stations are processed concurrently, so the files of a station are
+        # written one after another
+        files_out = write_outputs([(df_, pathlib.Path(dir_out) /
+                                    output_file_name(report_, file_format))
+                                   for df_, report_ in outputs], write_workers=1)
+        file_out, report = files_out[0], outputs[0][1]
+        summary.update({'station' : report['station_details']['STATION NAME'],
+                        'start' : report['start_str'],
+                        'end' : report['end_str'],
+                        'records' : sum(len(df_) for df_, report_ in outputs),
+                        'file_out' : ', '.join(f_.name for f_ in files_out)})
+        if gaps:
+            write_gap_table(report['df_gaps'], gaps_file_name(file_out))
+        if profile:
+            write_profile(profile_report(stop_profile(), report, file_out),
+                          profile_file_name(file_out))
+    except Exception as e:
+        summary['error'] = f'{type(e).__name__}: {e}'
+    stop_profile()
+    summary['seconds'] = round(time.perf_counter() - time_start, 2)
+    return summary
+
+
+def process_batch(dir_source, dir_out, workers=None, file_format=output_format,
+                  profile=False, gaps=False, freqstrs=None, **process_kwargs):
+    """Returns 'df_summary' DataFrame with one row per station after processing
+    every LCD station found in 'dir_source' on a pool of 'workers' processes
+    (default is the number of CPUs).  Outputs are saved to 'dir_out' in
+    'file_format', with a -profile JSON report for each station if 'profile'
+    and a -gaps table for each station if 'gaps'.  If list 'freqstrs' is
+    provided, an output file is saved for each of its frequencies.
+    'process_kwargs' (ie. freqstr, max_records_to_interpolate) are passed on
+    to process_lcd()."""
+    station_files = group_station_files(discover_lcd_files(pathlib.Path(dir_source)))
+    summaries = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_station, files_, dir_out, process_kwargs,
+                                   file_format, profile, gaps, freqstrs) : key_
+                   for key_, files_ in station_files.items()}
+        for future_ in concurrent.futures.as_completed(futures):
+            summaries[futures[future_]] = future_.result()
+    df_summary = pd.DataFrame.from_dict(summaries, orient='index')
+    df_summary.index.name = 'key'
+    return df_summary.sort_index()
@@ -0,0 +1,200 @@
+# binning.py
+# noaa_weather_hourly
+# Grouped binning engine used to dedupe timestamps and to resample LCD records
+# in to hourly (or other fixed frequency) bins.  Bin codes are computed once
+# from the integer timestamps and every column is reduced in a single
+# vectorized pass over a 2-D NumPy array.  Each column has its own reducer
+# ('cols_reducer' in config.py):
+# 'mean' - average of values (default)
+# 'sum' - total of values (ie. 'HourlyPrecipitation')
+# 'max' - maximum of values (ie. 'HourlyWindGustSpeed')
+# 'circular_mean' - mean direction in degrees (ie. 'HourlyWindDirection'),
+#                   so that 350 and 10 average to 0 rather than 180
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+
+
+def float_dtype(df):
+    """Returns float32 if every column of DataFrame 'df' is float32 (see
+    -compact), otherwise float (float64).  Values are binned in this dtype."""
+    if df.shape[1] > 0 and (df.dtypes == np.float32).all():
+        return np.float32
+    return float
+
+
+def column_reducers(cols):
+    """Returns list of reducer names for columns 'cols' (default 'mean')"""
+    return [cols_reducer.get(col_, 'mean') for col_ in cols]
+
+
+def dedupe_reducers(cols):
+    """Returns list of reducer names for the records of a repeated timestamp of
+    columns 'cols':  column_reducers() except 'sum' columns, which are
+    averaged as every record of a timestamp reports the same period"""
+    return ['mean' if r_ == 'sum' else r_ for r_ in column_reducers(cols)]
+
+
+def is_fixed_frequency(freqstr):
+    """Returns True if 'freqstr' is a fixed length frequency (ie. 'H', '15T', 'D')
+    rather than a calendar frequency (ie. 'M', 'W', 'Q')"""
+    return isinstance(pd.tseries.frequencies.to_offset(freqstr), pd.offsets.Tick)
+
+
+def bin_codes(index, freqstr='H'):
+    """Returns tuple (codes, idx_bins) for sorted DatetimeIndex 'index' binned at
+    fixed frequency 'freqstr'.  'codes' is the int64 bin number of every
+    timestamp and 'idx_bins' is the complete DatetimeIndex of bin labels.  Bins
+    are aligned to midnight of the first day, as in pandas resample()."""
+    step = pd.Timedelta(pd.tseries.frequencies.to_offset(freqstr)).value
+    ns = index.asi8
+    origin = ns[0] - ns[0] % ns_day
+    start = origin + (ns[0] - origin) // step * step
+    codes = (ns - start) // step
+    idx_bins = pd.date_range(pd.Timestamp(start), periods=int(codes[-1]) + 1,
+                             freq=freqstr, name=index.name)
+    return codes, idx_bins
+
+
+def aggregate_sorted_bins(values, codes, reducers):
+    """Returns tuple (bins, aggregates) for 2-D float array 'values' whose rows
+    are assigned to non-decreasing bin 'codes'.  'bins' holds the codes of the
+    bins that contain rows and 'aggregates' is a dictionary of 2-D arrays with
+    one row per bin in 'bins':
+    'sum', 'count' - sum and count of non-NaN values of every column
+    'max' - maximum value of 'max' columns (NaN for other columns)
+    'sin', 'cos' - sum of sin/cos of 'circular_mean' columns (NaN for others)
+    Aggregates have the float dtype of 'values' (float64 or float32), except
+    'sin' and 'cos' which are float64 so that the mean direction of opposing
+    directions (which cancel out) does not depend on the dtype.
+    Aggregates of several arrays can be combined with combine_aggregates()."""
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    bins = codes[starts]
+    filter_valid = ~np.isnan(values)
+    # counts of a single bin fit in int32, half the temporary memory of int64
+    aggregates = {'sum' : np.add.reduceat(np.where(filter_valid, values, 0.0), starts, axis=0),
+                  'count' : np.add.reduceat(filter_valid.astype(np.int32), starts,
+                                            axis=0).astype(np.int64)}
+    reducers = np.array(reducers)
+    filter_max = reducers == 'max'
+    aggregates['max'] = np.full(aggregates['sum'].shape, np.nan, dtype=values.dtype)
+    if filter_max.any():
+        aggregates['max'][:, filter_max] = np.fmax.reduceat(values[:, filter_max], starts, axis=0)
+    filter_circular = reducers == 'circular_mean'
+    aggregates['sin'] = np.full(aggregates['sum'].shape, np.nan)
+    aggregates['cos'] = np.full(aggregates['sum'].shape, np.nan)
+    if filter_circular.any():
+        radians = np.deg2rad(values[:, filter_circular].astype(float))
+        filter_valid_circular = filter_valid[:, filter_circular]
+        aggregates['sin'][:, filter_circular] = np.add.reduceat(
+                    np.where(filter_valid_circular, np.sin(radians), 0.0), starts, axis=0)
+        aggregates['cos'][:, filter_circular] = np.add.reduceat(
+                    np.where(filter_valid_circular, np.cos(radians), 0.0), starts, axis=0)
+    return bins, aggregates
+
+
+def combine_aggregates(bins_aggregates):
+    """Returns tuple (bins, aggregates) combining the list of (bins, aggregates)
+    tuples returned by aggregate_sorted_bins(), ie. for the chunks of a file.
+    Bins that appear in more than one item are merged."""
+    bins = np.concatenate([bins_ for bins_, aggregates_ in bins_aggregates])
+    order = np.argsort(bins, kind='stable')
+    bins = bins[order]
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    aggregates = {}
+    for key_ in ['sum', 'count', 'max', 'sin', 'cos']:
+        values_ = np.concatenate([aggregates_[key_] for bins_, aggregates_ in
+                                  bins_aggregates], axis=0)[order]
+        ufunc_ = np.fmax if key_ == 'max' else np.add
+        aggregates[key_] = ufunc_.reduceat(values_, starts, axis=0)
+    return bins[starts], aggregates
+
+
+def finalize_aggregates(aggregates, reducers):
+    """Returns 2-D array of reduced values from 'aggregates' (see
+    aggregate_sorted_bins()) in the float dtype of the aggregates.  Bins without
+    any values are NaN."""
+    count = aggregates['count']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = np.where(count > 0, aggregates['sum'] / count, np.nan)
+    for idx_, reducer_ in enumerate(reducers):
+        if reducer_ == 'sum':
+            values[:, idx_] = np.where(count[:, idx_] > 0, aggregates['sum'][:, idx_], np.nan)
+        elif reducer_ == 'max':
+            values[:, idx_] = aggregates['max'][:, idx_]
+        elif reducer_ == 'circular_mean':
+            degrees = np.rad2deg(np.arctan2(aggregates['sin'][:, idx_],
+                                            aggregates['cos'][:, idx_])) % 360
+            values[:, idx_] = np.where(count[:, idx_] > 0, degrees, np.nan)
+    return values.astype(aggregates['sum'].dtype, copy=False)
+
+
+def reduce_bins(df, freqstr='H', reducers=None):
+    """Returns DataFrame of numeric DataFrame 'df' (sorted DatetimeIndex)
+    resampled to 'freqstr' with a complete DatetimeIndex.  Each column is
+    reduced with its reducer in 'reducers' (default column_reducers()).
+    Fixed frequencies are binned in a single pass with aggregate_sorted_bins(),
+    calendar frequencies (ie. 'M') use pandas resample() with the same reducers."""
+    reducers = column_reducers(df.columns) if reducers is None else list(reducers)
+    if not is_fixed_frequency(freqstr):
+        return resample_reducers(df, freqstr, reducers)
+    dtype_ = float_dtype(df)
+    codes, idx_bins = bin_codes(df.index, freqstr)
+    bins, aggregates = aggregate_sorted_bins(df.to_numpy(dtype=dtype_), codes, reducers)
+    values = np.full((len(idx_bins), df.shape[1]), np.nan, dtype=dtype_)
+    values[bins] = finalize_aggregates(aggregates, reducers)
+    return pd.DataFrame(values, index=idx_bins, columns=df.columns)
+
+
+def resample_reducers(df, freqstr, reducers):
+    """Returns df resampled to calendar frequency 'freqstr' with pandas
+    resample() using the column 'reducers' (see reduce_bins())"""
+    dfs = {}
+    for col_, reducer_ in zip(df.columns, reducers):
+        if reducer_ == 'sum':
+            dfs[col_] = df[col_].resample(freqstr).sum(min_count=1)
+        elif reducer_ == 'max':
+            dfs[col_] = df[col_].resample(freqstr).max()
+        elif reducer_ == 'circular_mean':
+            radians = np.deg2rad(df[col_])
+            degrees = np.rad2deg(np.arctan2(np.sin(radians).resample(freqstr).mean(),
+                                            np.cos(radians).resample(freqstr).mean())) % 360
+            dfs[col_] = degrees
+        else:
+            dfs[col_] = df[col_].resample(freqstr).mean()
+    return pd.concat(dfs, axis=1).astype(float_dtype(df))
+
+
+def dedupe_sorted_timestamps(df, reducers=None):
+    """Returns numeric DataFrame 'df' (sorted DatetimeIndex) with a single
+    record per timestamp.  Values of repeated timestamps are reduced (ignoring
+    NaN) with 'reducers' (default dedupe_reducers()), so that ie. wind
+    directions of 350 and 10 give 0 rather than 180.  df is returned unchanged
+    if all timestamps are unique."""
+    ns = df.index.asi8
+    filter_new = np.r_[True, ns[1:] != ns[:-1]]
+    if filter_new.all():
+        return df
+    codes = np.cumsum(filter_new) - 1
+    reducers = dedupe_reducers(df.columns) if reducers is None else list(reducers)
+    bins, aggregates = aggregate_sorted_bins(df.to_numpy(dtype=float_dtype(df)), codes,
+                                             reducers)
+    return pd.DataFrame(finalize_aggregates(aggregates, reducers),
+                        index=df.index[filter_new], columns=df.columns)
+
+
+def seconds_of_day(index):
+    """Returns int64 array of the second of the day (0 - 86399) of every
+    timestamp in DatetimeIndex 'index'"""
+    return index.asi8 % ns_day // 10**9
+
+
+def null_counts_by_code(values, codes, n_codes):
+    """Returns 2-D int64 array (n_codes, n_columns) with the count of NaN values
+    of 2-D float array 'values' for every integer code in 'codes'.  All columns
+    are counted with a single bincount by offsetting the codes of each column."""
+    n_rows, n_cols = values.shape
+    codes_2d = codes[:, None] + n_codes * np.arange(n_cols)
+    counts = np.bincount(codes_2d[np.isnan(values)], minlength=n_codes * n_cols)
+    return counts.reshape(n_cols, n_codes).T
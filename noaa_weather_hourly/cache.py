@@ -0,0 +1,126 @@
+# cache.py
+# noaa_weather_hourly
+# Persistent on-disk cache of parsed and coerced LCD file DataFrames.  Repeat
+# runs on the same source files (ie. with a different -frequency) load the
+# cached binary DataFrame instead of parsing the CSV again.  Cache entries are
+# keyed by file path, size and modified time (or file content) plus the
+# columns read from the file, so a modified source file is parsed again, and by
+# the installed package version (see package_version()) and cache format
+# version, so that entries written by another version are not read.  Entries are pickles, so the cache directory is created
+# readable by the current user only and entries owned by another user are
+# ignored.  The cache is only used with -cache (use_cache=True).
+import functools
+import hashlib
+import importlib.metadata
+import os
+import pathlib
+import pickle
+# import modules specific to this package
+from .config import *
+
+
+@functools.lru_cache(maxsize=None)
+def package_version():
+    """Returns the version of the installed noaa_weather_hourly package (from
+    its package metadata, the version of pyproject.toml / setup.py), or
+    'unknown' if the package is run from a source tree without installing it.
+    Cache entries of a source tree are kept apart by 'cache_format_version'."""
+    try:
+        return importlib.metadata.version('noaa_weather_hourly')
+    except importlib.metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def cache_dir():
+    """Returns pathlib directory of the parse cache.  The location can be set
+    with the 'NOAA_WEATHER_HOURLY_CACHE' environment variable, otherwise
+    '$XDG_CACHE_HOME/noaa_weather_hourly' or '~/.cache/noaa_weather_hourly'."""
+    if os.environ.get(env_cache_dir):
+        return pathlib.Path(os.environ[env_cache_dir])
+    dir_xdg = os.environ.get('XDG_CACHE_HOME')
+    dir_base = pathlib.Path(dir_xdg) if dir_xdg else pathlib.Path.home() / '.cache'
+    return dir_base / 'noaa_weather_hourly'
+
+
+def file_content_hash(file):
+    """Returns sha1 hex digest of the contents of 'file'"""
+    hash_ = hashlib.sha1()
+    with open(file, 'rb') as infile:
+        for block_ in iter(lambda: infile.read(1024**2), b''):
+            hash_.update(block_)
+    return hash_.hexdigest()
+
+
+def cache_key(file, cols_, key_extra='', hash_content=cache_key_content):
+    """Returns cache key for LCD 'file' read with columns 'cols_'.  The key
+    includes the resolved path and size of the file and either its modified
+    time or, if 'hash_content', a hash of its contents.  'key_extra' holds any
+    other parameters that change the parsed result (ie. the trace value)."""
+    file = pathlib.Path(file).resolve()
+    stat_ = file.stat()
+    version_ = file_content_hash(file) if hash_content else stat_.st_mtime_ns
+    key_ = '|'.join([package_version(), str(cache_format_version), file.as_posix(),
+                     str(stat_.st_size), str(version_), ','.join(sorted(cols_)),
+                     str(key_extra)])
+    return hashlib.sha1(key_.encode('utf-8')).hexdigest()
+
+
+def cache_read(file, cols_, key_extra=''):
+    """Returns cached DataFrame for 'file' and 'cols_', or None if there is no
+    valid cache entry.  Entries that are not owned by the current user are not
+    read.  A cache hit refreshes the entry's modified time, which is used as
+    'last used' time by cache_evict()."""
+    path_ = cache_dir() / f'{cache_key(file, cols_, key_extra)}.pkl'
+    if not path_.is_file():
+        return None
+    # os.getuid() is not available on Windows
+    if hasattr(os, 'getuid') and path_.stat().st_uid != os.getuid():
+        return None
+    # imported here so that clear_cache() does not import pandas
+    import pandas as pd
+    try:
+        df = pd.read_pickle(path_)
+        os.utime(path_)
+        return df
+    except Exception:
+        return None
+
+
+def cache_write(file, cols_, df, key_extra='', max_mb=cache_max_mb):
+    """Saves DataFrame 'df' to the cache for 'file' and 'cols_' and evicts least
+    recently used entries beyond 'max_mb' megabytes.  Failures to write (ie. a
+    read-only home directory) are ignored, the cache is only an optimization."""
+    dir_ = cache_dir()
+    try:
+        dir_.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path_ = dir_ / f'{cache_key(file, cols_, key_extra)}.pkl'
+        path_tmp = path_.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_pickle(path_tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path_tmp, path_)
+        cache_evict(max_mb)
+    except Exception:
+        pass
+
+
+def cache_evict(max_mb=cache_max_mb):
+    """Deletes least recently used cache entries until the cache is no larger
+    than 'max_mb' megabytes.  Returns the number of deleted entries."""
+    files_ = sorted([(f_, f_.stat()) for f_ in cache_dir().glob('*.pkl')],
+                    key=lambda x: x[1].st_mtime)
+    size_total = sum(stat_.st_size for f_, stat_ in files_)
+    n_deleted = 0
+    for f_, stat_ in files_:
+        if size_total <= max_mb * 1024**2:
+            break
+        f_.unlink(missing_ok=True)
+        size_total -= stat_.st_size
+        n_deleted += 1
+    return n_deleted
+
+
+def clear_cache():
+    """Deletes all cache entries and returns the number of deleted entries"""
+    files_ = list(cache_dir().glob('*.pkl')) + list(cache_dir().glob('*.tmp'))
+    for f_ in files_:
+        f_.unlink(missing_ok=True)
+    return len(files_)
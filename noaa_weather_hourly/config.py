@@ -21,11 +21,97 @@ version_pattern_lcd_input = {idx_ : v_ for idx_, v_ in enumerate(patterns_lcd_in
 # file naming conventions
 pattern_isd_history_file = r'isd-history.csv|ISD-HISTORY.CSV'
 file_isd_history = 'isd-history.csv'
+file_isd_history_index = 'isd-history-index.json'
+# WBAN placeholder used by stations without a WBAN id (non-USA locations)
+wban_missing = '99999'
 file_output_format = """{STATION_NAME} {start_str} to {end_str} {freqstr}.csv"""
+# output file formats (-format) and their file extensions, replacing '.csv' of
+# 'file_output_format'
+output_formats = {'csv' : '.csv',
+                  'csv.gz' : '.csv.gz',
+                  'csv.zst' : '.csv.zst',
+                  'parquet' : '.parquet',
+                  'feather' : '.feather'}
+output_format = 'csv'
+# packages needed by each output format other than pandas and numpy
+output_format_packages = {'csv.zst' : 'zstandard', 'parquet' : 'pyarrow', 'feather' : 'pyarrow'}
+# CSV reader of LCD files - 'default' is the pandas C parser, 'pyarrow' the
+# multithreaded Arrow CSV reader (see readers.py), which needs the pyarrow
+# package and otherwise falls back to 'default'
+csv_engine = 'default'
+csv_engines = ['default', 'pyarrow']
+csv_engine_packages = {'pyarrow' : 'pyarrow'}
+# extension of the -profile JSON report saved next to the output file
+file_profile_extension = '.profile.json'
+# extension of the -gaps table of missing values saved next to the output file
+file_gaps_extension = '.gaps.csv'
 
 # Parameters
 pct_null_timestamp_max = 0.5  #0.5 = 50%
+# value used for trace precipitation 'T' in LCD source files
+trace_value = 0.0
+# quality flag codes of LCD value qualifiers ('s' suspect, 'V' variable,
+# '*' flagged, 'T' trace, 'unparsed' non-numeric value such as 'M' or 'VRB')
+lcd_value_flags = {'s': 1, 'V': 2, '*': 3, 'T': 4, 'unparsed': 5}
 max_records_to_interpolate = 24
+# chunked (bounded memory) reading - rows per chunk and the estimated memory
+# used by one parsed value, used to convert a memory limit to a chunk size
+chunksize_rows = 100000
+chunksize_min = 1000
+chunk_bytes_per_value = 64
+# hours of records read either side of a -start / -end date window in addition
+# to 'max_records_to_interpolate', so that values at the edges of the window are
+# interpolated from the same source records as when the whole file is processed
+window_padding_hours = 24
+# -watch mode - seconds between scans of the watched directory, and seconds a
+# file's size and modified time must be unchanged before it is processed (so
+# that files still being written or copied are not read part way)
+watch_interval_seconds = 5.0
+watch_settle_seconds = 10.0
+# -serve mode - local address of the HTTP query service, memory limit of the
+# cache of processed stations, rows per block of a streamed response and the
+# content type of each response format
+serve_host = '127.0.0.1'
+serve_port = 8765
+serve_cache_mb = 1024
+serve_chunk_rows = 50000
+serve_formats = {'csv' : 'text/csv', 'arrow' : 'application/vnd.apache.arrow.stream'}
+# bytes read per step when seeking back from the end of a file for its last
+# record, and the range below which a date search reads lines forward
+tail_block_bytes = 64 * 1024
+ns_minute = 60 * 10**9
+ns_hour = 60 * ns_minute
+ns_day = 24 * ns_hour
+n_seconds_day = 24 * 3600
+# -compact mode - dtype of measurement values and read_csv() dtypes of LCD
+# metadata columns (only those in 'cols_noaa_processed' are read)
+dtype_compact = 'float32'
+cols_dtype_compact = {'STATION' : 'category', 'REPORT_TYPE' : 'category',
+                      'SOURCE' : 'category'}
+# parse cache (used only with -cache) - environment variable to override the
+# cache directory, maximum cache size in megabytes, key by file content (True)
+# or by modified time (False) and the version of the cache entry format, which
+# is part of every key (with the package version) so that entries written by
+# other versions are never read
+env_cache_dir = 'NOAA_WEATHER_HOURLY_CACHE'
+cache_max_mb = 2048
+cache_key_content = False
+cache_format_version = 3
+# precedence of duplicate records - records with the same 'DATE' and
+# 'REPORT_TYPE' in more than one file (ie. overlapping year files or a
+# re-downloaded export) are taken from a single file:
+# 'newest' - the most recently modified file
+# 'first' / 'last' - the file that starts first / last
+# 'report_type' - as 'newest', and where a timestamp has observations of more
+# than one report type only those of the first type in 'report_type_precedence'
+# are kept.  Types not listed (ie. daily 'SOD' and monthly 'SOM' summaries,
+# which carry 'Sunrise' / 'Sunset') are always kept.
+merge_precedence = 'newest'
+merge_precedences = ['newest', 'first', 'last', 'report_type']
+report_type_precedence = ['FM-15', 'FM-16', 'SY-MT', 'FM-12', 'SAO', 'AUTO']
+# number of processes reading and parsing LCD files concurrently when files
+# are read in to memory (1 reads the files one after another)
+read_workers = 1
 
 freqstr_frequency = {'D': 'Daily',
 'W': 'Weekly',
@@ -41,7 +127,7 @@ freqstr_frequency = {'D': 'Daily',
 'B': 'Business Day'}
 
 # NOAA columns processed by this script
-cols_noaa_processed = ['DATE', 'STATION', 
+cols_noaa_processed = ['DATE', 'STATION', 'REPORT_TYPE',
        'HourlyVisibility', 'HourlyDryBulbTemperature', 'HourlyWindSpeed',
        'HourlyDewPointTemperature', 'HourlyRelativeHumidity',
        'HourlyWindDirection', 'HourlyStationPressure',
@@ -50,10 +136,23 @@ cols_noaa_processed = ['DATE', 'STATION',
        'HourlyPrecipitation', 'HourlyPressureChange',
         'HourlyWindGustSpeed', 'Sunset',
        'Sunrise']
-# need a list of columns with data that excludes 'DATE' and 'STATION'
-cols_date_station = ['DATE', 'STATION']
+# need a list of columns with data that excludes 'DATE', 'STATION' and 'REPORT_TYPE'
+cols_date_station = ['DATE', 'STATION', 'REPORT_TYPE']
 cols_data = [col_ for col_ in cols_noaa_processed if col_ not in cols_date_station]
 cols_sunrise_sunset = ['Sunrise', 'Sunset']
+# hourly precipitation - a routine report ('FM-15') holds the total since the
+# previous routine report and a special report (ie. 'FM-16') the amount so far
+# since the previous routine report, which the next routine report includes.
+# Values of other report types are moved to 'col_precipitation_special' and
+# only used for hours without a routine value (see split_precipitation()).
+report_type_routine = 'FM-15'
+col_precipitation_special = 'HourlyPrecipitationSpecial'
+# reducer used to resample each column in to hourly (or coarser) values,
+# columns not listed use 'mean'.  See binning.py
+cols_reducer = {'HourlyPrecipitation': 'sum',
+                col_precipitation_special: 'max',
+                'HourlyWindDirection': 'circular_mean',
+                'HourlyWindGustSpeed': 'max'}
 
 # Messages
 message_all_csv_files_found = """\nThe following .CSV files were found in '{dir_source_posix}':
@@ -91,3 +190,16 @@ https://github.com/emskiphoto/noaa_weather_hourly"""
 
 message_pct_null_data = """Percent Missing Values by Column from {start_str} to {end_str} for LCD source file(s):
 {files_lcd_input_names_str}"""
+
+message_batch_summary = """\nBatch processing summary for {n_stations} station(s) in '{dir_source_posix}':"""
+
+message_watch_start = """\nWatching '{dir_watch_posix}' for new or modified LCD files every {interval} seconds.
+Outputs are saved to '{dir_out_posix}'.  Press Ctrl+C to stop.\n"""
+
+message_serve_start = """\nServing the LCD stations in '{dir_source_posix}' at http://{host}:{port}/stations
+Query a station with /station/{{key}}?start=YYYY-MM-DD&end=YYYY-MM-DD&freq=H&format=csv
+Press Ctrl+C to stop.\n"""
+
+message_watch_stop = """\nStopped watching after processing {n_stations} station(s)."""
+
+message_append_up_to_date = """\nNo LCD files were modified after '{file_append_name}' was saved.  The output is up to date."""
@@ -0,0 +1,349 @@
+# discovery.py
+# noaa_weather_hourly
+# File discovery and validation stages that run before any LCD data is
+# loaded:  locating LCD files, reading their headers and selecting the columns
+# to be used.  plan_lcd_files() creates a 'manifest' of the station, date range
+# and columns of each file from its header, first and last record only (the
+# last record is found by seeking back from the end of the file).  As LCD
+# records are sorted by time, the records of a date window are found with a
+# binary search on byte offsets (see find_date_offset()).  Only the standard
+# library is imported here (not pandas or numpy) so that the command line
+# script can report a missing file or an empty directory without the startup
+# cost of the data packages.
+import csv
+import datetime
+import importlib
+import io
+import pathlib
+import re
+# import modules specific to this package
+from .config import *
+from .utils import find_files_re_pattern_sorted_last_modified
+
+
+def discover_csv_files(dir_source):
+    """Returns sorted list of names (name only, not paths) of all .csv files
+    in pathlib directory 'dir_source'."""
+    return sorted([f_.name for f_ in dir_source.glob('*.csv') if f_.is_file()])
+
+
+def discover_lcd_files(dir_source):
+    """Returns 'version_files' dictionary with LCD version number as key and list
+    of matching pathlib file paths as values.  Files are sorted by last modified
+    date descending."""
+    return {v_ : find_files_re_pattern_sorted_last_modified(dir_source, pattern_) or []
+            for v_, pattern_ in version_pattern_lcd_input.items()}
+
+
+def select_station_files(version_files):
+    """Returns tuple (files_lcd_input, lcd_version) for the most recently modified
+    LCD file in 'version_files'.  LCD v2 files are delivered as discrete calendar
+    years (ie. 'LCD_USW00014939_2023.csv') so all v2 files that share the station
+    id of the most recently modified file are included.  LCD v1 files are delivered
+    with multi-year date ranges and are returned as a single comprehensive file.
+    Returns ([], None) if 'version_files' contains no files."""
+    # find most recently modified file by lcd version number
+    version_file_last_modified = {version_ : files_[0] for version_, files_ in
+                                  version_files.items() if len(files_) > 0}
+    if len(version_file_last_modified) < 1:
+        return [], None
+    # find the most recent file and its lcd version
+    lcd_version, file_last_modified = sorted(version_file_last_modified.items(),
+                            key=lambda x: x[1].stat().st_mtime, reverse=True)[0]
+    # make sure we have the right version
+    assert file_last_modified in version_files[lcd_version]
+    if lcd_version == 2:
+        # extract id_file_lcd2 as the blob of characters between first and second '_'
+        # reference 'LCD_USW00014939_2023.csv' --> 'USW00014939'
+        id_file_lcd2 = file_last_modified.name.split('_')[1]
+        files_lcd_input = [file_ for file_ in version_files[lcd_version]
+                           if id_file_lcd2 in file_.name]
+    else:
+        # this is a v1 file and therefore a single comprehensive file
+        files_lcd_input = [file_last_modified]
+    return files_lcd_input, lcd_version
+
+
+def group_station_files(version_files):
+    """Returns dictionary 'station_files' with a station key as key and list of
+    LCD files for that station as values, for every file in 'version_files'.
+    Each LCD v1 file is its own group (keyed by file name without suffix) while
+    LCD v2 files are grouped by the station id in the file name,
+    ie. 'LCD_USW00014939_2023.csv' --> 'USW00014939'."""
+    station_files = {}
+    for lcd_version, files_ in version_files.items():
+        for file_ in sorted(files_):
+            if lcd_version == 2:
+                key_ = file_.name.split('_')[1]
+            else:
+                key_ = file_.stem
+            station_files.setdefault(key_, []).append(file_)
+    return station_files
+
+
+def read_files_columns(files):
+    """Returns dictionary 'files_columns' with file path as key and sorted list of
+    column names found in the header of that file as values.  Files whose
+    header cannot be read are omitted."""
+    files_columns = {}
+    for file_ in files:
+        try:
+            # this is 30x faster than pd.read_csv(file_, index_col=0, nrows=0).columns.tolist()
+            with open(file_, 'r') as infile:
+                reader = csv.DictReader(infile)
+                fieldnames = reader.fieldnames
+            files_columns[file_] = sorted(fieldnames)
+        except:
+            continue
+    return files_columns
+
+
+def validate_files_usecols(files_columns):
+    """Returns dictionary 'files_usecols' containing validated files and the
+    columns to be used from each file.  Validation steps for each file:
+    * is there a 'DATE' column?
+    * is at least one of the 'cols_data' columns available?
+    * keep only columns found in 'cols_noaa_processed'"""
+    # keep only files that have a 'DATE' column - otherwise where is this data supposed to go?
+    files_usecols = {file_ : cols_ for file_, cols_ in files_columns.items()
+                     if 'DATE' in cols_}
+    # keep only files that have at least one cols_data column
+    files_usecols = {file_ : cols_ for file_, cols_ in files_usecols.items()
+                     if len(set(cols_).intersection(set(cols_data))) >= 1}
+    # reduce files_usecols to only columns used in this process
+    return {file_ : sorted(set(cols_noaa_processed).intersection(set(cols_))) for
+            file_, cols_ in files_usecols.items()}
+
+
+def lcd_version_from_name(file):
+    """Returns LCD version number whose file name pattern in
+    'version_pattern_lcd_input' matches the name of 'file', or None"""
+    for version_, pattern_ in version_pattern_lcd_input.items():
+        if re.search(pattern_, pathlib.Path(file).name) is not None:
+            return version_
+    return None
+
+
+def read_last_line(file, block_size=tail_block_bytes):
+    """Returns the last non-empty line of 'file' as text, read by seeking back
+    from the end of the file in blocks of 'block_size' bytes"""
+    with open(file, 'rb') as infile:
+        position = infile.seek(0, io.SEEK_END)
+        tail = b''
+        while position > 0:
+            position_ = max(position - block_size, 0)
+            infile.seek(position_)
+            tail = infile.read(position - position_) + tail
+            position = position_
+            lines = tail.rstrip(b'\r\n').split(b'\n')
+            # the last line is complete once a line break is found before it
+            if len(lines) > 1 or position == 0:
+                return lines[-1].rstrip(b'\r').decode('utf-8', errors='replace')
+    return ''
+
+
+def parse_timestamp(value):
+    """Returns datetime of LCD 'DATE' string 'value' (ie. '2023-01-01T00:54:00'),
+    or None if it is not a valid timestamp"""
+    try:
+        return datetime.datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def read_line_date(line, i_date):
+    """Returns datetime of the 'DATE' value at column index 'i_date' of CSV
+    record 'line' (bytes), or None if there is no valid timestamp"""
+    row_ = next(csv.reader([line.decode('utf-8', errors='replace')]), [])
+    return parse_timestamp(row_[i_date]) if len(row_) > i_date else None
+
+
+def find_date_offset(file, dt, side='left'):
+    """Returns byte offset of the first record of time-sorted LCD 'file' whose
+    'DATE' is at or after datetime 'dt' (side='left') or after 'dt'
+    (side='right'), or the file size if there is no such record.  The offset is
+    found by binary search on byte offsets, reading only the line after each
+    probe, then by reading lines forward once the search is within
+    'tail_block_bytes' bytes."""
+    with open(file, 'rb') as infile:
+        header = infile.readline()
+        i_date = next(csv.reader([header.decode('utf-8', errors='replace')])).index('DATE')
+        is_before = (lambda dt_: dt_ < dt) if side == 'left' else (lambda dt_: dt_ <= dt)
+        # every record before offset 'lo' is before 'dt', the first record at or
+        # after 'dt' starts at or before offset 'hi'
+        lo = infile.tell()
+        hi = infile.seek(0, io.SEEK_END)
+        while hi - lo > tail_block_bytes:
+            infile.seek((lo + hi) // 2)
+            # skip the partial line to the start of the next record
+            infile.readline()
+            position = infile.tell()
+            dt_ = read_line_date(infile.readline(), i_date)
+            if position >= hi or dt_ is None:
+                break
+            if is_before(dt_):
+                lo = position
+            else:
+                hi = position
+        infile.seek(lo)
+        while True:
+            position = infile.tell()
+            line = infile.readline()
+            if not line:
+                return position
+            dt_ = read_line_date(line, i_date)
+            if dt_ is not None and not is_before(dt_):
+                return position
+
+
+def read_file_window(file, offsets):
+    """Returns in-memory binary file (io.BytesIO) holding the header of 'file'
+    followed by its records between byte 'offsets' (start, end)"""
+    offset_start, offset_end = offsets
+    with open(file, 'rb') as infile:
+        header = infile.readline()
+        infile.seek(offset_start)
+        return io.BytesIO(header + infile.read(offset_end - offset_start))
+
+
+def read_file_metadata(file):
+    """Returns 'metadata' dictionary of LCD 'file' read from its header, first
+    record and last record without parsing the whole file:  'columns',
+    'station' and 'first' / 'last' timestamps.  'first' and 'last' are None if
+    the file has no records.  Raises OSError if the file can not be read."""
+    with open(file, 'r', newline='') as infile:
+        reader = csv.reader(infile)
+        header = next(reader, [])
+        row_first = next(reader, None)
+    metadata = {'columns' : sorted(header), 'station' : None, 'first' : None,
+                'last' : None}
+    if row_first is None or 'DATE' not in header:
+        return metadata
+    row_last = next(csv.reader([read_last_line(file)]), [])
+    if len(row_last) != len(header):
+        # a quoted value spans lines, fall back to reading every record
+        with open(file, 'r', newline='') as infile:
+            for row_ in csv.reader(infile):
+                row_last = row_ if len(row_) > 0 else row_last
+    i_date = header.index('DATE')
+    metadata['first'] = parse_timestamp(row_first[i_date])
+    metadata['last'] = parse_timestamp(row_last[i_date])
+    if 'STATION' in header:
+        metadata['station'] = row_first[header.index('STATION')]
+    return metadata
+
+
+def plan_lcd_files(files, start=None, end=None):
+    """Returns 'manifest' list of dictionaries describing each LCD file in
+    'files' (see read_file_metadata()), ordered by first timestamp.  Each entry
+    includes the LCD version, file size, the columns to be used ('usecols', see
+    validate_files_usecols()), the names of other files whose date range
+    overlaps ('overlaps') and a 'skip' reason if the file will not be read:
+    'unreadable', 'no valid columns', 'no records' or 'outside date range'
+    (before datetime 'start' or after datetime 'end', if provided).  If only
+    part of a file is from 'start' to 'end', 'offsets' holds the byte offsets
+    (start, end) of those records (see find_date_offset()), otherwise None."""
+    manifest = []
+    for file_ in files:
+        file_ = pathlib.Path(file_)
+        entry = {'file' : file_, 'lcd_version' : lcd_version_from_name(file_),
+                 'size_bytes' : None, 'station' : None, 'first' : None, 'last' : None,
+                 'columns' : [], 'usecols' : [], 'overlaps' : [], 'offsets' : None,
+                 'skip' : None}
+        try:
+            entry['size_bytes'] = file_.stat().st_size
+            entry.update(read_file_metadata(file_))
+        except (OSError, UnicodeDecodeError, csv.Error):
+            entry['skip'] = 'unreadable'
+            manifest.append(entry)
+            continue
+        entry['usecols'] = validate_files_usecols({file_ : entry['columns']}).get(file_, [])
+        if len(entry['usecols']) < 1:
+            entry['skip'] = 'no valid columns'
+        elif entry['first'] is None or entry['last'] is None:
+            entry['skip'] = 'no records'
+        elif (start is not None and entry['last'] < start) or \
+                (end is not None and entry['first'] > end):
+            entry['skip'] = 'outside date range'
+        elif (start is not None and entry['first'] < start) or \
+                (end is not None and entry['last'] > end):
+            entry['offsets'] = (find_date_offset(file_, start or datetime.datetime.min),
+                                entry['size_bytes'] if end is None else
+                                find_date_offset(file_, end, side='right'))
+            # the date range falls in a gap between records of the file
+            if entry['offsets'][0] >= entry['offsets'][1]:
+                entry['skip'] = 'outside date range'
+        manifest.append(entry)
+    # files without records sort last
+    manifest = sorted(manifest, key=lambda x: (x['first'] is None, x['first'] or 0,
+                                               x['file'].name))
+    entries_dated = [e_ for e_ in manifest if e_['skip'] is None]
+    for entry_ in entries_dated:
+        entry_['overlaps'] = [e_['file'].name for e_ in entries_dated if e_ is not entry_
+                              and e_['first'] <= entry_['last']
+                              and e_['last'] >= entry_['first']]
+    return manifest
+
+
+def manifest_files_usecols(manifest):
+    """Returns 'files_usecols' dictionary (see validate_files_usecols()) of the
+    files in 'manifest' that are not skipped, in manifest order"""
+    return {e_['file'] : e_['usecols'] for e_ in manifest if e_['skip'] is None}
+
+
+def print_manifest(manifest):
+    """Prints table of the files in 'manifest' (see plan_lcd_files())"""
+    format_ = lambda dt_ : '' if dt_ is None else dt_.strftime('%Y-%m-%d %H:%M')
+    print('--------------------------------------------------------------------------------')
+    print('-------------------------------- LCD File Plan ---------------------------------')
+    print('--------------------------------------------------------------------------------')
+    print(f'{"file":<32}{"v":>2} {"station":<12}{"first":<17}{"last":<17}{"cols":>4}  skip')
+    for e_ in manifest:
+        print(f'{e_["file"].name:<32}{e_["lcd_version"] or "":>2} {e_["station"] or "":<12}'
+              f'{format_(e_["first"]):<17}{format_(e_["last"]):<17}{len(e_["usecols"]):>4}  '
+              f'{e_["skip"] or ""}')
+        if e_['offsets'] is not None:
+            print(f'{"":<35}reads bytes {e_["offsets"][0]:,} to {e_["offsets"][1]:,} '
+                  f'of {e_["size_bytes"]:,}')
+        if e_['overlaps']:
+            print(f'{"":<35}overlaps: {", ".join(e_["overlaps"])}')
+    print('\n')
+
+
+def check_csv_engine(engine):
+    """Raises ValueError if 'engine' is not one of 'csv_engines' and ImportError
+    if a package needed by 'engine' is not installed"""
+    if engine not in csv_engines:
+        raise ValueError(f'Unknown CSV engine "{engine}", choose from: {", ".join(csv_engines)}')
+    if engine in csv_engine_packages:
+        package_ = csv_engine_packages[engine]
+        try:
+            importlib.import_module(package_)
+        except ImportError:
+            raise ImportError(f'CSV engine "{engine}" requires the "{package_}" '
+                              f'package:  pip install {package_}')
+
+
+def csv_engine_available(engine):
+    """Returns 'engine' if the packages it needs are installed, otherwise the
+    'default' engine"""
+    try:
+        check_csv_engine(engine)
+    except ImportError:
+        return 'default'
+    return engine
+
+
+def check_output_format(file_format):
+    """Raises ValueError if 'file_format' is not one of 'output_formats' and
+    ImportError if a package needed to write 'file_format' is not installed"""
+    if file_format not in output_formats:
+        raise ValueError(f'Unknown output format "{file_format}", choose from: '
+                         f'{", ".join(output_formats)}')
+    if file_format in output_format_packages:
+        package_ = output_format_packages[file_format]
+        try:
+            importlib.import_module(package_)
+        except ImportError:
+            raise ImportError(f'Output format "{file_format}" requires the "{package_}" '
+                              f'package:  pip install {package_}')
@@ -0,0 +1,124 @@
+# formats.py
+# noaa_weather_hourly
+# Writers and readers of the output file formats available with '-format'
+# ('output_formats' in config.py):
+# 'csv' - CSV text (default)
+# 'csv.gz', 'csv.zst' - gzip or Zstandard compressed CSV text ('csv.zst'
+#                       requires the zstandard package)
+# 'parquet' - Apache Parquet (requires pyarrow)
+# 'feather' - Feather / Arrow IPC (requires pyarrow)
+# CSV text is created by csv_text(), which formats only the unique values of
+# each column and joins the rows in a single pass.  Output values are rounded
+# to 2 decimal places and highly repetitive, so this is several times faster
+# than DataFrame.to_csv() while producing the same text.
+import gzip
+import os
+import pathlib
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+from .discovery import check_output_format
+
+def file_format_from_name(file_out):
+    """Returns output format of 'file_out' identified by its file extension"""
+    name_ = pathlib.Path(file_out).name.lower()
+    # longest extension first so that '.csv.gz' is not taken as '.gz'
+    for format_, extension_ in sorted(output_formats.items(), key=lambda x: -len(x[1])):
+        if name_.endswith(extension_):
+            return format_
+    raise ValueError(f'Unknown output format of file: {pathlib.Path(file_out).name}')
+
+
+def format_float_values(values):
+    """Returns object array of CSV strings of float array 'values' as written
+    by DataFrame.to_csv().  Values are factorized on their bit pattern (which
+    keeps -0.0 apart from 0.0) and only the unique values are formatted."""
+    codes, uniques = pd.factorize(np.ascontiguousarray(values, dtype=float).view(np.int64))
+    uniques = uniques.view(float)
+    strs = uniques.astype(str).astype(object)
+    strs[np.isnan(uniques)] = ''
+    return strs[codes]
+
+
+def format_datetime_values(values):
+    """Returns object array of CSV strings of datetime64 array 'values' as
+    written by DataFrame.to_csv().  The date and the time of day are formatted
+    separately for their unique values.  NaT is an empty string and the time
+    is omitted if every value is at midnight."""
+    ns = np.asarray(values, dtype='datetime64[ns]').view(np.int64)
+    filter_nat = ns == np.datetime64('NaT').view(np.int64)
+    days = np.where(filter_nat, 0, ns // ns_day)
+    times = np.where(filter_nat, 0, ns % ns_day)
+    codes_day, uniques_day = pd.factorize(days)
+    strs = pd.DatetimeIndex((uniques_day * ns_day).view('datetime64[ns]'))\
+                .strftime('%Y-%m-%d').to_numpy(dtype=object)[codes_day]
+    if (times != 0).any():
+        codes_time, uniques_time = pd.factorize(times)
+        strs_time = pd.DatetimeIndex(uniques_time.view('datetime64[ns]'))\
+                        .strftime(' %H:%M:%S').to_numpy(dtype=object)
+        strs = strs + strs_time[codes_time]
+    strs[filter_nat] = ''
+    return strs
+
+
+def format_values(values):
+    """Returns object array of CSV strings of array 'values', or None if the
+    dtype of 'values' is not supported by csv_text()"""
+    dtype_ = values.dtype
+    if pd.api.types.is_bool_dtype(dtype_):
+        return np.where(values, 'True', 'False').astype(object)
+    if pd.api.types.is_datetime64_dtype(dtype_):
+        return format_datetime_values(values)
+    if pd.api.types.is_float_dtype(dtype_):
+        return format_float_values(values)
+    if pd.api.types.is_integer_dtype(dtype_):
+        return values.astype(str).astype(object)
+    return None
+
+
+def csv_text(df_out):
+    """Returns CSV text of df_out identical to df_out.to_csv().  Falls back to
+    to_csv() for columns that are not bool, numeric or datetime."""
+    labels = [df_out.index.name or ''] + [str(col_) for col_ in df_out.columns]
+    cols_text = [format_values(df_out.index.to_numpy())] + \
+                [format_values(df_out[col_].to_numpy()) for col_ in df_out.columns]
+    if any(text_ is None for text_ in cols_text) or \
+            any(char_ in label_ for label_ in labels for char_ in ',"\r\n'):
+        return df_out.to_csv()
+    rows = [','.join(labels)] + list(map(','.join, zip(*cols_text)))
+    return os.linesep.join(rows) + os.linesep
+
+
+def write_output_file(df_out, file_out, file_format=None):
+    """Saves df_out to 'file_out' in 'file_format' (default is identified by
+    the extension of file_out, see file_format_from_name()) and returns file_out"""
+    file_format = file_format_from_name(file_out) if file_format is None else file_format
+    check_output_format(file_format)
+    if file_format == 'csv':
+        with open(file_out, 'w', newline='') as outfile:
+            outfile.write(csv_text(df_out))
+    elif file_format == 'csv.gz':
+        with gzip.open(file_out, 'wt', newline='') as outfile:
+            outfile.write(csv_text(df_out))
+    elif file_format == 'csv.zst':
+        import zstandard
+        with zstandard.open(file_out, 'wt', newline='') as outfile:
+            outfile.write(csv_text(df_out))
+    elif file_format == 'parquet':
+        df_out.to_parquet(file_out, engine='pyarrow')
+    elif file_format == 'feather':
+        df_out.reset_index().to_feather(file_out)
+    return file_out
+
+
+def read_output_file(file_out):
+    """Returns df_out DataFrame with 'DATE' DatetimeIndex read from output file
+    'file_out' of any of the 'output_formats'"""
+    file_format = file_format_from_name(file_out)
+    if file_format == 'parquet':
+        return pd.read_parquet(file_out)
+    if file_format == 'feather':
+        return pd.read_feather(file_out).set_index('DATE')
+    # 'csv', 'csv.gz' and 'csv.zst' - compression is identified by extension
+    return pd.read_csv(file_out, index_col='DATE', parse_dates=['DATE'])
@@ -0,0 +1,89 @@
+# gaps.py
+# noaa_weather_hourly
+# Gap-aware interpolation of hourly values.  A gap is a run of contiguous NaN
+# values in a column.  The gaps of every column are found in a single
+# vectorized pass over a 2-D NumPy array and only gaps of up to
+# 'max_records_to_interpolate' records are filled.  Longer gaps are left
+# empty in full (DataFrame.interpolate(limit=) would fill the first
+# 'max_records_to_interpolate' records of every longer gap).  Filled values
+# are the same as DataFrame.interpolate(method='time'):  linear in time
+# between the values either side of the gap, or the last value of the column
+# for a gap at the end of a column.  Gaps at the start of a column are not
+# filled.  Every gap is also listed in a gap table (see gap_table()).
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+
+
+def nan_runs(filter_nan):
+    """Returns tuple (cols, starts, ends) of int64 arrays with the column, first
+    row and end row (exclusive) of every run of True values in the columns of
+    2-D boolean array 'filter_nan', in order of column then row"""
+    n_rows, n_cols = filter_nan.shape
+    # columns are laid out as rows so that runs are found in column order
+    padded = np.zeros((n_cols, n_rows + 2), dtype=np.int8)
+    padded[:, 1:-1] = filter_nan.T
+    edges = np.diff(padded, axis=1)
+    cols, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    return cols, starts, ends
+
+
+def fill_runs(values, ns, cols, starts, ends):
+    """Fills the NaN runs 'cols', 'starts', 'ends' (see nan_runs()) of 2-D float64
+    array 'values' in place with values linear in int64 timestamps 'ns' between
+    the values before and after each run, or the value before the run if the
+    run is at the end of its column.  Runs must not start at the first row.
+    The arithmetic is that of numpy.interp(), as used by
+    DataFrame.interpolate(method='time'), so filled values are identical."""
+    lengths = ends - starts
+    n_fill = int(lengths.sum())
+    if n_fill < 1:
+        return values
+    # row and column of every filled value, and the rows either side of its run
+    offsets = np.arange(n_fill) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(starts, lengths) + offsets
+    cols_ = np.repeat(cols, lengths)
+    rows_before = np.repeat(starts - 1, lengths)
+    rows_after = np.repeat(ends, lengths)
+    filter_end = rows_after == len(values)
+    rows_after[filter_end] = rows_before[filter_end]
+    x = ns.astype(float)
+    y_before = values[rows_before, cols_]
+    y_after = values[rows_after, cols_]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (y_after - y_before) / (x[rows_after] - x[rows_before])
+        filled = slope * (x[rows] - x[rows_before]) + y_before
+    values[rows, cols_] = np.where(filter_end, y_before, filled)
+    return values
+
+
+def gap_table(columns, index, cols, starts, ends, filter_filled):
+    """Returns 'df_gaps' DataFrame with one row per NaN run (see nan_runs()) of
+    DataFrame 'columns' and DatetimeIndex 'index':  'column', 'start' and 'end'
+    (timestamps of the first and last NaN record), 'length' (records) and
+    'interpolated' (True if the gap was filled)"""
+    return pd.DataFrame({'column' : np.asarray(columns, dtype=object)[cols],
+                         'start' : index[starts],
+                         'end' : index[ends - 1],
+                         'length' : ends - starts,
+                         'interpolated' : filter_filled})
+
+
+def interpolate_short_gaps(df, max_records_to_interpolate=max_records_to_interpolate):
+    """Returns tuple (df, df_gaps) with the gaps of NaN values of up to
+    'max_records_to_interpolate' records in the numeric columns of 'df' (with a
+    sorted DatetimeIndex) filled using time-based interpolation, and the gap
+    table 'df_gaps' of every gap found (see gap_table()).  Values are
+    interpolated as float64 and returned in the dtypes of df (ie. float32 with
+    -compact)."""
+    values = df.to_numpy(dtype=float, copy=True)
+    cols, starts, ends = nan_runs(np.isnan(values))
+    filter_fill = (starts > 0) & (ends - starts <= max_records_to_interpolate)
+    fill_runs(values, df.index.asi8, cols[filter_fill], starts[filter_fill],
+              ends[filter_fill])
+    df_filled = pd.DataFrame(values, index=df.index, columns=df.columns)
+    if (df.dtypes != float).any():
+        df_filled = df_filled.astype(df.dtypes.to_dict())
+    return df_filled, gap_table(df.columns, df.index, cols, starts, ends, filter_fill)
@@ -0,0 +1,144 @@
+# merge.py
+# noaa_weather_hourly
+# Merges the records of several LCD files of a station (ie. year files, or a
+# re-downloaded export that overlaps an older one) in to a single time-sorted
+# sequence.  Each file is delivered sorted by 'DATE', so the files are merged
+# as sorted runs rather than concatenated, hashed and sorted again.  Records
+# are keyed by ('DATE', 'REPORT_TYPE') and a single record is kept per key:
+# a key found in more than one file is taken from the file that wins
+# 'merge_precedence' (see config.py) instead of being averaged with the other
+# files' values.  A key repeated within the winning file keeps all of its
+# records, which dedupe_timestamps() averages as before, the same as records
+# of different report types that share a timestamp.
+import pathlib
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+
+# rank of each report type in 'report_type_precedence', lower wins
+report_type_ranks = {type_ : i_ for i_, type_ in enumerate(report_type_precedence)}
+
+
+def file_ranks(files, precedence=merge_precedence):
+    """Returns list of the precedence rank of each of 'files' (in order of their
+    first timestamp, see plan_lcd_files()) for records found in more than one
+    file.  The highest rank wins (see 'merge_precedence')."""
+    if precedence not in merge_precedences:
+        raise ValueError(f"Unknown precedence '{precedence}', use one of: "
+                         f"{', '.join(merge_precedences)}")
+    if precedence == 'first':
+        return [-i_ for i_ in range(len(files))]
+    if precedence == 'last':
+        return list(range(len(files)))
+    # 'newest' and 'report_type' - most recently modified file, then the file
+    # that starts last
+    order = sorted(range(len(files)),
+                   key=lambda i_: (pathlib.Path(files[i_]).stat().st_mtime, i_))
+    ranks = [0] * len(files)
+    for rank_, i_ in enumerate(order):
+        ranks[i_] = rank_
+    return ranks
+
+
+def report_type_values(df):
+    """Returns object array of the 'REPORT_TYPE' of every record of df, or of
+    empty strings if df has no 'REPORT_TYPE' column"""
+    if 'REPORT_TYPE' in df.columns:
+        return df['REPORT_TYPE'].to_numpy(dtype=object)
+    return np.full(len(df), '', dtype=object)
+
+
+def filter_duplicate_keys(ns, report_types, ranks, precedence=merge_precedence):
+    """Returns boolean array of the records to keep of time-sorted records with
+    int64 nanosecond timestamps 'ns', 'REPORT_TYPE' values 'report_types' and
+    file precedence 'ranks' (see file_ranks()).  Every ('DATE', 'REPORT_TYPE')
+    key keeps only the records of the highest ranked file with that key
+    (more than one if the key is repeated within that file).  If 'precedence' is 'report_type', timestamps with more
+    than one of the report types in 'report_type_precedence' first keep only the
+    records of the type that comes first in the list.  Only records with a
+    repeated timestamp are compared."""
+    filter_keep = np.ones(len(ns), dtype=bool)
+    filter_same = ns[1:] == ns[:-1]
+    idx = np.flatnonzero(np.r_[False, filter_same] | np.r_[filter_same, False])
+    if len(idx) < 1:
+        return filter_keep
+    # v1 files pad report types with spaces (ie. 'SOD  ')
+    repeats = pd.DataFrame({'ns' : ns[idx],
+                            'report_type' : pd.Series(report_types[idx]).astype(str)\
+                                                .str.strip().to_numpy(),
+                            'rank' : ranks[idx]})
+    keep = np.ones(len(idx), dtype=bool)
+    if precedence == 'report_type':
+        # types that are not listed are never dropped
+        type_rank = repeats['report_type'].map(report_type_ranks)
+        keep &= (type_rank.isna() | (type_rank == type_rank.groupby(repeats['ns'])
+                                                         .transform('min'))).to_numpy()
+    keep &= (repeats['rank'] == repeats.groupby(['ns', 'report_type'])['rank']
+                                       .transform('max')).to_numpy()
+    filter_keep[idx] = keep
+    return filter_keep
+
+
+def merge_sorted_frames(dfs, ranks, precedence=merge_precedence):
+    """Returns DataFrame of DataFrames 'dfs' (one per file, each with a 'DATE'
+    index sorted as delivered by NOAA) merged in to a single sorted index, with
+    duplicate keys resolved by the file 'ranks' and 'precedence' (see
+    filter_duplicate_keys()).  Files that do not overlap are only concatenated.
+    Otherwise a stable sort of the concatenated runs merges them in
+    O(n log k) (NumPy's stable sort is a timsort, which merges sorted runs)."""
+    dfs = [df_ if df_.index.is_monotonic_increasing else df_.sort_index(kind='stable')
+           for df_ in dfs]
+    df = pd.concat(dfs, axis=0) if len(dfs) > 1 else dfs[0]
+    ranks = np.repeat(ranks, [len(df_) for df_ in dfs])
+    ns = df.index.asi8
+    if (ns[1:] < ns[:-1]).any():
+        order = np.argsort(ns, kind='stable')
+        df, ns, ranks = df.iloc[order], ns[order], ranks[order]
+    filter_keep = filter_duplicate_keys(ns, report_type_values(df), ranks, precedence)
+    return df if filter_keep.all() else df.loc[filter_keep]
+
+
+def merge_sorted_chunks(chunk_iters, ranks, precedence=merge_precedence):
+    """Yields time-sorted DataFrames merged (see merge_sorted_frames()) from the
+    iterators 'chunk_iters' of sorted DataFrame chunks, one iterator per file in
+    order of the file's first timestamp and every timestamp of a file complete
+    in a single chunk (see iter_lcd_file_chunks()).  Each yielded DataFrame holds
+    every record of its timestamps.  Files are opened only when the merge
+    reaches their first timestamp, so a chunk is held in memory only for the
+    files that overlap the current timestamp plus the next file."""
+    chunk_iters = list(chunk_iters)
+    # position of the file in 'chunk_iters' : current chunk of the file
+    buffers = {}
+    i_next = 0
+    # first timestamp of the most recently opened file with records
+    first_opened = None
+    while True:
+        # records up to 'frontier' are complete for every opened file, and
+        # unopened files start at or after 'first_opened'
+        while i_next < len(chunk_iters) and (len(buffers) < 1 or first_opened <=
+                min(df_.index[-1] for df_ in buffers.values())):
+            chunk_ = next(chunk_iters[i_next], None)
+            if chunk_ is not None and len(chunk_) > 0:
+                buffers[i_next] = chunk_
+                first_opened = chunk_.index[0]
+            i_next += 1
+        if len(buffers) < 1:
+            return
+        frontier = min(df_.index[-1] for df_ in buffers.values())
+        dfs, ranks_ = [], []
+        for i_ in sorted(buffers):
+            df_ = buffers[i_]
+            n_ = df_.index.searchsorted(frontier, side='right')
+            if n_ > 0:
+                dfs.append(df_.iloc[:n_])
+                ranks_.append(ranks[i_])
+            if n_ < len(df_):
+                buffers[i_] = df_.iloc[n_:]
+                continue
+            chunk_ = next(chunk_iters[i_], None)
+            if chunk_ is None:
+                del buffers[i_]
+            else:
+                buffers[i_] = chunk_
+        yield merge_sorted_frames(dfs, ranks_, precedence)
@@ -0,0 +1,70 @@
+# parsing.py
+# noaa_weather_hourly
+# Vectorized parser for LCD measurement values.  LCD values can carry a
+# qualifier suffix, for example '0.06s' (suspect), '1.75V' (variable) or
+# '29.92*', and precipitation uses 'T' for a trace amount.  A plain numeric
+# conversion discards all of these values as NaN.  parse_lcd_values() converts
+# every measurement column in a single pass over one concatenated buffer of
+# raw values.  Only the unique raw values are converted and the (slower)
+# qualifier handling is applied only to the few that are not plain numbers.
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+
+# numeric value or 'T' (trace) followed by an optional qualifier suffix
+pattern_lcd_value = r'^(?:([+-]?(?:\d+\.?\d*|\.\d+))|(T))([sV*]?)$'
+
+
+def parse_lcd_values(df, cols, trace_value=trace_value, return_flags=False, dtype=float):
+    """Returns df with columns 'cols' converted to float values of 'dtype'
+    (float64 or float32, see -compact).  Known LCD
+    qualifier suffixes ('s', 'V', '*') are removed from values and trace
+    precipitation 'T' is replaced with 'trace_value'.  Any other non-numeric
+    value (ie. 'M', 'VRB') is coerced to NaN.
+    If 'return_flags', returns tuple (df, df_flags) where 'df_flags' is a uint8
+    DataFrame of the same shape as df[cols] with the 'lcd_value_flags' code of
+    each value (0 = no qualifier)."""
+    cols = list(cols)
+    n_rows = df.shape[0]
+    values = np.empty((n_rows, len(cols)), dtype=dtype)
+    flags = np.zeros((n_rows, len(cols) if return_flags else 0), dtype=np.uint8)
+    # columns already parsed as numbers by read_csv need no conversion
+    idx_object = []
+    for idx_, col_ in enumerate(cols):
+        if pd.api.types.is_numeric_dtype(df[col_]):
+            values[:, idx_] = df[col_].to_numpy(dtype=dtype, na_value=np.nan)
+        else:
+            idx_object.append(idx_)
+    if len(idx_object) > 0:
+        # single buffer of all raw values, column after column.  LCD values are
+        # highly repetitive so only the unique raw values are parsed and the
+        # results are mapped back to every cell with the factorized codes.
+        raw = np.concatenate([df[cols[idx_]].to_numpy(dtype=object) for idx_ in idx_object])
+        codes, uniques = pd.factorize(raw)
+        parsed = pd.to_numeric(uniques, errors='coerce').astype(float)
+        flags_unique = np.zeros(parsed.shape[0], dtype=np.uint8)
+        # unique values that did not convert to a number
+        filter_failed = np.isnan(parsed)
+        if filter_failed.any():
+            raw_failed = pd.Series(uniques[filter_failed]).astype(str).str.strip()
+            df_extract = raw_failed.str.extract(pattern_lcd_value)
+            parsed_failed = pd.to_numeric(df_extract[0], errors='coerce').to_numpy(dtype=float)
+            filter_trace = df_extract[1].eq('T').to_numpy()
+            parsed_failed[filter_trace] = trace_value
+            flags_failed = df_extract[2].map(lcd_value_flags).fillna(
+                                lcd_value_flags['unparsed']).to_numpy(dtype=np.uint8)
+            flags_failed[filter_trace] = lcd_value_flags['T']
+            parsed[filter_failed] = parsed_failed
+            flags_unique[filter_failed] = flags_failed
+        # code -1 (missing value) maps to the appended NaN / 0 flag
+        parsed = np.append(parsed, np.nan).astype(dtype)[codes]
+        values[:, idx_object] = parsed.reshape(len(idx_object), n_rows).T
+        if return_flags:
+            flags_object = np.append(flags_unique, np.uint8(0))[codes]
+            flags[:, idx_object] = flags_object.reshape(len(idx_object), n_rows).T
+    df_values = pd.DataFrame(values, index=df.index, columns=cols)
+    df = pd.concat([df.drop(columns=cols), df_values], axis=1)[df.columns]
+    if return_flags:
+        return df, pd.DataFrame(flags, index=df.index, columns=cols)
+    return df
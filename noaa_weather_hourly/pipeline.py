@@ -0,0 +1,865 @@
+# pipeline.py
+# noaa_weather_hourly
+# Stage functions for processing NOAA LCD files in-process.  The command line
+# script in __main__.py is a thin wrapper around process_lcd().  Each stage
+# can also be called individually, for example to process many stations in
+# a single warm Python process without paying interpreter and pandas import
+# startup costs for every station.
+import concurrent.futures
+import os
+import pathlib
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+from .utils import *
+from .discovery import *
+from .cache import cache_read, cache_write
+from .parsing import parse_lcd_values
+from .binning import *
+from .merge import file_ranks, merge_sorted_frames, merge_sorted_chunks
+from .gaps import interpolate_short_gaps
+from .stats import *
+from .readers import read_lcd_csv
+from .formats import write_output_file, file_format_from_name
+from .profiling import stage
+from .stations import station_details_lookup
+
+
+def read_dtypes(cols_, compact=False):
+    """Returns dictionary of read_csv() dtypes for LCD columns 'cols_'.  If
+    'compact', metadata columns are read with the dtypes of 'cols_dtype_compact'
+    (ie. 'STATION' as categorical).  Measurement columns are parsed after reading
+    (see coerce_numeric())."""
+    if not compact:
+        return None
+    return {col_ : dtype_ for col_, dtype_ in cols_dtype_compact.items() if col_ in cols_}
+
+
+def read_lcd_file(file, cols_, use_cache=False, trace_value=trace_value, offsets=None,
+                  compact=False, engine=csv_engine):
+    """Returns coerced DataFrame 'df' of columns 'cols_' in LCD 'file' with a
+    'DATE' index, read with CSV 'engine' (see read_lcd_csv()).  If 'offsets'
+    (start, end) is provided, only the records between those byte offsets are
+    read (see find_date_offset()).  If 'use_cache', the parsed DataFrame of the
+    whole file is loaded from or saved to the on-disk parse cache (see
+    cache.py).  If 'compact', measurement values are 'dtype_compact' (float32)
+    and 'STATION' is categorical."""
+    use_cache = use_cache and offsets is None
+    # compact DataFrames are cached separately
+    key_extra = f'{trace_value}|{dtype_compact}' if compact else trace_value
+    if use_cache:
+        with stage('cache read') as record:
+            df = cache_read(file, cols_, key_extra)
+            record['rows_out'] = None if df is None else len(df)
+        if df is not None:
+            return df
+    with stage('csv read') as record:
+        source = file if offsets is None else read_file_window(file, offsets)
+        df = read_lcd_csv(source, cols_, read_dtypes(cols_, compact), engine)
+        record['rows_out'] = len(df)
+    with stage('numeric coercion', len(df)) as record:
+        df = coerce_numeric(df, trace_value, dtype_compact if compact else float)
+        record['rows_out'] = len(df)
+    if use_cache:
+        with stage('cache write', len(df)):
+            cache_write(file, cols_, df, key_extra)
+    return df
+
+
+def read_lcd_files(files_usecols, use_cache=False, trace_value=trace_value,
+                   files_offsets=None, compact=False, precedence=merge_precedence,
+                   read_workers=read_workers, engine=csv_engine):
+    """Returns coerced DataFrame 'df' of all files and columns in 'files_usecols'
+    (in order of their first timestamp) merged in to a sorted 'DATE' index.
+    Records with the same 'DATE' and 'REPORT_TYPE' in more than one file are
+    taken from the file that wins 'precedence' (see merge_sorted_frames()).
+    Files in 'files_offsets' are read only between their byte offsets (start,
+    end).  'compact' and 'engine' are as in read_lcd_file().  If 'read_workers'
+    is more than 1, files are read and coerced on a pool of that many processes."""
+    files_offsets = files_offsets or {}
+    files_args = [(f_, cols_, use_cache, trace_value, files_offsets.get(f_), compact, engine)
+                  for f_, cols_ in files_usecols.items()]
+    n_workers = min(read_workers or 1, len(files_args))
+    if n_workers > 1:
+        # stages run in the worker processes are not profiled, only the whole read
+        with stage('concurrent read') as record:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+                # results are returned in order of 'files_usecols'
+                dfs = list(executor.map(read_lcd_file, *zip(*files_args)))
+            record['rows_out'] = sum(len(df_) for df_ in dfs)
+    else:
+        dfs = [read_lcd_file(*args_) for args_ in files_args]
+    with stage('combine files', sum(len(df_) for df_ in dfs)) as record:
+        df = merge_sorted_frames(dfs, file_ranks(list(files_usecols), precedence),
+                                 precedence)
+        record['rows_out'] = len(df)
+    return df
+
+
+def coerce_numeric(df, trace_value=trace_value, dtype=float):
+    """Returns df with all measurement columns (not 'DATE', 'STATION',
+    'Sunrise' or 'Sunset') converted to numeric float values of 'dtype' in a
+    single pass (see parse_lcd_values()).  Qualified values such as '0.06s' keep their
+    numeric value, trace precipitation 'T' is replaced with 'trace_value' and
+    other non-numeric values are coerced to NaN."""
+    cols_numeric_stats = df.columns.difference(cols_sunrise_sunset + cols_date_station)
+    df = parse_lcd_values(df, cols_numeric_stats, trace_value, dtype=dtype)
+    if dtype != float:
+        # numeric sunrise / sunset HHMM values are exact in float32, so every
+        # value column has the same dtype (see float_dtype())
+        cols_hhmm = [col_ for col_ in cols_sunrise_sunset if col_ in df.columns and
+                     pd.api.types.is_numeric_dtype(df[col_])]
+        df[cols_hhmm] = df[cols_hhmm].astype(dtype)
+    return df
+
+
+def dedupe_timestamps(df):
+    """Returns df (sorted 'DATE' index) with a single record per timestamp.  If a
+    single timestamp appears more than once, available values are reduced
+    (ignoring NaN) with the column reducers, except that totals are averaged
+    (see dedupe_sorted_timestamps())."""
+    return dedupe_sorted_timestamps(df)
+
+
+def split_precipitation(df):
+    """Returns df with the 'HourlyPrecipitation' values of records that are not
+    routine reports ('report_type_routine') moved to 'col_precipitation_special'.
+    Special reports hold the amount since the previous routine report, so
+    summing every report of an hour counts them twice.  Hourly values are the
+    total of the routine reports of the hour, or the largest special value if
+    the hour has no routine value (see merge_precipitation()).  df is returned
+    unchanged if it has no 'REPORT_TYPE' or 'HourlyPrecipitation' column."""
+    if 'REPORT_TYPE' not in df.columns or 'HourlyPrecipitation' not in df.columns:
+        return df
+    filter_routine = (df['REPORT_TYPE'].astype(str).str.strip() == report_type_routine)\
+                        .to_numpy()
+    values_ = df['HourlyPrecipitation']
+    return df.assign(**{'HourlyPrecipitation' : values_.where(filter_routine),
+                        col_precipitation_special : values_.where(~filter_routine)})
+
+
+def merge_precipitation(df):
+    """Returns df with the 'col_precipitation_special' values (see
+    split_precipitation()) used where 'HourlyPrecipitation' is null and the
+    'col_precipitation_special' column removed.  For records this restores the
+    source values, for hourly values (see resample_hourly()) the special value
+    is only used in hours without a routine value."""
+    if col_precipitation_special not in df.columns:
+        return df
+    return df.assign(HourlyPrecipitation=df['HourlyPrecipitation']\
+                        .fillna(df[col_precipitation_special]))\
+             .drop(columns=col_precipitation_special)
+
+
+def extract_sunrise_sunset(df):
+    """Returns dictionary with 'Sunrise' and/or 'Sunset' as keys and a tuple
+    of sorted int64 nanosecond arrays (dates, timestamps) as values, with one
+    sunrise/sunset timestamp per date.  The source data provides only one
+    unique sunrise/set HHMM value per day and the rest of the day's values
+    are NaN.  If a date has more than one value, the last value is used."""
+    col_date_values = {}
+    for col_ in df.columns.intersection(cols_sunrise_sunset):
+        values_ = df[col_].to_numpy(dtype=float)
+        filter_valid = ~np.isnan(values_)
+        col_date_values[col_] = date_values_from_HHMM(df.index.asi8[filter_valid],
+                                            values_[filter_valid].astype(np.int64))
+    return col_date_values
+
+
+def date_values_from_HHMM(ns, hhmm):
+    """Returns tuple of int64 arrays (dates, timestamps) of the HHMM time values
+    'hhmm' observed at sorted int64 nanosecond timestamps 'ns', keeping the
+    last value of each date."""
+    dates = ns - ns % ns_day
+    filter_last = np.r_[dates[1:] != dates[:-1], True] if len(dates) > 0 else \
+                    np.zeros(0, dtype=bool)
+    return dates[filter_last], ns_from_HHMM(ns, hhmm)[filter_last]
+
+
+def combine_date_values(date_values):
+    """Returns tuple (dates, timestamps) combining the list of (dates, timestamps)
+    tuples 'date_values' in order.  For dates found in more than one item the
+    value of the last item is used."""
+    dates = np.concatenate([dates_ for dates_, values_ in date_values])
+    values = np.concatenate([values_ for dates_, values_ in date_values])
+    order = np.argsort(dates, kind='stable')
+    dates, values = dates[order], values[order]
+    filter_last = np.r_[dates[1:] != dates[:-1], True] if len(dates) > 0 else \
+                    np.zeros(0, dtype=bool)
+    return dates[filter_last], values[filter_last]
+
+
+def filter_suspect_timestamps(df, pct_null_timestamp_max=pct_null_timestamp_max):
+    """Returns df without records whose time of day has a high count of null
+    values in every column.  In v1 LCD files the '23:59:00' timestamp is suspect
+    and appears to only be a placeholder for posting sunrise/sunset times.
+    V2 LCD files do not seem to have the '23:59:00' timestamp issue.
+    Null values of all columns are counted at once by integer second-of-day.
+    Precipitation is counted with its source values (see merge_precipitation())."""
+    n_max_null = int(pct_null_timestamp_max * df.shape[0])
+    values_ = merge_precipitation(df[df.columns.difference(cols_sunrise_sunset)])
+    time_ = seconds_of_day(df.index)
+    counts_null = null_counts_by_code(values_.to_numpy(dtype=float_dtype(values_)),
+                                      time_, n_seconds_day)
+    # second-of-day lookup of suspect timestamps
+    filter_time_nan = (counts_null > n_max_null).all(axis=1)
+    return df.loc[~filter_time_nan[time_]]
+
+
+def trim_empty_records(df_out):
+    """Returns df_out without leading and trailing records that have no values
+    in any column"""
+    idx_values = np.flatnonzero(df_out.notna().any(axis=1).to_numpy())
+    if len(idx_values) < 1:
+        return df_out.iloc[0:0]
+    return df_out.iloc[idx_values[0]:idx_values[-1] + 1]
+
+
+def resample_hourly(df):
+    """Returns 'df_out' with all columns of df resampled to hourly values in a
+    single pass using the column reducers in 'cols_reducer' (ie. hourly total
+    of the routine 'HourlyPrecipitation' reports, see split_precipitation() and
+    binning.py).  This produces a perfect,
+    complete hourly datetime index from the first to the last hour with data.
+    NaN values can remain (ie. a contiguous 3-hour period of NaN values) and
+    are resolved later with interpolate_gaps()."""
+    return merge_precipitation(trim_empty_records(reduce_bins(df, 'H')).asfreq('H'))
+
+
+def interpolate_gaps(df_out, max_records_to_interpolate=max_records_to_interpolate):
+    """Returns df_out with gaps of NaN values estimated using time-based
+    interpolation where a gap is no longer than 'max_records_to_interpolate'
+    contiguous records.  Longer gaps are left as NaN (see gaps.py)."""
+    return interpolate_short_gaps(df_out, max_records_to_interpolate)[0]
+
+
+def trim_gap_table(df_gaps, df_out):
+    """Returns gap table 'df_gaps' (see gap_table()) limited to the gaps that
+    overlap the index of df_out, with 'Hourly' removed from column names"""
+    if len(df_out) > 0:
+        df_gaps = df_gaps.loc[(df_gaps['end'] >= df_out.index[0]) &
+                              (df_gaps['start'] <= df_out.index[-1])]
+    return df_gaps.assign(column=df_gaps['column'].map(remove_hourly_prefix))\
+                  .reset_index(drop=True)
+
+
+def check_frequency(freqstr):
+    """Raises ValueError if 'freqstr' is not a pandas frequency string (ie.
+    'H', '15T', 'D', 'M')"""
+    pd.tseries.frequencies.to_offset(freqstr)
+
+
+def resample_frequency(df_out, freqstr=freqstr):
+    """Returns hourly df_out resampled to 'freqstr'.  If 'freqstr' is a higher
+    frequency than hourly, resample using interpolation, else resample
+    using the column reducers in 'cols_reducer' (see binning.py).
+    df_out is returned unchanged if 'freqstr' is 'H'."""
+    if freqstr == 'H':
+        return df_out
+    # If the input freqstr is a fixed frequency (calendar frequencies such as
+    # 'W' and 'M' are always lower) higher than hourly, resample using
+    # interpolation
+    if is_fixed_frequency(freqstr) and \
+            pd.Timedelta(pd.tseries.frequencies.to_offset(freqstr)).value < ns_hour:
+        return df_out.resample(freqstr).interpolate()
+    return reduce_bins(df_out, freqstr)
+
+
+def format_pct(s):
+    """Returns series 's' formatted as percentage strings, ie. '12.34%'"""
+    return s.apply(lambda n: '{:,.2%}'.format(n))
+
+
+def stats_comparison(df_stats_pre, df_pct_null_pre, df_out):
+    """Returns 'df_comp' containing comparison of percent null and mean values
+    of source (pre-processed) and processed numeric columns.  This is used to
+    understand how/if processing significantly altered series values.
+    Processed statistics are found in a single pass over df_out (see stats.py)."""
+    stats_post = frame_column_stats(df_out)
+    df_stats_post = column_stats_frame(stats_post)
+    df_mean_comp = pd.concat([df_stats_pre.loc['mean'], df_stats_post.loc['mean',
+                                                            df_stats_pre.columns]],
+                             axis=1, keys=['Source Mean', 'Processed Mean']).round(2)
+    # relative change of the rounded means, as DataFrame.pct_change()
+    df_mean_comp['% Difference'] = format_pct((df_mean_comp['Processed Mean'] /
+                                               df_mean_comp['Source Mean'] - 1)\
+                                              .fillna(0).round(4))
+    df_pct_null_post = column_pct_null(stats_post)
+    df_pct_null_comp = pd.concat([format_pct(df_pct_null_pre).rename('% NaN - Source'),
+                                  format_pct(df_pct_null_post).rename('% NaN - Processed')],
+                                 axis=1)
+    return df_pct_null_comp.join(df_mean_comp).rename(index=remove_hourly_prefix)
+
+
+def remove_hourly_prefix(col_):
+    """Returns column name 'col_' with 'Hourly' prefix removed (display only)"""
+    return col_.replace('Hourly', '')
+
+
+def add_sunrise_sunset(df_out, col_date_values):
+    """Returns df_out with 'Sunrise' and 'Sunset' timestamp columns from the
+    (dates, timestamps) arrays in 'col_date_values'.  Each date's value is
+    placed at the record of df_out at midnight of that date and carried
+    forward to the following records with a searchsorted lookup."""
+    ns_out = df_out.index.asi8
+    for col_, (dates_, values_) in col_date_values.items():
+        # only dates that are records of df_out
+        filter_in = np.isin(dates_, ns_out)
+        dates_, values_ = dates_[filter_in], values_[filter_in]
+        if len(col_date_values[col_][0]) > 1 and len(dates_) > 0:
+            position = np.searchsorted(dates_, ns_out, side='right') - 1
+            ns = np.where(position >= 0, values_[np.maximum(position, 0)],
+                          np.datetime64('NaT').view('int64'))
+            df_out[col_] = ns.view('datetime64[ns]').astype('datetime64[s]')
+        else:
+            df_out[col_] = pd.NaT
+    return df_out
+
+
+def ingest_lcd_files(files_usecols, pct_null_timestamp_max=pct_null_timestamp_max,
+                     use_cache=False, trace_value=trace_value, files_offsets=None,
+                     compact=False, precedence=merge_precedence, read_workers=read_workers,
+                     engine=csv_engine, stats=True):
+    """Returns 'ingest' dictionary for the files in 'files_usecols' read entirely
+    in to memory (or only between the byte offsets of 'files_offsets', see
+    read_lcd_files()) by 'read_workers' processes with CSV 'engine' and the
+    dtypes of 'compact', and duplicate records of overlapping files resolved by
+    'precedence'.
+    'ingest' contains the
+    hourly resampled DataFrame 'df_out' (before interpolation) and the source
+    statistics, station id, date range and sunrise/sunset values needed by
+    process_lcd().  If not 'stats', the source statistics 'df_stats_pre' and
+    'df_pct_null_pre' are None (see -quiet)."""
+    df = read_lcd_files(files_usecols, use_cache, trace_value, files_offsets, compact,
+                        precedence, read_workers, engine)
+
+    # keep track of the count of raw timestamps prior to processing
+    n_records_raw = df.shape[0]
+    # track statistics by column prior to processing, omit 'Sunrise' & 'Sunset' from stats
+    with stage('stats', len(df)):
+        cols_numeric_stats = df.columns.difference(cols_sunrise_sunset + cols_date_station)
+        df_stats_pre = column_stats_frame(frame_column_stats(df, cols_numeric_stats)) \
+                       if stats else None
+
+    # use most frequent STATION id from df
+    station_lcd = str(df['STATION'].value_counts().index[0])
+    # precipitation of special reports is binned separately
+    df = split_precipitation(df)
+    # remove 'STATION', 'REPORT_TYPE', 'SOURCE' columns - not needed anymore
+    df = df.drop(columns=['STATION', 'REPORT_TYPE', 'SOURCE'], errors='ignore')
+
+    # create timestamps from consolidated table df
+    start_dt = df.index[0]
+    end_dt = df.index[-1]
+    # identify hourly timestamps where the LCD source reported no observations
+    idx_hours_no_source_data = pd.date_range(start_dt, end_dt, freq='H')\
+                                .difference(df.index.round('H'))
+
+    with stage('dedupe', len(df)) as record:
+        df = dedupe_timestamps(df)
+        record['rows_out'] = len(df)
+    with stage('sunrise sunset', len(df)):
+        col_date_values = extract_sunrise_sunset(df)
+    # drop sunrise/sunset columns as their information is now
+    # contained in col_date_values.
+    df = df.drop(columns=cols_sunrise_sunset, errors='ignore')
+    with stage('suspect filter', len(df)) as record:
+        df = filter_suspect_timestamps(df, pct_null_timestamp_max)
+        record['rows_out'] = len(df)
+    # what percentage of source data is null?
+    with stage('stats', len(df)):
+        df_pct_null_pre = column_pct_null(frame_column_stats(merge_precipitation(df))) \
+                          if stats else None
+    with stage('resample', len(df)) as record:
+        df_out = resample_hourly(df)
+        record['rows_out'] = len(df_out)
+
+    return {'df_out' : df_out,
+            'n_records_raw' : n_records_raw,
+            'df_stats_pre' : df_stats_pre,
+            'df_pct_null_pre' : df_pct_null_pre,
+            'station_lcd' : station_lcd,
+            'start_dt' : start_dt,
+            'end_dt' : end_dt,
+            'idx_hours_no_source_data' : idx_hours_no_source_data,
+            'col_date_values' : col_date_values}
+
+
+def chunksize_from_memory_limit(memory_limit_mb, n_columns):
+    """Returns number of rows per chunk so that a single parsed chunk of
+    'n_columns' columns stays within approximately 'memory_limit_mb' megabytes.
+    'chunk_bytes_per_value' is a conservative estimate of the memory used by one
+    parsed value including pandas' string parsing overhead."""
+    n_rows = int(memory_limit_mb * 1024**2 / (max(n_columns, 1) * chunk_bytes_per_value))
+    return max(n_rows, chunksize_min)
+
+
+def iter_lcd_file_chunks(file, cols_, chunksize, trace_value=trace_value, offsets=None,
+                         compact=False):
+    """Yields coerced DataFrames of 'chunksize' rows from time-sorted LCD 'file'
+    (or only its records between byte 'offsets' (start, end), if provided)
+    with the dtypes of 'compact' (see read_lcd_file()).
+    Records sharing the last timestamp of a chunk are held back and yielded with
+    the next chunk so that every timestamp is complete within a single chunk."""
+    carry = None
+    source = file if offsets is None else read_file_window(file, offsets)
+    reader = pd.read_csv(source, usecols=cols_, parse_dates=['DATE'],
+                         index_col='DATE', chunksize=chunksize,
+                         dtype=read_dtypes(cols_, compact))
+    while True:
+        with stage('csv read') as record:
+            chunk_ = next(reader, None)
+            record['rows_out'] = 0 if chunk_ is None else len(chunk_)
+        if chunk_ is None:
+            break
+        with stage('numeric coercion', len(chunk_)) as record:
+            chunk_ = coerce_numeric(chunk_, trace_value,
+                                    dtype_compact if compact else float).sort_index()
+            record['rows_out'] = len(chunk_)
+        if carry is not None:
+            chunk_ = pd.concat([carry, chunk_], axis=0)
+        filter_last = chunk_.index == chunk_.index[-1]
+        carry = chunk_.loc[filter_last]
+        if (~filter_last).any():
+            yield chunk_.loc[~filter_last]
+    if carry is not None:
+        yield carry
+
+
+def accumulate_lcd_chunks(files_usecols, chunksize, times_exclude=None,
+                          trace_value=trace_value, files_offsets=None, compact=False,
+                          precedence=merge_precedence, stats=True):
+    """Returns dictionary of running accumulators after a single streaming pass
+    over the files in 'files_usecols', which are merged in order of their first
+    timestamp (see plan_lcd_files() and merge_sorted_chunks()) with duplicate
+    records of overlapping files resolved by 'precedence'.  Records are binned
+    in to hourly sum and count accumulators as they are read so that memory
+    scales with the number of output hours rather than the number of source
+    records.  Records at
+    seconds-of-day in 'times_exclude' (boolean array, see
+    filter_suspect_timestamps()) are left out of the hourly and null accumulators.
+    Files in 'files_offsets' are read only between their byte offsets and
+    'compact' is as in read_lcd_file().  Source statistics are accumulated in
+    'stats_pre' (see stats.py) if 'stats'.  Precipitation of special reports
+    is binned in 'col_precipitation_special' (see split_precipitation())."""
+    files_offsets = files_offsets or {}
+    cols_numeric = sorted(set(col_ for cols_ in files_usecols.values() for col_ in cols_)\
+                          .difference(cols_sunrise_sunset + cols_date_station))
+    cols_binned = cols_numeric + ([col_precipitation_special] if 'HourlyPrecipitation'
+                                  in cols_numeric else [])
+    acc = {'n_records_raw' : 0, 'n_records' : 0,
+           'station_counts' : {}, 'start_dt' : None, 'end_dt' : None,
+           'stats_pre' : new_column_stats(cols_numeric),
+           'null_count' : pd.Series(0, index=cols_numeric, dtype=float),
+           'time_null_count' : np.zeros((n_seconds_day, len(cols_numeric)), dtype=np.int64),
+           'hourly_aggregates' : [], 'hours_source' : [],
+           'col_date_values' : {}}
+    chunk_iters = [iter_lcd_file_chunks(f_, cols_, chunksize, trace_value,
+                                        files_offsets.get(f_), compact)
+                   for f_, cols_ in files_usecols.items()]
+    for chunk_ in merge_sorted_chunks(chunk_iters, file_ranks(list(files_usecols), precedence),
+                                      precedence):
+        if chunk_.shape[0] < 1:
+            continue
+        chunk_ = chunk_.reindex(columns=chunk_.columns.union(cols_numeric))
+        acc['start_dt'] = chunk_.index[0] if acc['start_dt'] is None else \
+                            min(acc['start_dt'], chunk_.index[0])
+        acc['end_dt'] = chunk_.index[-1] if acc['end_dt'] is None else \
+                            max(acc['end_dt'], chunk_.index[-1])
+        acc['n_records_raw'] += chunk_.shape[0]
+        if 'STATION' in chunk_.columns:
+            for station_, n_ in chunk_['STATION'].astype(str).value_counts().items():
+                acc['station_counts'][station_] = acc['station_counts'].get(station_, 0) + n_
+        # source statistics before any processing
+        with stage('stats', len(chunk_)):
+            if stats:
+                update_column_stats(acc['stats_pre'], chunk_)
+            acc['hours_source'].append(chunk_.index.round('H').unique())
+
+        with stage('dedupe', len(chunk_)) as record:
+            chunk_ = dedupe_timestamps(split_precipitation(chunk_).drop(
+                        columns=['STATION', 'REPORT_TYPE', 'SOURCE'], errors='ignore'))
+            record['rows_out'] = len(chunk_)
+        with stage('sunrise sunset', len(chunk_)):
+            for col_, date_values_ in extract_sunrise_sunset(chunk_).items():
+                acc['col_date_values'].setdefault(col_, []).append(date_values_)
+        values_ = chunk_.reindex(columns=cols_binned)
+        with stage('suspect filter', len(values_)) as record:
+            # seconds-of-day used to identify suspect timestamps, precipitation
+            # is counted with its source values
+            time_ = seconds_of_day(values_.index)
+            values_source_ = merge_precipitation(values_)
+            acc['time_null_count'] += null_counts_by_code(
+                                  values_source_.to_numpy(dtype=float_dtype(values_source_)),
+                                                          time_, n_seconds_day)
+            if times_exclude is not None:
+                values_ = values_.loc[~times_exclude[time_]]
+                values_source_ = values_source_.loc[~times_exclude[time_]]
+            record['rows_out'] = len(values_)
+        acc['n_records'] += values_.shape[0]
+        acc['null_count'] += values_source_.isna().sum()
+        if values_.shape[0] > 0:
+            with stage('resample', len(values_)) as record:
+                # hours since epoch as bin codes shared by all chunks
+                codes_ = values_.index.asi8 // ns_hour
+                bins_aggregates_ = aggregate_sorted_bins(
+                                        values_.to_numpy(dtype=float_dtype(values_)),
+                                        codes_, column_reducers(cols_binned))
+                acc['hourly_aggregates'].append(bins_aggregates_)
+                record['rows_out'] = len(bins_aggregates_[0])
+    return acc
+
+
+def ingest_lcd_files_chunked(files_usecols, chunksize=chunksize_rows,
+                             pct_null_timestamp_max=pct_null_timestamp_max,
+                             trace_value=trace_value, files_offsets=None, compact=False,
+                             precedence=merge_precedence, stats=True):
+    """Returns 'ingest' dictionary (see ingest_lcd_files()) for the files in
+    'files_usecols' read in chunks of 'chunksize' rows.  Each file is expected
+    to be sorted by 'DATE', as delivered by NOAA.  If suspect timestamps are
+    found after the first pass, a second pass excludes them.  Files in
+    'files_offsets' are read only between their byte offsets (start, end),
+    'compact' is as in read_lcd_file(), 'precedence' as in read_lcd_files()
+    and 'stats' as in ingest_lcd_files()."""
+    acc = accumulate_lcd_chunks(files_usecols, chunksize, trace_value=trace_value,
+                                files_offsets=files_offsets, compact=compact,
+                                precedence=precedence, stats=stats)
+    if acc['n_records_raw'] < 1:
+        raise ValueError('No LCD records found in: ' +
+                         ', '.join(pathlib.Path(f_).name for f_ in files_usecols))
+    # suspect timestamps - same rule as filter_suspect_timestamps()
+    n_max_null = int(pct_null_timestamp_max * acc['n_records'])
+    filter_time_nan = (acc['time_null_count'] > n_max_null).all(axis=1)
+    if filter_time_nan.any():
+        acc = accumulate_lcd_chunks(files_usecols, chunksize, times_exclude=filter_time_nan,
+                                    trace_value=trace_value, files_offsets=files_offsets,
+                                    compact=compact, precedence=precedence, stats=stats)
+
+    df_stats_pre = column_stats_frame(acc['stats_pre']) if stats else None
+    df_pct_null_pre = acc['null_count'].divide(acc['n_records']).round(4) if stats else None
+
+    cols_binned = list(acc['null_count'].index) + \
+                  ([col_precipitation_special] if 'HourlyPrecipitation' in
+                   acc['null_count'].index else [])
+    with stage('resample') as record:
+        bins, aggregates = combine_aggregates(acc['hourly_aggregates'])
+        df_out = pd.DataFrame(finalize_aggregates(aggregates, column_reducers(cols_binned)),
+                              index=pd.DatetimeIndex(bins * ns_hour, name='DATE'),
+                              columns=cols_binned)
+        # same index treatment as resample_hourly()
+        df_out = merge_precipitation(trim_empty_records(df_out.dropna(how='all'))
+                                     .asfreq('H'))
+        record['rows_out'] = len(df_out)
+
+    start_dt = acc['start_dt']
+    end_dt = acc['end_dt']
+    hours_source = pd.DatetimeIndex(np.unique(np.concatenate(
+                    [idx_.values for idx_ in acc['hours_source']])))
+    idx_hours_no_source_data = pd.date_range(start_dt, end_dt, freq='H')\
+                                .difference(hours_source)
+    station_lcd = sorted(acc['station_counts'].items(), key=lambda x: x[1],
+                         reverse=True)[0][0]
+    return {'df_out' : df_out,
+            'n_records_raw' : acc['n_records_raw'],
+            'df_stats_pre' : df_stats_pre,
+            'df_pct_null_pre' : df_pct_null_pre,
+            'station_lcd' : station_lcd,
+            'start_dt' : start_dt,
+            'end_dt' : end_dt,
+            'idx_hours_no_source_data' : idx_hours_no_source_data,
+            'col_date_values' : {col_ : combine_date_values(date_values_) for
+                                 col_, date_values_ in acc['col_date_values'].items()}}
+
+
+def ingest_lcd(files, pct_null_timestamp_max=pct_null_timestamp_max, chunksize=None,
+               memory_limit_mb=None, use_cache=False, trace_value=trace_value,
+               start=None, end=None, compact=False, precedence=merge_precedence,
+               read_workers=read_workers, engine=csv_engine, stats=True):
+    """Returns 'ingest' dictionary (see ingest_lcd_files()) for the LCD file(s)
+    of a single station in list 'files' with the file plan 'manifest' (see
+    plan_lcd_files()) added.  Files are read in memory or, if 'chunksize' or
+    'memory_limit_mb' is provided, in chunks (see ingest_lcd_files_chunked()).
+    If datetime 'start' and / or 'end' is provided, only the records from
+    'start' to 'end' are read.  If 'compact', values are read as float32 (see
+    read_lcd_file()).  Records found in more than one file are taken from the
+    file that wins 'precedence' (see 'merge_precedence').  Files read in to
+    memory are read by 'read_workers' processes (see read_lcd_files()) with
+    CSV 'engine', or the 'default' engine if its package is not installed.
+    Files read in chunks always use the 'default' engine.  If not 'stats', the
+    source statistics are not found (see ingest_lcd_files())."""
+    engine = csv_engine_available(engine)
+    # files without records or valid columns are skipped and the rest are
+    # read in order of their first timestamp
+    with stage('file planning', len(files)) as record:
+        manifest = plan_lcd_files(files, start, end)
+        files_usecols = manifest_files_usecols(manifest)
+        files_offsets = {e_['file'] : e_['offsets'] for e_ in manifest
+                         if e_['file'] in files_usecols and e_['offsets'] is not None}
+        record['rows_out'] = len(files_usecols)
+    if len(files_usecols) < 1:
+        if start is not None or end is not None:
+            raise ValueError(f'No LCD records found in the requested dates in: '
+                             f'{", ".join(f_.name for f_ in files)}')
+        raise ValueError(f'No valid LCD files found in: {", ".join(f_.name for f_ in files)}')
+    if memory_limit_mb is not None and chunksize is None:
+        chunksize = chunksize_from_memory_limit(memory_limit_mb,
+                        max(len(cols_) for cols_ in files_usecols.values()))
+    if chunksize is None:
+        ingest = ingest_lcd_files(files_usecols, pct_null_timestamp_max, use_cache,
+                                  trace_value, files_offsets, compact, precedence,
+                                  read_workers, engine, stats)
+    else:
+        ingest = ingest_lcd_files_chunked(files_usecols, chunksize, pct_null_timestamp_max,
+                                          trace_value, files_offsets, compact, precedence,
+                                          stats)
+    ingest['manifest'] = manifest
+    return ingest
+
+
+def date_window(start=None, end=None):
+    """Returns tuple (start, stop) of Timestamps of the output window from date
+    'start' to date 'end' inclusive ('stop' is midnight after 'end').  Either
+    may be None for a window without a start or an end."""
+    start = None if start is None else pd.Timestamp(start).normalize()
+    stop = None if end is None else pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    return start, stop
+
+
+def trim_date_window(df_out, ingest, start=None, stop=None):
+    """Returns tuple (df_out, ingest) with the records of hourly 'df_out' and
+    the date range and hours without source data of 'ingest' limited to the
+    window from 'start' up to 'stop' (see date_window())"""
+    df_out = df_out.loc[start : None if stop is None else stop - pd.Timedelta(1, 'ns')]
+    if len(df_out) < 1:
+        raise ValueError('No LCD records found in the requested dates')
+    idx_ = ingest['idx_hours_no_source_data']
+    ingest = dict(ingest,
+                  start_dt=ingest['start_dt'] if start is None else max(ingest['start_dt'], start),
+                  end_dt=ingest['end_dt'] if stop is None else
+                         min(ingest['end_dt'], stop - pd.Timedelta(1, 'ns')),
+                  idx_hours_no_source_data=idx_[((idx_ >= start) if start is not None else True) &
+                                                ((idx_ < stop) if stop is not None else True)])
+    return df_out, ingest
+
+
+def format_output(df_out, ingest):
+    """Returns processed df_out rounded to 2 decimal places with the sunrise /
+    sunset and 'No source data' columns of 'ingest' added and 'Hourly' removed
+    from column names"""
+    # Round df_out to 2 decimal places, float32 values (-compact) are converted
+    # to float64 first so that ie. 29.92 is not written as 29.920000076293945
+    df_out = df_out.astype(float).round(2)
+    df_out = add_sunrise_sunset(df_out, ingest['col_date_values'])
+    # add column to document hourly obervations where no source data was provided.
+    df_out['No source data'] = df_out.index.isin(ingest['idx_hours_no_source_data'])
+    # remove 'hourly' from names
+    return df_out.rename(columns=remove_hourly_prefix)
+
+
+def process_lcd(files, freqstr=freqstr, max_records_to_interpolate=max_records_to_interpolate,
+                pct_null_timestamp_max=pct_null_timestamp_max, chunksize=None,
+                memory_limit_mb=None, use_cache=False, trace_value=trace_value,
+                start=None, end=None, compact=False, precedence=merge_precedence,
+                read_workers=read_workers, engine=csv_engine, stats=True):
+    """Returns tuple (df_out, report) for the LCD file(s) of a single station in
+    list 'files'.  'df_out' is the cleaned, interpolated output at frequency
+    'freqstr' and 'report' is a dictionary containing station details, date
+    range, the source vs processed statistics table 'df_comp' and the table of
+    gaps in the hourly values before interpolation 'df_gaps' (see gaps.py).
+    If 'chunksize' or 'memory_limit_mb' is provided, files are read in chunks
+    with bounded memory (see ingest_lcd_files_chunked()).  If 'use_cache', parsed
+    files are loaded from and saved to the on-disk parse cache (not used when
+    reading in chunks).  Trace precipitation 'T' is replaced with 'trace_value'.
+    If date 'start' and / or 'end' is provided, the output is limited to the
+    dates from 'start' to 'end' inclusive and only the records of those dates
+    plus 'window_padding_hours' and 'max_records_to_interpolate' hours either
+    side (for interpolation at the edges) are read from the files.
+    If 'compact', values are processed as float32 (about half the memory) and
+    converted back to float64 only to format the output (see format_output()).
+    Records with the same 'DATE' and 'REPORT_TYPE' in more than one file are
+    taken from the file that wins 'precedence' (see 'merge_precedence').  If
+    'read_workers' is more than 1, files are read concurrently by that many
+    processes (not when reading in chunks).  Files are read with CSV 'engine'
+    ('default' or 'pyarrow', see readers.py).  If not 'stats' (see -quiet), the
+    source vs processed statistics are not found and 'df_comp' is None.
+    Example Usage:  df_out, report = process_lcd([pathlib.Path('3876540.csv')])"""
+    hourly = process_hourly(files, max_records_to_interpolate, pct_null_timestamp_max,
+                            chunksize, memory_limit_mb, use_cache, trace_value, start, end,
+                            compact, precedence, read_workers, engine, stats)
+    return frequency_output(hourly, freqstr)
+
+
+def process_hourly(files, max_records_to_interpolate=max_records_to_interpolate,
+                   pct_null_timestamp_max=pct_null_timestamp_max, chunksize=None,
+                   memory_limit_mb=None, use_cache=False, trace_value=trace_value,
+                   start=None, end=None, compact=False, precedence=merge_precedence,
+                   read_workers=read_workers, engine=csv_engine, stats=True):
+    """Returns 'hourly' dictionary of the LCD file(s) of a single station in
+    list 'files', the hourly base from which the output of any frequency is
+    derived (see frequency_output()):
+    'df_out' - cleaned, interpolated hourly values limited to the dates from
+               'start' to 'end'
+    'ingest' - details needed to format df_out (see ingest_lcd_files())
+    'df_gaps' - table of gaps in the hourly values before interpolation
+    'files', 'station_details' and 'stats' - as needed by the report
+    Arguments are as in process_lcd()."""
+    files = [pathlib.Path(f_) for f_ in files]
+    start, stop = date_window(start, end)
+    padding = pd.Timedelta(hours=max_records_to_interpolate + window_padding_hours)
+    ingest = ingest_lcd(files, pct_null_timestamp_max, chunksize, memory_limit_mb,
+                        use_cache, trace_value,
+                        start=None if start is None else (start - padding).to_pydatetime(),
+                        end=None if stop is None else (stop + padding).to_pydatetime(),
+                        compact=compact, precedence=precedence, read_workers=read_workers,
+                        engine=engine, stats=stats)
+
+    with stage('station lookup'):
+        station_details = station_details_lookup(ingest['station_lcd'])
+    with stage('interpolation', len(ingest['df_out'])) as record:
+        df_out, df_gaps = interpolate_short_gaps(ingest['df_out'],
+                                                 max_records_to_interpolate)
+        record['rows_out'] = len(df_out)
+    if start is not None or stop is not None:
+        with stage('date window', len(df_out)) as record:
+            df_out, ingest = trim_date_window(df_out, ingest, start, stop)
+            record['rows_out'] = len(df_out)
+    return {'files' : files,
+            'df_out' : df_out,
+            'ingest' : ingest,
+            'df_gaps' : trim_gap_table(df_gaps, df_out),
+            'station_details' : station_details,
+            'stats' : stats}
+
+
+def frequency_output(hourly, freqstr=freqstr):
+    """Returns tuple (df_out, report) (see process_lcd()) of hourly base
+    'hourly' (see process_hourly()) resampled to 'freqstr'.  'hourly' is not
+    modified, so that it can be resampled to other frequencies."""
+    ingest = hourly['ingest']
+    with stage('frequency resample', len(hourly['df_out'])) as record:
+        df_out = resample_frequency(hourly['df_out'], freqstr)
+        record['rows_out'] = len(df_out)
+    df_comp = None
+    if hourly['stats']:
+        with stage('stats', len(df_out)):
+            df_comp = stats_comparison(ingest['df_stats_pre'], ingest['df_pct_null_pre'],
+                                       df_out)
+    with stage('format output', len(df_out)) as record:
+        df_out = format_output(df_out, ingest)
+        record['rows_out'] = len(df_out)
+
+    report = {'files_lcd_input' : hourly['files'],
+              'station_lcd' : ingest['station_lcd'],
+              'station_details' : hourly['station_details'],
+              'start_str' : ingest['start_dt'].strftime('%Y-%m-%d'),
+              'end_str' : ingest['end_dt'].strftime('%Y-%m-%d'),
+              'freqstr' : freqstr,
+              'n_records_raw' : ingest['n_records_raw'],
+              'n_hours_no_source_data' : len(ingest['idx_hours_no_source_data']),
+              'df_comp' : df_comp,
+              'df_gaps' : hourly['df_gaps']}
+    return df_out, report
+
+
+def process_lcd_frequencies(files, freqstrs, **process_kwargs):
+    """Returns list of tuples (df_out, report) (see process_lcd()), one for
+    each frequency in list 'freqstrs' (ie. ['H', '15T', 'D']) of the LCD
+    file(s) of a single station in list 'files'.  The files are read, cleaned
+    and interpolated once and every frequency is resampled from the same
+    hourly base (see process_hourly()).  Every frequency is checked before the
+    files are read.  'process_kwargs' are as in process_lcd().
+    Example Usage:
+    outputs = process_lcd_frequencies([pathlib.Path('3876540.csv')], ['H', 'D'])"""
+    for freqstr_ in freqstrs:
+        check_frequency(freqstr_)
+    hourly = process_hourly(files, **process_kwargs)
+    return [frequency_output(hourly, freqstr_) for freqstr_ in freqstrs]
+
+
+def output_file_name(report, file_format=output_format):
+    """Returns output file name for 'report' returned by process_lcd() with the
+    file extension of 'file_format' (see 'output_formats').
+    STATION NAME is revised to permit save to disk on typical OS."""
+    name_ = file_output_format.format(
+                STATION_NAME = slugify(report['station_details']['STATION NAME']),
+                start_str = report['start_str'],
+                end_str = report['end_str'],
+                freqstr = report['freqstr'])
+    return name_[:-len('.csv')] + output_formats[file_format]
+
+
+def profile_file_name(file_out):
+    """Returns path of the -profile JSON report saved next to output 'file_out'"""
+    file_out = pathlib.Path(file_out)
+    extension_ = output_formats[file_format_from_name(file_out)]
+    return file_out.with_name(file_out.name[:-len(extension_)] + file_profile_extension)
+
+
+def gaps_file_name(file_out):
+    """Returns path of the -gaps CSV table saved next to output 'file_out'"""
+    file_out = pathlib.Path(file_out)
+    extension_ = output_formats[file_format_from_name(file_out)]
+    return file_out.with_name(file_out.name[:-len(extension_)] + file_gaps_extension)
+
+
+def write_gap_table(df_gaps, file_gaps):
+    """Saves gap table 'df_gaps' (see process_lcd()) to csv 'file_gaps' and
+    returns 'file_gaps'"""
+    df_gaps.to_csv(file_gaps, index=False)
+    return file_gaps
+
+
+def write_output(df_out, file_out):
+    """Saves df_out to 'file_out' in the output format identified by the file
+    extension of 'file_out' (see formats.py) and returns 'file_out'"""
+    with stage('write', len(df_out)) as record:
+        write_output_file(df_out, file_out)
+        record['rows_out'] = len(df_out)
+    assert pathlib.Path(file_out).is_file()
+    return file_out
+
+
+def write_outputs(dfs_files, write_workers=None):
+    """Returns list of the output files after saving every tuple (df_out,
+    file_out) of list 'dfs_files' (see write_output()).  If more than one file
+    is saved, they are written concurrently on a pool of 'write_workers'
+    threads (default is one per file, up to the number of CPUs).  Threads
+    share the DataFrames rather than copying them to other processes, and the
+    compression and file writes release the GIL."""
+    n_workers = min(write_workers or os.cpu_count() or 1, len(dfs_files))
+    if n_workers < 2:
+        return [write_output(df_, file_) for df_, file_ in dfs_files]
+    # stages run in the worker threads are not profiled, only the whole write
+    with stage('concurrent write', sum(len(df_) for df_, file_ in dfs_files)) as record:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as executor:
+            files_out = list(executor.map(write_output_file, *zip(*dfs_files)))
+        record['rows_out'] = sum(len(df_) for df_, file_ in dfs_files)
+    assert all(pathlib.Path(file_).is_file() for file_ in files_out)
+    return files_out
+
+
+def print_station_details(station_details):
+    """Prints station details, excluding station lifetime BEGIN, END history
+    dates which could cause confusion."""
+    station_details_exclude = ['BEGIN', 'END']
+    print('--------------------------------------------')
+    print('------ ISD Weather Station Properties ------')
+    print('--------------------------------------------')
+    for k_, v_ in station_details.items():
+        if k_ not in station_details_exclude:
+            print("{:<15} {:<10}".format(k_, v_))
+    print('\n')
+
+
+def print_report(report):
+    """Prints source vs processed statistics table contained in 'report'"""
+    print(message_pct_null_data.format(
+                files_lcd_input_names_str = "\n".join([f_.name for f_ in
+                                                report['files_lcd_input']]),
+                start_str = report['start_str'],
+                end_str = report['end_str']))
+    print('----------------------------------------------------------------')
+    print('---- Percent Null Values by Column:  Source vs Processed ------')
+    print('----------------------------------------------------------------')
+    print(report['df_comp'])
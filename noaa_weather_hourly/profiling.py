@@ -0,0 +1,123 @@
+# profiling.py
+# noaa_weather_hourly
+# Per-stage instrumentation of a processing run (-profile).  Pipeline stages
+# are wrapped in stage(), which records the wall time, CPU time, peak resident
+# memory (RSS) and rows in / out of the stage while a profile is active (see
+# start_profile()).  Stages that run more than once (ie. once per file or per
+# chunk) are added together.  stage() does nothing when no profile is active.
+import contextlib
+import datetime
+import json
+import platform
+import sys
+import time
+try:
+    import resource
+except ImportError:
+    # 'resource' is not available on Windows, peak RSS is not reported
+    resource = None
+
+# profile dictionary of the current run, None if not profiling
+active_profile = None
+
+
+def peak_rss_mb():
+    """Returns peak resident memory of this process in megabytes since it
+    started, or None if not available on this OS"""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(maxrss / (1024**2 if sys.platform == 'darwin' else 1024), 1)
+
+
+def start_profile():
+    """Starts recording stage() measurements in a new active profile"""
+    global active_profile
+    active_profile = {'stages' : {},
+                      'time_start' : time.perf_counter(),
+                      'cpu_start' : time.process_time()}
+
+
+def stop_profile():
+    """Returns 'profile' dictionary of the active profile and stops recording:
+    'stages' - dictionary of measurements by stage name, in order of first use
+    'total' - wall time, CPU time and peak RSS of the whole profiled run"""
+    global active_profile
+    profile, active_profile = active_profile, None
+    if profile is None:
+        return None
+    return {'stages' : profile['stages'],
+            'total' : {'wall_s' : round(time.perf_counter() - profile['time_start'], 4),
+                       'cpu_s' : round(time.process_time() - profile['cpu_start'], 4),
+                       'peak_rss_mb' : peak_rss_mb()}}
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    """Context manager measuring pipeline stage 'name' in the active profile.
+    Yields dictionary 'record' in which the stage can set 'rows_in' and
+    'rows_out'.  Example Usage:
+    with stage('resample', len(df)) as record:
+        df_out = resample_hourly(df)
+        record['rows_out'] = len(df_out)"""
+    record = {'rows_in' : rows_in, 'rows_out' : None}
+    if active_profile is None:
+        yield record
+        return
+    time_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        stage_ = active_profile['stages'].setdefault(name, {'calls' : 0,
+                        'wall_s' : 0.0, 'cpu_s' : 0.0, 'peak_rss_mb' : None,
+                        'rows_in' : None, 'rows_out' : None})
+        stage_['calls'] += 1
+        stage_['wall_s'] = round(stage_['wall_s'] + time.perf_counter() - time_start, 4)
+        stage_['cpu_s'] = round(stage_['cpu_s'] + time.process_time() - cpu_start, 4)
+        stage_['peak_rss_mb'] = peak_rss_mb()
+        for key_ in ['rows_in', 'rows_out']:
+            if record[key_] is not None:
+                stage_[key_] = (stage_[key_] or 0) + int(record[key_])
+
+
+def profile_report(profile, report=None, file_out=None):
+    """Returns JSON-serializable dictionary of 'profile' (see stop_profile())
+    with the run details of 'report' (see process_lcd()) and 'file_out'"""
+    run = {'created' : datetime.datetime.now().isoformat(timespec='seconds'),
+           'python' : platform.python_version(),
+           'platform' : platform.platform()}
+    if report is not None:
+        run.update({'station_lcd' : report['station_lcd'],
+                    'files_lcd_input' : [str(f_) for f_ in report['files_lcd_input']],
+                    'start' : report['start_str'],
+                    'end' : report['end_str'],
+                    'freqstr' : report['freqstr'],
+                    'n_records_raw' : int(report['n_records_raw'])})
+    if file_out is not None:
+        run['file_out'] = str(file_out)
+    return {'run' : run, 'stages' : profile['stages'], 'total' : profile['total']}
+
+
+def write_profile(profile_report, file_profile):
+    """Saves 'profile_report' (see profile_report()) to JSON 'file_profile'
+    and returns 'file_profile'"""
+    with open(file_profile, 'w') as outfile:
+        json.dump(profile_report, outfile, indent=1)
+    return file_profile
+
+
+def print_profile(profile):
+    """Prints table of the stage measurements in 'profile'"""
+    format_ = lambda v_, f_ : '' if v_ is None else format(v_, f_)
+    print('----------------------------------------------------------------')
+    print('------------------ Processing Time by Stage -------------------')
+    print('----------------------------------------------------------------')
+    print(f'{"stage":<20}{"calls":>6}{"wall s":>9}{"cpu s":>9}{"peak MB":>9}'
+          f'{"rows in":>11}{"rows out":>11}')
+    for name_, s_ in list(profile['stages'].items()) + [('total', profile['total'])]:
+        print(f'{name_:<20}{format_(s_.get("calls"), "d"):>6}{s_["wall_s"]:>9.3f}'
+              f'{s_["cpu_s"]:>9.3f}{format_(s_["peak_rss_mb"], ".1f"):>9}'
+              f'{format_(s_.get("rows_in"), ",d"):>11}{format_(s_.get("rows_out"), ",d"):>11}')
+    print('\n')
@@ -0,0 +1,65 @@
+# readers.py
+# noaa_weather_hourly
+# CSV readers of LCD files (-engine).  'default' is the pandas C parser.
+# 'pyarrow' is the multithreaded Arrow CSV reader:  only the used columns are
+# converted and 'DATE' is parsed natively as a timestamp.  pyarrow is an
+# optional package and is imported only when the 'pyarrow' engine is used (see
+# check_csv_engine() in discovery.py).  Both engines return the same DataFrame
+# for coerce_numeric(), so the processed output does not depend on the engine.
+import io
+import pandas as pd
+# import modules specific to this package
+from .config import *
+
+
+def header_columns(source):
+    """Returns list of the column names in the header line of csv 'source' (a
+    file path or the BytesIO returned by read_file_window()).  Repeated names
+    are numbered as read_csv() does (ie. the second 'REPORT_TYPE' column of LCD
+    v1 files is 'REPORT_TYPE.1')."""
+    if isinstance(source, io.BytesIO):
+        line = source.getvalue().split(b'\n', 1)[0].decode()
+    else:
+        with open(source, 'r') as infile:
+            line = infile.readline()
+    # the header line alone is parsed by read_csv() for the same column names
+    return pd.read_csv(io.StringIO(line), nrows=0).columns.tolist()
+
+
+def read_csv_arrow(source, cols_):
+    """Returns DataFrame of columns 'cols_' of csv 'source' (in the order of the
+    file, as read_csv() does) with a 'DATE' index, read with the pyarrow CSV
+    reader.  Measurement and sunrise / sunset columns are read as text, as
+    Arrow infers column types from the first block of a file only and a later
+    qualified value (ie. '0.06s') would fail to convert.  Measurement values are
+    parsed by coerce_numeric() as with the C parser.  Station and report type
+    columns are inferred (ie. integer v1 'STATION' ids) as read_csv() does."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    column_names = header_columns(source)
+    cols_read = [col_ for col_ in column_names if col_ in cols_]
+    column_types = {col_ : pa.string() for col_ in cols_read if col_ not in cols_date_station}
+    column_types['DATE'] = pa.timestamp('ns')
+    table = pa_csv.read_csv(source,
+                            read_options=pa_csv.ReadOptions(column_names=column_names,
+                                                            skip_rows=1),
+                            convert_options=pa_csv.ConvertOptions(
+                                include_columns=cols_read, column_types=column_types,
+                                strings_can_be_null=True))
+    df = table.to_pandas().set_index('DATE')
+    # HHMM values are numbers (see extract_sunrise_sunset())
+    for col_ in df.columns.intersection(cols_sunrise_sunset):
+        df[col_] = pd.to_numeric(df[col_], errors='coerce')
+    return df
+
+
+def read_lcd_csv(source, cols_, dtype=None, engine=csv_engine):
+    """Returns DataFrame of columns 'cols_' of LCD csv 'source' (a file path or a
+    file object) with a 'DATE' index, read with CSV 'engine' ('default' or
+    'pyarrow', see 'csv_engines').  'dtype' is a dictionary of read_csv()
+    dtypes by column, or None."""
+    if engine == 'pyarrow':
+        df = read_csv_arrow(source, cols_)
+        return df if dtype is None else df.astype(dtype)
+    return pd.read_csv(source, usecols=cols_, parse_dates=['DATE'], index_col='DATE',
+                       low_memory=False, dtype=dtype)
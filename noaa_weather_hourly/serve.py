@@ -0,0 +1,262 @@
+# serve.py
+# noaa_weather_hourly
+# Local HTTP query service (-serve).  Processed station data is served from a
+# directory of LCD files:
+# GET /stations - JSON of the station keys (see group_station_files()) and
+#                 their LCD file names
+# GET /station/{key}?start=YYYY-MM-DD&end=YYYY-MM-DD&freq=H&format=csv
+#               - processed output of the station, the same as the output file
+#                 of process_lcd() with the same arguments.  'format' is 'csv'
+#                 (default) or 'arrow' (Arrow IPC stream, requires pyarrow).
+# The station's hourly base (the interpolated hourly values and the 'ingest'
+# details needed to format them, see hourly_base()) is processed once and kept
+# in an in-memory LRU frame cache of up to 'serve_cache_mb' megabytes.  Each
+# request limits the cached hourly base to its dates, resamples it to its
+# frequency and formats it, so the same station can be queried for other
+# dates or frequencies without reading its LCD files again.  A cached station
+# is processed again if any of its files is added, modified or removed.
+# Responses are written in blocks of 'serve_chunk_rows' rows as they are
+# formatted.
+import collections
+import datetime
+import http.server
+import json
+import os
+import threading
+import urllib.parse
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+from .pipeline import *
+from .formats import csv_text
+
+# arguments of process_lcd() that are used to create the hourly base
+ingest_kwargs_names = ['pct_null_timestamp_max', 'chunksize', 'memory_limit_mb', 'use_cache',
+                       'trace_value', 'compact', 'precedence', 'read_workers', 'engine']
+
+
+def files_signature(files):
+    """Returns tuple of (path, size, modified time in ns) of every file of 'files'"""
+    return tuple((str(f_), f_.stat().st_size, f_.stat().st_mtime_ns) for f_ in files)
+
+
+def frame_bytes(value):
+    """Returns approximate bytes used by the DataFrames, Series, Indexes and
+    NumPy arrays in 'value', including those in nested dictionaries, lists
+    and tuples (ie. the 'col_date_values' arrays of an 'ingest' dictionary)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(frame_bytes(v_) for v_ in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(frame_bytes(v_) for v_ in value)
+    return 0
+
+
+def hourly_base(files, max_records_to_interpolate=max_records_to_interpolate,
+                **ingest_kwargs):
+    """Returns 'ingest' dictionary (see ingest_lcd()) of the LCD 'files' of a
+    station with 'df_out' interpolated (see interpolate_gaps()), the hourly
+    base of every query of the station.  Source statistics are not found, as
+    responses have no report.  'ingest_kwargs' are passed on to ingest_lcd()."""
+    ingest = ingest_lcd(files, stats=False, **ingest_kwargs)
+    ingest['df_out'] = interpolate_gaps(ingest['df_out'], max_records_to_interpolate)
+    ingest['station_details'] = station_details_lookup(ingest['station_lcd'])
+    return ingest
+
+
+def new_frame_cache(limit_mb=serve_cache_mb):
+    """Returns empty 'frame_cache' dictionary of up to 'limit_mb' megabytes:
+    'entries' - OrderedDict of (files signature, ingest, bytes) by station key,
+                least recently used first
+    'bytes' - total bytes of the entries
+    'pending' - dictionary of threading.Event by key of the stations being
+                processed, set once processing completes
+    'lock' - lock held while 'entries' or 'pending' is read or changed (not
+             while a station is processed)"""
+    return {'entries' : collections.OrderedDict(),
+            'pending' : {},
+            'bytes' : 0,
+            'limit_bytes' : int(limit_mb * 1024**2),
+            'hits' : 0,
+            'misses' : 0,
+            'lock' : threading.Lock()}
+
+
+def cached_hourly_base(frame_cache, key, files, process_kwargs):
+    """Returns tuple (ingest, hit) of the hourly base (see hourly_base()) of
+    station 'key' with LCD 'files' from 'frame_cache', processed and added to
+    the cache if it is not cached or if its files changed.  Stations are
+    processed outside of the cache lock, so requests of other stations are not
+    held up, and only once at a time:  requests of a station that is being
+    processed wait for it and then look it up again.  Least recently used
+    stations are removed while the cache is over its limit (the newest entry
+    is always kept).  'hit' is True if the hourly base was cached."""
+    signature = files_signature(files)
+    entries = frame_cache['entries']
+    while True:
+        with frame_cache['lock']:
+            if key in entries and entries[key][0] == signature:
+                entries.move_to_end(key)
+                frame_cache['hits'] += 1
+                return entries[key][1], True
+            event_ = frame_cache['pending'].get(key)
+            if event_ is None:
+                frame_cache['pending'][key] = threading.Event()
+                break
+        event_.wait()
+    try:
+        ingest = hourly_base(files, process_kwargs.get('max_records_to_interpolate',
+                                                       max_records_to_interpolate),
+                             **{k_ : v_ for k_, v_ in process_kwargs.items()
+                                if k_ in ingest_kwargs_names})
+        n_bytes = frame_bytes(ingest)
+        with frame_cache['lock']:
+            if key in entries:
+                frame_cache['bytes'] -= entries.pop(key)[2]
+            entries[key] = (signature, ingest, n_bytes)
+            frame_cache['bytes'] += n_bytes
+            frame_cache['misses'] += 1
+            while frame_cache['bytes'] > frame_cache['limit_bytes'] and len(entries) > 1:
+                frame_cache['bytes'] -= entries.popitem(last=False)[1][2]
+    finally:
+        # wake the requests waiting for this station, also if processing failed
+        with frame_cache['lock']:
+            frame_cache['pending'].pop(key).set()
+    return ingest, False
+
+
+def query_output(ingest, start=None, end=None, freqstr=freqstr):
+    """Returns tuple (df_out, report) of hourly base 'ingest' (see
+    hourly_base()) limited to the dates from 'start' to 'end' inclusive and
+    resampled to 'freqstr', as returned by process_lcd().  'report' holds the
+    details needed by output_file_name()."""
+    start, stop = date_window(start, end)
+    df_out = ingest['df_out']
+    if start is not None or stop is not None:
+        df_out, ingest = trim_date_window(df_out, ingest, start, stop)
+    df_out = format_output(resample_frequency(df_out, freqstr), ingest)
+    report = {'station_details' : ingest['station_details'],
+              'start_str' : ingest['start_dt'].strftime('%Y-%m-%d'),
+              'end_str' : ingest['end_dt'].strftime('%Y-%m-%d'),
+              'freqstr' : freqstr}
+    return df_out, report
+
+
+def iter_csv_blocks(df_out, chunk_rows=serve_chunk_rows):
+    """Yields bytes of the CSV text of df_out (see csv_text()) in blocks of at
+    least 'chunk_rows' rows.  The last block takes the remaining rows, so that
+    no block is short enough to format its timestamps differently from the
+    whole file (ie. a block of only midnight timestamps)."""
+    n_blocks = max(len(df_out) // chunk_rows, 1)
+    for i_ in range(n_blocks):
+        text_ = csv_text(df_out.iloc[i_ * chunk_rows :
+                                     None if i_ == n_blocks - 1 else (i_ + 1) * chunk_rows])
+        yield (text_ if i_ == 0 else text_.split(os.linesep, 1)[1]).encode()
+
+
+def write_arrow_stream(df_out, outfile, chunk_rows=serve_chunk_rows):
+    """Writes df_out (with 'DATE' as the first column, as in 'feather' output
+    files) to file object 'outfile' as an Arrow IPC stream of record batches
+    of up to 'chunk_rows' rows.  Requires pyarrow."""
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df_out.reset_index(), preserve_index=False)
+    with pa.ipc.new_stream(outfile, table.schema) as writer:
+        writer.write_table(table, max_chunksize=chunk_rows)
+
+
+class StationRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Handles GET requests of the query service.  The directory of LCD files,
+    frame cache and process_lcd() arguments are attributes of the server (see
+    make_server())."""
+
+    def send_body_headers(self, content_type, file_name=None, cache_hit=None):
+        """Sends status 200 and the headers of a response body"""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if file_name is not None:
+            self.send_header('Content-Disposition', f'attachment; filename="{file_name}"')
+        if cache_hit is not None:
+            self.send_header('X-Cache', 'hit' if cache_hit else 'miss')
+        self.end_headers()
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [p_ for p_ in url.path.split('/') if p_ != '']
+        station_files = group_station_files(discover_lcd_files(self.server.dir_source))
+        if parts == ['stations']:
+            self.send_body_headers('application/json')
+            self.wfile.write(json.dumps({k_ : [f_.name for f_ in files_] for k_, files_
+                                         in sorted(station_files.items())}).encode())
+            return
+        if len(parts) != 2 or parts[0] != 'station':
+            self.send_error(404, 'Use /stations or /station/{key}?start=&end=&freq=&format=')
+            return
+        key = urllib.parse.unquote(parts[1])
+        if key not in station_files:
+            self.send_error(404, f'Unknown station "{key}", see /stations')
+            return
+        query = {k_ : v_[-1] for k_, v_ in urllib.parse.parse_qs(url.query).items()}
+        try:
+            start, end = [None if query.get(name_) in [None, ''] else
+                          datetime.date.fromisoformat(query[name_]) for name_ in ['start', 'end']]
+            freqstr_ = query.get('freq') or freqstr
+            check_frequency(freqstr_)
+        except ValueError as e:
+            self.send_error(400, f'Invalid query: {e}')
+            return
+        format_ = query.get('format', 'csv')
+        if format_ not in serve_formats:
+            self.send_error(400, f'Unknown format "{format_}", use one of: '
+                                 f'{", ".join(serve_formats)}')
+            return
+        if format_ == 'arrow':
+            try:
+                check_csv_engine('pyarrow')
+            except ImportError as e:
+                self.send_error(501, str(e))
+                return
+        try:
+            ingest, hit = cached_hourly_base(self.server.frame_cache, key,
+                                             station_files[key], self.server.process_kwargs)
+            df_out, report = query_output(ingest, start, end, freqstr_)
+        except ValueError as e:
+            # ie. no records between start and end
+            self.send_error(404, str(e))
+            return
+        except Exception as e:
+            # ie. a corrupt LCD file - the service keeps serving other requests
+            self.log_error('Processing station "%s" failed: %r', key, e)
+            self.send_error(500, f'Processing station "{key}" failed: {type(e).__name__}')
+            return
+        file_name = output_file_name(report)
+        if format_ == 'arrow':
+            self.send_body_headers(serve_formats[format_],
+                                   file_name[:-len('.csv')] + '.arrows', hit)
+            write_arrow_stream(df_out, self.wfile)
+        else:
+            self.send_body_headers(serve_formats[format_], file_name, hit)
+            for block_ in iter_csv_blocks(df_out):
+                self.wfile.write(block_)
+
+
+def make_server(dir_source, host=serve_host, port=serve_port, cache_mb=serve_cache_mb,
+                **process_kwargs):
+    """Returns ThreadingHTTPServer (not yet serving) of the query service for
+    the LCD files in 'dir_source' on 'host' and 'port' (port 0 picks a free
+    port, see server.server_address) with a frame cache of 'cache_mb'
+    megabytes.  'process_kwargs' (ie. max_records_to_interpolate, compact) are
+    used to process every station.
+    Example Usage:
+    server = make_server(pathlib.Path('lcd'), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()"""
+    server = http.server.ThreadingHTTPServer((host, port), StationRequestHandler)
+    server.dir_source = pathlib.Path(dir_source)
+    server.frame_cache = new_frame_cache(cache_mb)
+    server.process_kwargs = process_kwargs
+    return server
@@ -0,0 +1,105 @@
+# stations.py
+# noaa_weather_hourly
+# Station details lookup using the compact station index 'isd-history-index.json'
+# stored in the package 'data' directory.  The index holds the newest
+# 'isd-history.csv' record for every WBAN and CALL id and is loaded with the
+# json module only (no pandas) the first time a station is looked up.
+# The index is created from 'isd-history.csv' by write_station_index(), which
+# is called by 'ISD History Station Table.py' or by running:
+# $ python -m noaa_weather_hourly.stations
+import functools
+import importlib.resources
+import json
+import pathlib
+# import modules specific to this package
+from .config import *
+from .utils import google_maps_url
+
+
+def read_isd_history_csv(file):
+    """Returns 'df_isd_history' station table from 'file' sorted by USAF and
+    BEGIN with a 5-character string WBAN index.  Requires pandas."""
+    import pandas as pd
+    df_isd_history = pd.read_csv(file, index_col='WBAN').sort_values(
+                by=['USAF', 'BEGIN'], ascending=[True, False])
+    # ensure WBAN index is a 5-character string
+    df_isd_history.index = df_isd_history.index.astype(str).str.zfill(5)
+    return df_isd_history
+
+
+def build_station_index(df_isd_history):
+    """Returns 'station_index' dictionary created from 'df_isd_history'
+    (see read_isd_history_csv()) containing:
+    'columns' - column names of the station records, starting with 'WBAN'
+    'records' - list of station records
+    'wban' / 'call' - dictionaries with WBAN / CALL id as key and the position
+    in 'records' of the record with the latest END date as value.
+    The '99999' WBAN placeholder of non-USA stations is not indexed so that
+    those stations are located by CALL."""
+    df = df_isd_history.reset_index()
+    # newest record first, ties keep USAF / BEGIN order of df_isd_history
+    df = df.sort_values('END', ascending=False, kind='stable', na_position='last')
+    df_wban = df.loc[df['WBAN'] != wban_missing].drop_duplicates('WBAN')
+    df_call = df.dropna(subset=['CALL']).drop_duplicates('CALL')
+    idx_records = df_wban.index.union(df_call.index)
+    position = {idx_ : n_ for n_, idx_ in enumerate(idx_records)}
+    records = [[v_.item() if hasattr(v_, 'item') else v_ for v_ in row_]
+               for row_ in df.loc[idx_records].itertuples(index=False)]
+    return {'columns' : df.columns.tolist(),
+            'records' : records,
+            'wban' : {wban_ : position[idx_] for idx_, wban_ in df_wban['WBAN'].items()},
+            'call' : {call_ : position[idx_] for idx_, call_ in df_call['CALL'].items()}}
+
+
+def write_station_index(path_csv, path_index):
+    """Creates compact station index file 'path_index' from the
+    'isd-history.csv' file 'path_csv' and returns 'path_index'"""
+    station_index = build_station_index(read_isd_history_csv(path_csv))
+    with open(path_index, 'w') as outfile:
+        json.dump(station_index, outfile, separators=(',', ':'))
+    return path_index
+
+
+@functools.lru_cache(maxsize=None)
+def load_station_index(file=file_isd_history_index):
+    """Returns 'station_index' dictionary (see build_station_index()) stored in
+    the package 'data' directory.  The index is read once per process."""
+    if hasattr(importlib.resources, 'files'):
+        text_ = importlib.resources.files(__package__).joinpath('data')\
+                    .joinpath(file).read_text(encoding='utf-8')
+    else:
+        # Python 3.8, where read_text() is not yet deprecated
+        text_ = importlib.resources.read_text(f'{__package__}.data', file)
+    return json.loads(text_)
+
+
+def station_details_lookup(station_lcd):
+    """Returns 'station_details' dictionary of ISD station properties for
+    LCD station id 'station_lcd'.  The station is located by WBAN (v1) or
+    CALL (v2, needed for non-USA locations with 99999 WBAN).  All values are
+    'Unknown' if the station is not listed in 'isd-history.csv'."""
+    station_index = load_station_index()
+    # v1 - identify WBAN station - this is index for the isd-history table
+    station_wban = station_lcd[6:]
+    # v2 - identify CALL station  - needed for non-USA locations with 99999 WBAN
+    station_call = station_lcd[-4:]
+    if station_wban in station_index['wban']:
+        station_details = dict(zip(station_index['columns'],
+                    station_index['records'][station_index['wban'][station_wban]]))
+    elif station_call in station_index['call']:
+        station_details = dict(zip(station_index['columns'],
+                    station_index['records'][station_index['call'][station_call]]))
+    else:
+        # if station_lcd has no reference in isd-history...create empty dictionary
+        station_details = {col_ : 'Unknown' for col_ in station_index['columns'][1:]}
+    # add google maps url to LAT LON
+    if station_details['LAT'] != 'Unknown':
+        station_details['GOOGLE MAP'] = google_maps_url(station_details['LAT'],
+                                                        station_details['LON'])
+    return station_details
+
+
+if __name__ == '__main__':
+    # re-create the station index in the package 'data' directory
+    dir_data = pathlib.Path(__file__).parent / 'data'
+    write_station_index(dir_data / file_isd_history, dir_data / file_isd_history_index)
@@ -0,0 +1,72 @@
+# stats.py
+# noaa_weather_hourly
+# Column statistics of the source vs processed report (see stats_comparison()
+# in pipeline.py).  Statistics are kept in a 'column_stats' accumulator of the
+# record count and the per column count of values, sum, minimum and maximum,
+# which are found in a single vectorized pass over the values (no quantiles,
+# so no column is sorted).  An accumulator is updated chunk by chunk (see
+# accumulate_lcd_chunks()), so the statistics of data read in parts are the
+# same as those of the whole.
+import numpy as np
+import pandas as pd
+# import modules specific to this package
+from .config import *
+from .binning import float_dtype
+
+
+def new_column_stats(cols):
+    """Returns empty 'column_stats' accumulator of columns 'cols':
+    'cols' - list of the column names
+    'n_records' - number of records
+    'count' - number of non-null values by column
+    'sum' - sum of the non-null values by column
+    'min' / 'max' - minimum / maximum value by column (NaN if no values)"""
+    n_cols = len(cols)
+    return {'cols' : list(cols),
+            'n_records' : 0,
+            'count' : np.zeros(n_cols, dtype=np.int64),
+            'sum' : np.zeros(n_cols, dtype=float),
+            'min' : np.full(n_cols, np.nan),
+            'max' : np.full(n_cols, np.nan)}
+
+
+def update_column_stats(column_stats, df):
+    """Returns 'column_stats' accumulator (see new_column_stats()) updated in
+    place with the records of DataFrame df.  Columns of the accumulator that
+    are not in df are counted as null values."""
+    df = df.reindex(columns=column_stats['cols'])
+    # one row per column, so that each column is summed as a contiguous array
+    # (pairwise summation, as Series.mean())
+    values = np.ascontiguousarray(df.to_numpy(dtype=float_dtype(df)).T)
+    filter_valid = ~np.isnan(values)
+    column_stats['n_records'] += values.shape[1]
+    column_stats['count'] += filter_valid.sum(axis=1)
+    column_stats['sum'] += np.where(filter_valid, values, 0).sum(axis=1)
+    if values.shape[1] > 0:
+        # fmin() / fmax() ignore NaN values
+        column_stats['min'] = np.fmin(column_stats['min'], np.fmin.reduce(values, axis=1))
+        column_stats['max'] = np.fmax(column_stats['max'], np.fmax.reduce(values, axis=1))
+    return column_stats
+
+
+def frame_column_stats(df, cols=None):
+    """Returns 'column_stats' accumulator of columns 'cols' (default all) of df"""
+    return update_column_stats(new_column_stats(df.columns if cols is None else cols), df)
+
+
+def column_stats_frame(column_stats):
+    """Returns 'df_stats' DataFrame of 'column_stats' with rows 'count', 'mean',
+    'min' and 'max' (as DataFrame.describe()) and a column per column"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = column_stats['sum'] / column_stats['count']
+    return pd.DataFrame([column_stats['count'].astype(float), mean,
+                         column_stats['min'], column_stats['max']],
+                        index=['count', 'mean', 'min', 'max'], columns=column_stats['cols'])
+
+
+def column_pct_null(column_stats):
+    """Returns Series of the fraction of null values by column of
+    'column_stats', rounded to 4 decimal places"""
+    n_null = column_stats['n_records'] - column_stats['count']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.Series(n_null / column_stats['n_records'], index=column_stats['cols']).round(4)
@@ -0,0 +1,80 @@
+# test_append.py
+# noaa_weather_hourly
+# Incremental update of an existing hourly output file (-append, see
+# append.py) compared with processing every LCD file again.
+import os
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly.append import append_lcd, read_processed_output
+from noaa_weather_hourly.config import max_records_to_interpolate
+from noaa_weather_hourly.pipeline import process_lcd, write_output
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+
+
+def split_lcd_file_by_date(file, dir_out, date_split):
+    """Returns tuple of LCD files (before, from) saved to 'dir_out' with the
+    records of LCD 'file' before and from 'date_split' (YYYY-MM-DD), as the
+    files of consecutive years of a station"""
+    lines = pathlib.Path(file).read_text().splitlines(keepends=True)
+    header, records = lines[0], lines[1:]
+    i_date = header.split(',').index('DATE')
+    files = (pathlib.Path(dir_out) / 'LCD_before.csv', pathlib.Path(dir_out) / 'LCD_from.csv')
+    files[0].write_text(header + ''.join(r_ for r_ in records
+                                         if r_.split(',')[i_date] < date_split))
+    files[1].write_text(header + ''.join(r_ for r_ in records
+                                         if r_.split(',')[i_date] >= date_split))
+    return files
+
+
+def set_mtime(file, seconds):
+    os.utime(file, (seconds, seconds))
+
+
+@pytest.fixture
+def files(tmp_path):
+    """Returns tuple (file_old, file_new, file_out) of the v2 sample split on
+    2023-02-01 and the output of file_old, saved after file_old and before
+    file_new was modified"""
+    file_old, file_new = split_lcd_file_by_date(dir_data / 'LCD_USW00014939_2020.csv',
+                                                tmp_path, '2023-02-01')
+    file_out = tmp_path / 'output.csv'
+    df_out, report = process_lcd([file_old])
+    write_output(df_out, file_out)
+    for file_, seconds_ in [(file_old, 1_000_000_000), (file_out, 1_500_000_000),
+                            (file_new, 2_000_000_000)]:
+        set_mtime(file_, seconds_)
+    return file_old, file_new, file_out
+
+
+def test_append_matches_full_run(files, tmp_path):
+    """Appending the new file gives the output of processing both files
+    except within 'max_records_to_interpolate' hours of the seam, where the
+    existing values were interpolated without the new records"""
+    file_old, file_new, file_out = files
+    df_append, report = append_lcd(file_out, [file_old, file_new])
+    assert report['files_lcd_input'] == [file_new]
+    df_full, report_full = process_lcd([file_old, file_new])
+    # compare both as saved to and read from an output file
+    for df_, name_ in [(df_append, 'append.csv'), (df_full, 'full.csv')]:
+        write_output(df_, tmp_path / name_)
+    df_append = read_processed_output(tmp_path / 'append.csv')
+    df_full = read_processed_output(tmp_path / 'full.csv')
+    pd.testing.assert_index_equal(df_append.index, df_full.index)
+    start_new = pd.Timestamp('2023-02-01')
+    window = pd.Timedelta(hours=max_records_to_interpolate)
+    filter_seam = (df_full.index >= start_new - window) & (df_full.index < start_new + window)
+    assert filter_seam.sum() == 2 * max_records_to_interpolate
+    pd.testing.assert_frame_equal(df_append.loc[~filter_seam], df_full.loc[~filter_seam])
+
+
+def test_append_skips_files_older_than_output(files):
+    """Files modified before the output was saved are not processed and the
+    output is up to date when no file is newer"""
+    file_old, file_new, file_out = files
+    df_append, report = append_lcd(file_out, [file_old, file_new])
+    assert report['files_lcd_input'] == [file_new]
+    assert df_append.index[0] == read_processed_output(file_out).index[0]
+    set_mtime(file_new, 1_200_000_000)
+    assert append_lcd(file_out, [file_old, file_new]) == (None, None)
@@ -0,0 +1,60 @@
+# test_batch.py
+# noaa_weather_hourly
+# Batch processing of every station in a directory (-batch, see batch.py)
+# where one LCD file is corrupt.
+import pathlib
+import shutil
+import pytest
+from noaa_weather_hourly.__main__ import __main__
+from noaa_weather_hourly.batch import process_batch
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+
+
+def corrupt_records(lines):
+    """Returns LCD file text of 'lines' with records in the middle of the file
+    replaced by binary garbage, so that the first and last records are valid"""
+    n_fields = lines[0].count(',') + 1
+    garbage = '\x00\x01garbage' + ',' * (n_fields - 1) + '\n'
+    return ''.join(lines[:500] + [garbage] * 20 + lines[520:])
+
+
+@pytest.fixture(params=['garbage file', 'garbage records'])
+def dir_source(request, tmp_path):
+    """Returns directory with the v1 sample and a corrupt v1 file '1234567.csv'"""
+    dir_source = tmp_path / 'source'
+    dir_source.mkdir()
+    shutil.copy(dir_data / '3876540.csv', dir_source)
+    file_corrupt = dir_source / '1234567.csv'
+    if request.param == 'garbage file':
+        file_corrupt.write_bytes(b'STATION,NAME\n\x00\x01garbage,"unclosed\n')
+    else:
+        lines = (dir_data / '3876540.csv').read_text().splitlines(keepends=True)
+        file_corrupt.write_text(corrupt_records(lines))
+    return dir_source
+
+
+def test_batch_reports_corrupt_file(dir_source, tmp_path):
+    """The corrupt station is reported in the summary and the output of the
+    valid station is still written"""
+    dir_out = tmp_path / 'out'
+    dir_out.mkdir()
+    df_summary = process_batch(dir_source, dir_out, workers=2)
+    assert list(df_summary.index) == ['1234567', '3876540']
+    assert df_summary.loc['1234567', 'error'] is not None
+    assert df_summary.loc['1234567', 'file_out'] is None
+    assert df_summary.loc['3876540', 'error'] is None
+    files_out = list(dir_out.iterdir())
+    assert [f_.name for f_ in files_out] == [df_summary.loc['3876540', 'file_out']]
+    assert files_out[0].stat().st_size > 0
+
+
+def test_batch_command_line(dir_source, tmp_path, monkeypatch, capsys):
+    """-batch prints the error of the corrupt station in its summary table"""
+    monkeypatch.chdir(tmp_path)
+    __main__(['-batch', '-filename', str(dir_source / '3876540.csv'), '-workers', '2'])
+    out = capsys.readouterr().out
+    summary = out[out.index('Batch processing summary'):]
+    line_corrupt = next(l_ for l_ in summary.splitlines() if l_.startswith('1234567 '))
+    assert 'Error: ' in line_corrupt
+    assert len(list(tmp_path.glob('*.csv'))) == 1
@@ -0,0 +1,47 @@
+# test_binning.py
+# noaa_weather_hourly
+# Per-column reducers of repeated timestamps and hourly bins (binning.py).
+import numpy as np
+import pandas as pd
+import pytest
+from noaa_weather_hourly.binning import dedupe_sorted_timestamps, reduce_bins
+
+
+def records(rows):
+    """Returns DataFrame of 'rows' (time, wind direction, gust speed,
+    precipitation) with a sorted 'DATE' index on 2020-01-01"""
+    return pd.DataFrame([r_[1:] for r_ in rows],
+                        columns=['HourlyWindDirection', 'HourlyWindGustSpeed',
+                                 'HourlyPrecipitation'],
+                        index=pd.DatetimeIndex([f'2020-01-01 {r_[0]}' for r_ in rows],
+                                               name='DATE'))
+
+
+def test_dedupe_uses_column_reducers():
+    """Repeated timestamps give the circular mean of wind directions (350 and
+    10 give 0, not 180), the maximum gust speed and the mean precipitation"""
+    df = dedupe_sorted_timestamps(records([('00:52', 350.0, 20.0, 0.1),
+                                           ('00:52', 10.0, 30.0, 0.1),
+                                           ('01:52', 90.0, np.nan, np.nan)]))
+    assert len(df) == 2
+    # 0 may come out as 360 less a rounding error
+    assert (df['HourlyWindDirection'].iloc[0] + 180) % 360 - 180 == pytest.approx(0.0, abs=1e-6)
+    assert df['HourlyWindGustSpeed'].iloc[0] == 30.0
+    assert df['HourlyPrecipitation'].iloc[0] == pytest.approx(0.1)
+    assert df['HourlyWindDirection'].iloc[1] == 90.0
+
+
+def test_hourly_wind_direction_with_repeated_timestamps():
+    """The hourly circular mean of a repeated 350 / 10 timestamp and a 20
+    degree observation in the same hour is 10, not 100"""
+    df = dedupe_sorted_timestamps(records([('00:20', 20.0, np.nan, np.nan),
+                                           ('00:52', 350.0, np.nan, np.nan),
+                                           ('00:52', 10.0, np.nan, np.nan)]))
+    df_hourly = reduce_bins(df, 'H')
+    assert df_hourly['HourlyWindDirection'].iloc[0] == pytest.approx(10.0)
+
+
+def test_unique_timestamps_unchanged():
+    """A frame without repeated timestamps is returned as it is"""
+    df = records([('00:52', 350.0, 20.0, 0.1), ('01:52', 10.0, 30.0, 0.1)])
+    assert dedupe_sorted_timestamps(df) is df
@@ -0,0 +1,58 @@
+# test_cache.py
+# noaa_weather_hourly
+# Parse cache (cache.py) and its -cache / -no_cache command line options.
+import importlib.metadata
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly import cache
+from noaa_weather_hourly.__main__ import parse_args, __main__
+
+file_v1 = pathlib.Path(__file__).parents[1] / 'data' / '3876540.csv'
+
+
+def test_cache_is_opt_in():
+    """The command line only uses the parse cache with -cache"""
+    assert not parse_args([]).cache
+    assert parse_args(['--cache']).cache
+    assert parse_args(['--cache', '--no-cache']).no_cache
+
+
+def test_cache_round_trip(tmp_path, monkeypatch):
+    """A cached DataFrame is read back and the cache directory is private"""
+    monkeypatch.setenv(cache.env_cache_dir, str(tmp_path / 'cache'))
+    df = pd.DataFrame({'HourlyWindSpeed' : [1.0, 2.0]})
+    cache.cache_write(file_v1, ['HourlyWindSpeed'], df)
+    pd.testing.assert_frame_equal(cache.cache_read(file_v1, ['HourlyWindSpeed']), df)
+    assert (tmp_path / 'cache').stat().st_mode & 0o077 == 0
+
+
+def test_cache_key_includes_versions(monkeypatch):
+    """Entries written by another package or cache format version are not read"""
+    key_ = cache.cache_key(file_v1, ['HourlyWindSpeed'])
+    monkeypatch.setattr(cache, 'package_version', lambda: '0.0.0')
+    assert cache.cache_key(file_v1, ['HourlyWindSpeed']) != key_
+    monkeypatch.undo()
+    monkeypatch.setattr(cache, 'cache_format_version', -1)
+    assert cache.cache_key(file_v1, ['HourlyWindSpeed']) != key_
+
+
+def test_package_version():
+    """The version is that of the installed package metadata (pyproject.toml
+    / setup.py), and 'unknown' in a source tree that is not installed"""
+    try:
+        expected = importlib.metadata.version('noaa_weather_hourly')
+    except importlib.metadata.PackageNotFoundError:
+        expected = 'unknown'
+    assert cache.package_version() == expected
+
+
+@pytest.mark.parametrize('argv, n_entries', [([], 0), (['--cache'], 1),
+                                             (['--cache', '--no-cache'], 0),
+                                             (['-no_cache', '-cache'], 0)])
+def test_cache_options(argv, n_entries, tmp_path, monkeypatch):
+    """Only -cache writes parse cache entries and -no_cache overrides it"""
+    monkeypatch.setenv(cache.env_cache_dir, str(tmp_path / 'cache'))
+    monkeypatch.chdir(tmp_path)
+    __main__(['-filename', str(file_v1), '-quiet'] + argv)
+    assert len(list((tmp_path / 'cache').glob('*.pkl'))) == n_entries
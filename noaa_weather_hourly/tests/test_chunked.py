@@ -0,0 +1,63 @@
+# test_chunked.py
+# noaa_weather_hourly
+# Chunked ingestion (-chunked, -memory_limit, see ingest_lcd_files_chunked())
+# gives the same output and statistics as reading the files in to memory.
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly import pipeline
+from noaa_weather_hourly.pipeline import process_lcd
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+
+
+def split_lcd_file(file, dir_out, n_files, overlap=0):
+    """Returns list of 'n_files' LCD files saved to 'dir_out' with the records
+    of LCD 'file' split in to consecutive date ranges, each file repeating the
+    first 'overlap' records of the next file"""
+    lines = pathlib.Path(file).read_text().splitlines(keepends=True)
+    header, records = lines[0], lines[1:]
+    size = len(records) // n_files + 1
+    files = []
+    for i_ in range(n_files):
+        file_ = pathlib.Path(dir_out) / f'{pathlib.Path(file).stem}_{i_}.csv'
+        file_.write_text(header + ''.join(records[i_ * size : (i_ + 1) * size + overlap]))
+        files.append(file_)
+    return files
+
+
+@pytest.mark.parametrize('file, overlap', [('3876540.csv', 0), ('3876540.csv', 25),
+                                           ('LCD_USW00014939_2020.csv', 40)])
+@pytest.mark.parametrize('kwargs', [{'chunksize' : 200}, {'memory_limit_mb' : 0.01}])
+def test_chunked_matches_in_memory(file, overlap, kwargs, tmp_path):
+    """Output, statistics and gaps of three (overlapping) files of a sample
+    read in small chunks are those of the in-memory run"""
+    files = split_lcd_file(dir_data / file, tmp_path, 3, overlap)
+    df_out, report = process_lcd(files)
+    df_out_chunked, report_chunked = process_lcd(files, **kwargs)
+    pd.testing.assert_frame_equal(df_out_chunked, df_out)
+    pd.testing.assert_frame_equal(report_chunked['df_comp'], report['df_comp'])
+    pd.testing.assert_frame_equal(report_chunked['df_gaps'], report['df_gaps'])
+    assert report_chunked['n_records_raw'] == report['n_records_raw']
+
+
+def test_chunked_second_pass(tmp_path, monkeypatch):
+    """The v1 '23:59' summary records (52 records without hourly values) are
+    suspect timestamps with -pct_null_timestamp_max 0.02, found after the first
+    pass over the chunks and excluded by a second pass, as in memory"""
+    calls = []
+    accumulate_lcd_chunks = pipeline.accumulate_lcd_chunks
+
+    def accumulate_spy(*args, **kwargs):
+        calls.append(kwargs.get('times_exclude'))
+        return accumulate_lcd_chunks(*args, **kwargs)
+    monkeypatch.setattr(pipeline, 'accumulate_lcd_chunks', accumulate_spy)
+    files = split_lcd_file(dir_data / '3876540.csv', tmp_path, 2)
+    df_out_chunked, report_chunked = process_lcd(files, chunksize=300,
+                                                 pct_null_timestamp_max=0.02)
+    assert len(calls) == 2 and calls[0] is None
+    # the excluded time of day is 23:59
+    assert list(calls[1].nonzero()[0]) == [23 * 3600 + 59 * 60]
+    df_out, report = process_lcd(files, pct_null_timestamp_max=0.02)
+    pd.testing.assert_frame_equal(df_out_chunked, df_out)
+    pd.testing.assert_frame_equal(report_chunked['df_comp'], report['df_comp'])
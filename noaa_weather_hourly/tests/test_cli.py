@@ -0,0 +1,61 @@
+# test_cli.py
+# noaa_weather_hourly
+# Command line options that can not be combined halt before any processing
+# and options are only checked when they are used.
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import pytest
+from noaa_weather_hourly.__main__ import __main__
+
+dir_package = pathlib.Path(__file__).parents[2]
+
+
+@pytest.mark.parametrize('argv, message', [
+    (['-batch', '-append', 'out.csv'], '-append is not available with -batch'),
+    (['-batch', '-start', '2020-01-01'], '-start and -end are not available with -batch'),
+    (['-batch', '-end', '2020-01-31'], '-start and -end are not available with -batch'),
+    (['-serve', '.', '-start', '2020-01-01'], '-start and -end are not available with -serve'),
+    (['-serve', '.', '-end', '2020-01-31'], '-start and -end are not available with -serve')])
+def test_batch_rejects_append_and_date_window(argv, message, tmp_path, monkeypatch, capsys):
+    """-batch with -append, -start or -end and -serve with -start or -end
+    print a message and write nothing (the service is not started)"""
+    monkeypatch.chdir(tmp_path)
+    __main__(argv)
+    assert message in capsys.readouterr().out
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_plan_does_not_check_output_format(tmp_path):
+    """-plan with -format parquet runs without importing pyarrow (in a fresh
+    interpreter, as other tests import it)"""
+    shutil.copy(dir_package / 'noaa_weather_hourly' / 'data' / '3876540.csv', tmp_path)
+    code_ = ("import sys\n"
+             "from noaa_weather_hourly.__main__ import __main__\n"
+             "__main__(['-plan', '-format', 'parquet'])\n"
+             "print('pyarrow' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code_], cwd=tmp_path, capture_output=True,
+                            text=True, env=dict(os.environ, PYTHONPATH=str(dir_package)))
+    assert result.returncode == 0, result.stderr
+    assert '3876540.csv' in result.stdout
+    assert result.stdout.strip().splitlines()[-1] == 'False'
+
+
+@pytest.mark.parametrize('argv', [['-quiet'], ['--no-report']])
+def test_quiet_prints_station_details(argv, tmp_path, monkeypatch, capsys):
+    """-quiet still prints the station details and only leaves out the
+    statistics table, and the output file is the same"""
+    file_v1 = dir_package / 'noaa_weather_hourly' / 'data' / '3876540.csv'
+    outs, files_out = [], []
+    for name_, argv_ in [('report', []), ('quiet', argv)]:
+        (tmp_path / name_).mkdir()
+        monkeypatch.chdir(tmp_path / name_)
+        __main__(['-filename', str(file_v1)] + argv_)
+        outs.append(capsys.readouterr().out)
+        files_out += list((tmp_path / name_).glob('*.csv'))
+    assert ['ISD Weather Station Properties' in out_ for out_ in outs] == [True, True]
+    assert ['Percent Null Values by Column' in out_ for out_ in outs] == [True, False]
+    assert len(files_out) == 2 and files_out[0].name == files_out[1].name
+    assert files_out[0].read_bytes() == files_out[1].read_bytes()
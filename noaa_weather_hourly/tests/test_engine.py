@@ -0,0 +1,68 @@
+# test_engine.py
+# noaa_weather_hourly
+# The 'pyarrow' CSV engine (-engine pyarrow, see readers.py) returns the same
+# DataFrames and output as the 'default' pandas reader on the bundled LCD v1
+# and v2 sample files.
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly.pipeline import process_lcd, read_files_columns, \
+        validate_files_usecols, read_lcd_file
+from noaa_weather_hourly.readers import read_lcd_csv
+
+pytest.importorskip('pyarrow')
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+files_samples = ['3876540.csv', 'LCD_USW00014939_2020.csv']
+
+
+def files_usecols(file):
+    """Returns dictionary of the columns to read from LCD 'file'"""
+    return validate_files_usecols(read_files_columns([dir_data / file]))
+
+
+def assert_same_frame(df, df_reference):
+    """Asserts DataFrame 'df' has the same index, columns and values as
+    'df_reference'.  'STATION' ids are compared as text, the pyarrow reader
+    reads v2 ids of digits only as integers."""
+    assert list(df.columns) == list(df_reference.columns)
+    pd.testing.assert_frame_equal(df.drop(columns='STATION'),
+                                  df_reference.drop(columns='STATION'))
+    assert (df['STATION'].astype(str) == df_reference['STATION'].astype(str)).all()
+
+
+@pytest.mark.parametrize('file', files_samples)
+def test_read_lcd_csv_engines_match(file):
+    """Raw csv reads of both engines have the same index, columns and values.
+    The engines infer column types differently (ie. 1002 or 1002.0), so
+    numbers are compared as numbers and other values as text."""
+    for file_, cols_ in files_usecols(file).items():
+        df = read_lcd_csv(file_, cols_, engine='pyarrow')
+        df_reference = read_lcd_csv(file_, cols_, engine='default')
+        assert df.index.equals(df_reference.index)
+        assert list(df.columns) == list(df_reference.columns)
+        for col_ in df.columns:
+            numbers_ = pd.to_numeric(df[col_].astype(str), errors='coerce')
+            numbers_reference_ = pd.to_numeric(df_reference[col_].astype(str), errors='coerce')
+            pd.testing.assert_series_equal(numbers_, numbers_reference_)
+            filter_text = numbers_.isna() & df[col_].notna()
+            assert (df.loc[filter_text, col_].astype(str) ==
+                    df_reference.loc[filter_text, col_].astype(str)).all()
+            assert (df[col_].isna() == df_reference[col_].isna()).all()
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('file', files_samples)
+def test_read_lcd_file_engines_match(file, compact):
+    """Coerced DataFrames of both engines are the same"""
+    for file_, cols_ in files_usecols(file).items():
+        assert_same_frame(read_lcd_file(file_, cols_, compact=compact, engine='pyarrow'),
+                          read_lcd_file(file_, cols_, compact=compact, engine='default'))
+
+
+@pytest.mark.parametrize('file', files_samples)
+def test_process_lcd_engines_match(file):
+    """process_lcd() output is the same with both engines"""
+    df_out, report = process_lcd([dir_data / file], engine='pyarrow')
+    df_out_reference, report_reference = process_lcd([dir_data / file], engine='default')
+    pd.testing.assert_frame_equal(df_out, df_out_reference)
@@ -0,0 +1,54 @@
+# test_frequencies.py
+# noaa_weather_hourly
+# Several output frequencies from one processing of the LCD files
+# (-frequency H,15T,D, see process_lcd_frequencies()) compared with a
+# separate run for each frequency.
+import gzip
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly.pipeline import process_lcd, process_lcd_frequencies, \
+    write_output, write_outputs
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+freqstrs = ['H', '15T', 'D', 'M']
+
+
+@pytest.mark.parametrize('file', ['3876540.csv', 'LCD_USW00014939_2020.csv'])
+def test_frequencies_match_separate_runs(file):
+    """Every frequency has the output and report of process_lcd() at that
+    frequency"""
+    outputs = process_lcd_frequencies([dir_data / file], freqstrs)
+    assert [report_['freqstr'] for df_, report_ in outputs] == freqstrs
+    for freqstr_, (df_out_, report_) in zip(freqstrs, outputs):
+        df_out, report = process_lcd([dir_data / file], freqstr=freqstr_)
+        pd.testing.assert_frame_equal(df_out_, df_out)
+        pd.testing.assert_frame_equal(report_['df_comp'], report['df_comp'])
+        pd.testing.assert_frame_equal(report_['df_gaps'], report['df_gaps'])
+        assert report_['n_hours_no_source_data'] == report['n_hours_no_source_data']
+
+
+def test_frequencies_invalid_before_read(tmp_path):
+    """An invalid frequency is reported before the (missing) files are read"""
+    with pytest.raises(ValueError):
+        process_lcd_frequencies([tmp_path / 'missing.csv'], ['H', 'not a frequency'])
+
+
+@pytest.mark.parametrize('name', ['{}.csv', '{}.csv.gz'])
+def test_write_outputs_matches_write_output(name, tmp_path):
+    """The files written concurrently are those written one at a time"""
+    outputs = process_lcd_frequencies([dir_data / '3876540.csv'], freqstrs)
+    (tmp_path / 'pool').mkdir()
+    (tmp_path / 'single').mkdir()
+    files_out = write_outputs([(df_, tmp_path / 'pool' / name.format(report_['freqstr']))
+                               for df_, report_ in outputs])
+    assert files_out == [tmp_path / 'pool' / name.format(f_) for f_ in freqstrs]
+    for df_, report_ in outputs:
+        file_ = write_output(df_, tmp_path / 'single' / name.format(report_['freqstr']))
+        file_pool = tmp_path / 'pool' / file_.name
+        if name.endswith('.gz'):
+            # the gzip header holds the time the file was written
+            assert gzip.decompress(file_pool.read_bytes()) == \
+                gzip.decompress(file_.read_bytes())
+        else:
+            assert file_pool.read_bytes() == file_.read_bytes()
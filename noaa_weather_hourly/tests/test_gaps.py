@@ -0,0 +1,85 @@
+# test_gaps.py
+# noaa_weather_hourly
+# Gap-aware interpolation (gaps.py) on hand-built hourly columns.
+import numpy as np
+import pandas as pd
+from noaa_weather_hourly.gaps import interpolate_short_gaps
+
+nan = np.nan
+index = pd.date_range('2020-01-01', periods=10, freq='H')
+max_ = 3
+
+
+def gaps_frame():
+    """Returns DataFrame of 10 hourly records with a gap of 'max_' records,
+    a gap of 'max_' + 1 records, leading and trailing gaps and an all NaN
+    column"""
+    return pd.DataFrame({
+        'exact' : [0.0, nan, nan, nan, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0],
+        'longer' : [0.0, nan, nan, nan, nan, 5.0, 6.0, 7.0, 8.0, 9.0],
+        'edges' : [nan, nan, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, nan, nan],
+        'empty' : [nan] * 10}, index=index)
+
+
+def test_gap_of_max_records_is_filled():
+    """A gap of exactly 'max_records_to_interpolate' records is interpolated
+    linearly in time"""
+    df_filled, df_gaps = interpolate_short_gaps(gaps_frame(), max_)
+    np.testing.assert_array_equal(df_filled['exact'].to_numpy(), np.arange(10.0))
+
+
+def test_gap_longer_than_max_records_is_left_empty():
+    """A gap one record longer than 'max_records_to_interpolate' is left NaN in
+    full, not filled for its first 'max_records_to_interpolate' records"""
+    df_filled, df_gaps = interpolate_short_gaps(gaps_frame(), max_)
+    assert df_filled['longer'].iloc[1:5].isna().all()
+    pd.testing.assert_series_equal(df_filled['longer'].dropna(),
+                                   gaps_frame()['longer'].dropna())
+
+
+def test_leading_and_trailing_gaps():
+    """A gap at the start of a column is not filled and a short gap at the end
+    of a column is filled with its last value"""
+    df_filled, df_gaps = interpolate_short_gaps(gaps_frame(), max_)
+    assert df_filled['edges'].iloc[:2].isna().all()
+    assert (df_filled['edges'].iloc[-2:] == 7.0).all()
+
+
+def test_all_nan_column():
+    """A column without values is left NaN and listed as one gap"""
+    df_filled, df_gaps = interpolate_short_gaps(gaps_frame(), max_)
+    assert df_filled['empty'].isna().all()
+    assert len(df_gaps.loc[df_gaps['column'] == 'empty']) == 1
+
+
+def test_matches_dataframe_interpolate():
+    """Filled values are those of DataFrame.interpolate(method='time') on the
+    gaps that are filled"""
+    df = gaps_frame()[['exact', 'edges']]
+    df_filled, df_gaps = interpolate_short_gaps(df, max_)
+    df_expected = df.interpolate(method='time')
+    df_expected.iloc[:2, 1] = nan
+    pd.testing.assert_frame_equal(df_filled, df_expected)
+
+
+def test_gap_table():
+    """The gap table lists every gap by column, first and last timestamp,
+    length in records and whether it was interpolated"""
+    df_filled, df_gaps = interpolate_short_gaps(gaps_frame(), max_)
+    df_expected = pd.DataFrame({
+        'column' : ['exact', 'longer', 'edges', 'edges', 'empty'],
+        'start' : index[[1, 1, 0, 8, 0]],
+        'end' : index[[3, 4, 1, 9, 9]],
+        'length' : [3, 4, 2, 2, 10],
+        'interpolated' : [True, False, False, True, False]})
+    assert list(df_gaps.columns) == ['column', 'start', 'end', 'length', 'interpolated']
+    pd.testing.assert_frame_equal(df_gaps, df_expected, check_dtype=False)
+
+
+def test_no_gaps():
+    """A frame without NaN values is returned unchanged with an empty gap table"""
+    df = pd.DataFrame({'a' : np.arange(10.0)}, index=index)
+    df_filled, df_gaps = interpolate_short_gaps(df, max_)
+    pd.testing.assert_frame_equal(df_filled, df)
+    assert df_gaps.empty
+    assert list(df_gaps.columns) == ['column', 'start', 'end', 'length', 'interpolated']
@@ -0,0 +1,110 @@
+# test_merge.py
+# noaa_weather_hourly
+# Merging the records of overlapping LCD files of a station (merge.py) with
+# each 'merge_precedence' rule, in memory and chunk by chunk.
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from noaa_weather_hourly.merge import file_ranks, merge_sorted_frames, merge_sorted_chunks
+
+
+def lcd_frame(records):
+    """Returns DataFrame with a 'DATE' index of 'records' (time, REPORT_TYPE,
+    value) on 2020-01-01"""
+    return pd.DataFrame({'REPORT_TYPE' : [r_[1] for r_ in records],
+                         'HourlyDryBulbTemperature' : [float(r_[2]) for r_ in records]},
+                        index=pd.DatetimeIndex([f'2020-01-01 {r_[0]}' for r_ in records],
+                                               name='DATE'))
+
+
+# the file that starts first (with a key repeated within the file at 00:52)
+# and an overlapping file that starts later
+df_first = lcd_frame([('00:52', 'FM-15', 1), ('00:52', 'FM-15', 3), ('01:52', 'FM-15', 1),
+                      ('01:52', 'FM-16', 1), ('23:59', 'SOD  ', 1)])
+df_last = lcd_frame([('01:52', 'FM-15', 2), ('01:52', 'FM-12', 2), ('02:52', 'FM-15', 2),
+                     ('23:59', 'SOD  ', 2)])
+
+
+@pytest.fixture
+def files(tmp_path):
+    """Returns list of two file paths (first, last) with the first file
+    modified most recently"""
+    files = [tmp_path / 'first.csv', tmp_path / 'last.csv']
+    for file_, mtime_ in zip(files, [2_000_000_000, 1_000_000_000]):
+        file_.write_text('DATE\n')
+        os.utime(file_, (mtime_, mtime_))
+    return files
+
+
+def merged_records(files, precedence):
+    """Returns list of (time, REPORT_TYPE, value) of the merged records"""
+    df = merge_sorted_frames([df_first, df_last], file_ranks(files, precedence), precedence)
+    return [(t_.strftime('%H:%M'), r_.strip(), v_) for t_, r_, v_ in
+            zip(df.index, df['REPORT_TYPE'], df['HourlyDryBulbTemperature'])]
+
+
+@pytest.mark.parametrize('precedence, expected', [
+    # the most recently modified file ('first.csv') wins the shared keys
+    ('newest', [('00:52', 'FM-15', 1), ('00:52', 'FM-15', 3), ('01:52', 'FM-15', 1),
+                ('01:52', 'FM-16', 1), ('01:52', 'FM-12', 2), ('02:52', 'FM-15', 2),
+                ('23:59', 'SOD', 1)]),
+    ('first', [('00:52', 'FM-15', 1), ('00:52', 'FM-15', 3), ('01:52', 'FM-15', 1),
+               ('01:52', 'FM-16', 1), ('01:52', 'FM-12', 2), ('02:52', 'FM-15', 2),
+               ('23:59', 'SOD', 1)]),
+    ('last', [('00:52', 'FM-15', 1), ('00:52', 'FM-15', 3), ('01:52', 'FM-16', 1),
+              ('01:52', 'FM-15', 2), ('01:52', 'FM-12', 2), ('02:52', 'FM-15', 2),
+              ('23:59', 'SOD', 2)]),
+    # as 'newest', and only the preferred report type where types share a timestamp
+    ('report_type', [('00:52', 'FM-15', 1), ('00:52', 'FM-15', 3), ('01:52', 'FM-15', 1),
+                     ('02:52', 'FM-15', 2), ('23:59', 'SOD', 1)])])
+def test_precedence(files, precedence, expected):
+    """Each shared (DATE, REPORT_TYPE) key is taken from the file that wins
+    'precedence', keys repeated within that file keep every record (to be
+    averaged) and keys found in one file are always kept"""
+    assert merged_records(files, precedence) == expected
+
+
+def test_newest_follows_modified_time(files):
+    """'newest' takes shared keys from the other file once it is modified"""
+    os.utime(files[1], (3_000_000_000, 3_000_000_000))
+    assert merged_records(files, 'newest') == merged_records(files, 'last')
+
+
+def test_unknown_precedence(files):
+    with pytest.raises(ValueError):
+        file_ranks(files, 'oldest')
+
+
+def synthetic_file(start, n_hours, seed):
+    """Returns sorted DataFrame of 'n_hours' hours of FM-15 and FM-16 records
+    starting at 'start', with some repeated keys"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, periods=n_hours, freq='H') + pd.Timedelta(minutes=52)
+    records = pd.DataFrame({'DATE' : times.repeat(2),
+                            'REPORT_TYPE' : ['FM-15', 'FM-16'] * n_hours})
+    records = pd.concat([records, records.sample(n_hours // 10, random_state=seed)])
+    records['HourlyDryBulbTemperature'] = rng.normal(size=len(records)).round(1)
+    return records.sort_values('DATE', kind='stable').set_index('DATE')
+
+
+def iter_chunks(df, n_timestamps):
+    """Yields chunks of df of 'n_timestamps' timestamps (every timestamp
+    complete within a chunk, as iter_lcd_file_chunks())"""
+    ns = np.unique(df.index)
+    for i_ in range(0, len(ns), n_timestamps):
+        yield df.loc[ns[i_]:ns[min(i_ + n_timestamps, len(ns)) - 1]]
+
+
+@pytest.mark.parametrize('precedence', ['newest', 'first', 'last', 'report_type'])
+def test_merge_sorted_chunks_matches_frames(precedence):
+    """Merging chunk by chunk gives the same records as merging whole files,
+    for three files where the second overlaps both others"""
+    dfs = [synthetic_file('2020-01-01', 300, 1), synthetic_file('2020-01-10', 300, 2),
+           synthetic_file('2020-01-20', 100, 3)]
+    ranks = [1, 2, 0]
+    df_expected = merge_sorted_frames(dfs, ranks, precedence)
+    for n_timestamps in [3, 50, 1000]:
+        df = pd.concat(merge_sorted_chunks([iter_chunks(df_, n_timestamps) for df_ in dfs],
+                                           ranks, precedence))
+        pd.testing.assert_frame_equal(df, df_expected)
@@ -0,0 +1,61 @@
+# test_parsing.py
+# noaa_weather_hourly
+# Vectorized parsing of LCD measurement values with qualifier suffixes and
+# trace amounts (parse_lcd_values()).
+import numpy as np
+import pandas as pd
+import pytest
+from noaa_weather_hourly.config import lcd_value_flags
+from noaa_weather_hourly.parsing import parse_lcd_values
+
+
+@pytest.mark.parametrize('raw, value, flag', [
+    ('29.92', 29.92, 0),
+    ('.5', 0.5, 0),
+    ('-5', -5.0, 0),
+    (' 10 ', 10.0, 0),
+    ('29.92s', 29.92, lcd_value_flags['s']),
+    ('0.06s', 0.06, lcd_value_flags['s']),
+    ('10V', 10.0, lcd_value_flags['V']),
+    ('1.50V', 1.5, lcd_value_flags['V']),
+    ('29.92*', 29.92, lcd_value_flags['*']),
+    ('T', 0.0, lcd_value_flags['T']),
+    ('M', np.nan, lcd_value_flags['unparsed']),
+    ('VRB', np.nan, lcd_value_flags['unparsed']),
+    ('s', np.nan, lcd_value_flags['unparsed']),
+    ('10Vs', np.nan, lcd_value_flags['unparsed']),
+    (None, np.nan, 0)])
+def test_parse_lcd_value(raw, value, flag):
+    """Each raw value is parsed to its number (or NaN) and qualifier flag"""
+    df = pd.DataFrame({'HourlyVisibility' : pd.Series([raw, '1'], dtype=object)})
+    df_values, df_flags = parse_lcd_values(df, ['HourlyVisibility'], return_flags=True)
+    np.testing.assert_array_equal(df_values['HourlyVisibility'].to_numpy(), [value, 1.0])
+    assert list(df_flags['HourlyVisibility']) == [flag, 0]
+
+
+def test_trace_value():
+    """Trace precipitation 'T' is 'trace_value'"""
+    df = pd.DataFrame({'HourlyPrecipitation' : ['T', '0.01', 'T']})
+    df_values = parse_lcd_values(df, ['HourlyPrecipitation'], trace_value=0.001)
+    assert list(df_values['HourlyPrecipitation']) == [0.001, 0.01, 0.001]
+
+
+@pytest.mark.parametrize('dtype', [float, np.float32])
+def test_parse_columns(dtype):
+    """Text and numeric columns are parsed in one pass to 'dtype', other
+    columns and the column order are unchanged"""
+    df = pd.DataFrame({'STATION' : ['A', 'A', 'A'],
+                       'HourlyAltimeterSetting' : ['29.92s', '29.90', 'M'],
+                       'HourlyDryBulbTemperature' : [50.0, np.nan, 48.0],
+                       'HourlyWindDirection' : ['VRB', '350', '010']},
+                      index=pd.Index([1, 2, 3], name='DATE'))
+    cols = ['HourlyAltimeterSetting', 'HourlyDryBulbTemperature', 'HourlyWindDirection']
+    df_values = parse_lcd_values(df, cols, dtype=dtype)
+    assert list(df_values.columns) == list(df.columns)
+    assert list(df_values['STATION']) == ['A', 'A', 'A']
+    assert (df_values[cols].dtypes == dtype).all()
+    df_expected = pd.DataFrame({'HourlyAltimeterSetting' : [29.92, 29.90, np.nan],
+                                'HourlyDryBulbTemperature' : [50.0, np.nan, 48.0],
+                                'HourlyWindDirection' : [np.nan, 350.0, 10.0]},
+                               index=df.index).astype(dtype)
+    pd.testing.assert_frame_equal(df_values[cols], df_expected)
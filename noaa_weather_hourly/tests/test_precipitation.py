@@ -0,0 +1,55 @@
+# test_precipitation.py
+# noaa_weather_hourly
+# Hourly precipitation totals compared with the daily totals NOAA publishes in
+# the 'SOD' (summary of day) records of the bundled LCD sample files.  Special
+# reports (FM-16) hold the amount since the previous routine report (FM-15),
+# which the routine report includes, so they must not be added to it.
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly.pipeline import process_lcd
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+
+
+def sod_daily_precipitation(file):
+    """Returns Series of the 'DailyPrecipitation' of the 'SOD' records of LCD
+    'file' by date, with trace 'T' as 0"""
+    df = pd.read_csv(file, usecols=['DATE', 'REPORT_TYPE', 'DailyPrecipitation'],
+                     parse_dates=['DATE'], low_memory=False)
+    df = df.loc[df['REPORT_TYPE'].str.strip() == 'SOD']
+    values_ = pd.to_numeric(df['DailyPrecipitation'].astype(str).str.rstrip('s')
+                            .replace('T', '0'), errors='coerce')
+    return pd.Series(values_.to_numpy(), index=df['DATE'].dt.normalize().to_numpy())
+
+
+def hourly_daily_precipitation(file, **kwargs):
+    """Returns Series of the daily sums of the hourly 'Precipitation' output"""
+    df_out, report = process_lcd([file], **kwargs)
+    return df_out['Precipitation'].groupby(df_out.index.normalize()).sum()
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'chunksize' : 300}, {'compact' : True}])
+def test_v1_hourly_precipitation_matches_sod(kwargs):
+    """Every day of the v1 sample totals the same as its SOD record (inches)"""
+    sod = sod_daily_precipitation(dir_data / '3876540.csv')
+    hourly = hourly_daily_precipitation(dir_data / '3876540.csv', **kwargs)
+    days_ = sod.index.intersection(hourly.index)
+    assert len(days_) > 40
+    pd.testing.assert_series_equal(hourly[days_], sod[days_], check_names=False,
+                                   check_index_type=False, atol=0.005)
+    # 2020-01-11 has FM-16 values that the next FM-15 includes
+    assert hourly['2020-01-11'] == pytest.approx(1.28)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'chunksize' : 300}])
+def test_v2_hourly_precipitation_not_double_counted(kwargs):
+    """No day of the v2 sample totals more than its SOD record (mm) plus the
+    rounding of the hourly reports.  Some SOD totals include precipitation
+    without hourly reports, so days can total less."""
+    sod = sod_daily_precipitation(dir_data / 'LCD_USW00014939_2020.csv')
+    hourly = hourly_daily_precipitation(dir_data / 'LCD_USW00014939_2020.csv', **kwargs)
+    days_ = sod.index.intersection(hourly.index)
+    assert len(days_) > 40
+    assert (hourly[days_] <= sod[days_] + 0.3).all()
+    assert hourly.sum() <= sod.sum()
@@ -0,0 +1,126 @@
+# test_serve.py
+# noaa_weather_hourly
+# Local HTTP query service (-serve, see serve.py) on a directory with the
+# bundled LCD v1 sample file.
+import datetime
+import json
+import os
+import pathlib
+import shutil
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from noaa_weather_hourly import serve
+from noaa_weather_hourly.formats import csv_text
+from noaa_weather_hourly.pipeline import process_lcd
+
+file_v1 = pathlib.Path(__file__).parents[1] / 'data' / '3876540.csv'
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Yields query service of a directory with the v1 sample on a free port"""
+    shutil.copy(file_v1, tmp_path)
+    server = serve.make_server(tmp_path, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    """Returns tuple (body bytes, headers) of GET 'path' from 'server'"""
+    host, port = server.server_address[:2]
+    with urllib.request.urlopen(f'http://{host}:{port}{path}') as response:
+        return response.read(), response.headers
+
+
+def test_stations(server):
+    """/stations lists the station key and its LCD file"""
+    body, headers = get(server, '/stations')
+    assert json.loads(body) == {'3876540' : ['3876540.csv']}
+
+
+def test_station_query_and_cache(server):
+    """/station/KEY returns the same CSV as process_lcd() with the same
+    arguments, processes the station once and again after its file changes"""
+    body, headers = get(server, '/station/3876540?start=2020-01-05&end=2020-01-06&freq=H')
+    df_out, report = process_lcd([file_v1], start=datetime.date(2020, 1, 5),
+                                 end=datetime.date(2020, 1, 6))
+    assert headers['X-Cache'] == 'miss'
+    assert body == csv_text(df_out).encode()
+    # other dates and frequencies are computed from the cached hourly base
+    body, headers = get(server, '/station/3876540?start=2020-01-01&end=2020-01-31&freq=D')
+    assert headers['X-Cache'] == 'hit'
+    assert len(body.decode().splitlines()) == 32
+    assert server.frame_cache['misses'] == 1
+    # a modified file is processed again
+    file_served = server.dir_source / '3876540.csv'
+    stat_ = file_served.stat()
+    os.utime(file_served, ns=(stat_.st_atime_ns, stat_.st_mtime_ns + 10**9))
+    body, headers = get(server, '/station/3876540?freq=H')
+    assert headers['X-Cache'] == 'miss'
+    assert server.frame_cache['misses'] == 2
+    assert len(server.frame_cache['entries']) == 1
+
+
+def test_processing_error_is_500(server, monkeypatch):
+    """A station that fails to process returns status 500 and the service
+    keeps serving requests"""
+    def hourly_base(files, max_records_to_interpolate, **ingest_kwargs):
+        raise KeyError('DATE')
+    monkeypatch.setattr(serve, 'hourly_base', hourly_base)
+    with pytest.raises(urllib.error.HTTPError) as e:
+        get(server, '/station/3876540')
+    assert e.value.code == 500
+    assert server.frame_cache['pending'] == {}
+    body, headers = get(server, '/stations')
+    assert json.loads(body) == {'3876540' : ['3876540.csv']}
+
+
+def test_frame_bytes_counts_arrays(server):
+    """The cached size includes the sunrise / sunset arrays of the ingest"""
+    get(server, '/station/3876540')
+    signature, ingest, n_bytes = server.frame_cache['entries']['3876540']
+    n_bytes_arrays = sum(dates_.nbytes + values_.nbytes for dates_, values_ in
+                         ingest['col_date_values'].values())
+    assert n_bytes_arrays > 0
+    assert n_bytes == server.frame_cache['bytes'] >= \
+        serve.frame_bytes(ingest['df_out']) + n_bytes_arrays
+
+
+def test_station_processed_once_outside_lock(monkeypatch):
+    """Concurrent requests of a station process it once, and other stations
+    are served while it is processed"""
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def hourly_base(files, max_records_to_interpolate, **ingest_kwargs):
+        calls.append(files[0])
+        if files[0] == 'slow':
+            started.set()
+            release.wait(10)
+            calls.append('slow finished')
+        return {'df_out' : None, 'files' : files}
+    monkeypatch.setattr(serve, 'hourly_base', hourly_base)
+    monkeypatch.setattr(serve, 'files_signature', lambda files: tuple(files))
+    frame_cache = serve.new_frame_cache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+                   serve.cached_hourly_base(frame_cache, 'slow', ['slow'], {})))
+               for _ in range(3)]
+    for thread_ in threads:
+        thread_.start()
+    # the cache lock is not held while 'slow' is processed
+    assert started.wait(10)
+    ingest, hit = serve.cached_hourly_base(frame_cache, 'fast', ['fast'], {})
+    assert not hit
+    assert 'slow finished' not in calls
+    release.set()
+    for thread_ in threads:
+        thread_.join(10)
+    assert calls.count('slow') == 1
+    assert sorted(hit_ for ingest_, hit_ in results) == [False, True, True]
+    assert frame_cache['pending'] == {}
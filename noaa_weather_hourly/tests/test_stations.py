@@ -0,0 +1,26 @@
+# test_stations.py
+# noaa_weather_hourly
+# Station details lookup from the packaged station index (stations.py).
+import warnings
+from noaa_weather_hourly import stations
+
+
+def test_load_station_index_without_deprecation():
+    """The index is read from the package data without the deprecated
+    importlib.resources.read_text() / open_text()"""
+    stations.load_station_index.cache_clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        station_index = stations.load_station_index()
+    assert station_index['columns'][0] == 'WBAN'
+    assert len(station_index['records']) > 0
+
+
+def test_station_details_lookup():
+    """Stations are found by the WBAN of the LCD v1 station id or the LCD v2
+    station id, and unknown stations have 'Unknown' values"""
+    assert stations.station_details_lookup('72219013874')['STATION NAME'] == \
+        'HARTSFIELD-JACKSON ATLANTA IN'
+    assert stations.station_details_lookup('USW00014939')['STATION NAME'] == \
+        'LINCOLN MUNICIPAL AIRPORT'
+    assert stations.station_details_lookup('99999900000')['STATION NAME'] == 'Unknown'
@@ -0,0 +1,79 @@
+# test_stats.py
+# noaa_weather_hourly
+# Single pass column statistics (stats.py) compared with the DataFrame
+# describe() and isnull() table they replace, for whole frames and chunks.
+import pathlib
+import numpy as np
+import pandas as pd
+import pytest
+from noaa_weather_hourly.stats import new_column_stats, update_column_stats, \
+    frame_column_stats, column_stats_frame, column_pct_null
+from noaa_weather_hourly.pipeline import read_lcd_file, split_precipitation
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+cols_sample = ['HourlyDryBulbTemperature', 'HourlyPrecipitation', 'HourlyWindDirection',
+               'HourlyWindGustSpeed', 'HourlyVisibility', 'HourlyStationPressure']
+
+
+def sample_frame(file):
+    """Returns DataFrame of the numeric source values of 'cols_sample' of an
+    LCD sample file"""
+    df = read_lcd_file(dir_data / file, ['DATE', 'REPORT_TYPE'] + cols_sample)
+    return split_precipitation(df).drop(columns=['REPORT_TYPE'])
+
+
+def random_frame(n_records, seed=0):
+    """Returns DataFrame of random values with nulls, a constant column, a
+    column without values and a column of whole numbers"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(50, 20, size=(n_records, 3))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    return pd.DataFrame({'a' : values[:, 0], 'b' : values[:, 1], 'c' : values[:, 2],
+                         'constant' : 7.0, 'empty' : np.nan,
+                         'whole' : rng.integers(0, 360, n_records).astype(float)})
+
+
+def describe_table(df):
+    """Returns the count, mean, min and max rows of DataFrame.describe()"""
+    return df.describe().loc[['count', 'mean', 'min', 'max']]
+
+
+@pytest.mark.parametrize('df', [random_frame(1000), random_frame(1),
+                                sample_frame('3876540.csv'),
+                                sample_frame('LCD_USW00014939_2020.csv')],
+                         ids=['random', 'one record', 'v1', 'v2'])
+def test_frame_stats_match_describe(df):
+    """Count, mean, minimum and maximum are those of describe() and the
+    fraction of null values that of isnull()"""
+    column_stats = frame_column_stats(df)
+    pd.testing.assert_frame_equal(column_stats_frame(column_stats), describe_table(df),
+                                  check_exact=False, rtol=1e-12)
+    pd.testing.assert_series_equal(column_pct_null(column_stats),
+                                   df.isnull().mean().round(4))
+    assert column_stats['n_records'] == len(df)
+
+
+@pytest.mark.parametrize('df', [random_frame(1000), sample_frame('3876540.csv')],
+                         ids=['random', 'v1'])
+@pytest.mark.parametrize('chunksize', [1, 7, 250, 5000])
+def test_chunked_stats_match_frame(df, chunksize):
+    """Statistics updated chunk by chunk are those of the whole frame, also
+    with chunks where a column has no values"""
+    column_stats = new_column_stats(df.columns)
+    for i_ in range(0, len(df), chunksize):
+        update_column_stats(column_stats, df.iloc[i_ : i_ + chunksize])
+    column_stats_whole = frame_column_stats(df)
+    for key_ in ['n_records', 'count', 'min', 'max']:
+        np.testing.assert_array_equal(column_stats[key_], column_stats_whole[key_])
+    np.testing.assert_allclose(column_stats['sum'], column_stats_whole['sum'], rtol=1e-12)
+    pd.testing.assert_frame_equal(column_stats_frame(column_stats),
+                                  column_stats_frame(column_stats_whole),
+                                  check_exact=False, rtol=1e-12)
+
+
+def test_missing_columns_are_null():
+    """Columns of the accumulator that a chunk does not have count as null"""
+    df = random_frame(10)
+    column_stats = update_column_stats(new_column_stats(['a', 'missing']), df)
+    assert list(column_stats['count']) == [df['a'].count(), 0]
+    assert list(column_pct_null(column_stats)) == [df['a'].isnull().mean().round(4), 1.0]
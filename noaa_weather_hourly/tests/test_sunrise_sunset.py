@@ -0,0 +1,75 @@
+# test_sunrise_sunset.py
+# noaa_weather_hourly
+# HHMM time conversion (utils.py) and the 'Sunrise' / 'Sunset' output columns.
+# Expected values are those of the original (pre-vectorized) implementation on
+# the bundled LCD sample files.
+import pathlib
+import numpy as np
+import pandas as pd
+import pytest
+from noaa_weather_hourly.pipeline import process_lcd
+from noaa_weather_hourly.utils import datetime_from_HHMM, ns_from_HHMM
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+
+
+def test_ns_from_HHMM():
+    """HHMM integers are times of day on the date of the timestamps, 3 digit
+    values have a single digit hour and 2400 is midnight of the next day"""
+    ns = pd.to_datetime(['2020-01-01 00:53', '2020-01-02 23:59', '2020-01-03 12:00',
+                         '2020-01-04 06:00', '2020-01-05 23:59']).asi8
+    hhmm = np.array([751, 1653, 1200, 5, 2400], dtype=np.int64)
+    expected = pd.to_datetime(['2020-01-01 07:51', '2020-01-02 16:53', '2020-01-03 12:00',
+                               '2020-01-04 00:05', '2020-01-06 00:00']).asi8
+    np.testing.assert_array_equal(ns_from_HHMM(ns, hhmm), expected)
+
+
+@pytest.mark.parametrize('values', [[751.0, 1653.0, 1200.0, 745.0],
+                                    ['0751', '1653', '1200', '745']])
+def test_datetime_from_HHMM_matches_original(values):
+    """Numeric and text HHMM values (with or without a leading zero) give
+    the timestamps of the original implementation"""
+    x = pd.Series(values, index=pd.to_datetime(['2020-01-01', '2020-01-02',
+                                                '2020-01-03', '2020-01-04']))
+    expected = pd.Series(pd.to_datetime(['2020-01-01 07:51', '2020-01-02 16:53',
+                                         '2020-01-03 12:00', '2020-01-04 07:45']),
+                         index=x.index)
+    pd.testing.assert_series_equal(datetime_from_HHMM(x), expected)
+
+
+def test_datetime_from_HHMM_blank_and_2400():
+    """Blank and non-numeric values are NaT (the original required them to be
+    dropped first) and '2400' is midnight of the next day (the original
+    raised ValueError)"""
+    x = pd.Series(['', np.nan, 'M', '2400', '0642'],
+                  index=pd.to_datetime(['2020-01-01 23:59', '2020-01-02 23:59',
+                                        '2020-01-03 23:59', '2020-01-04 23:59',
+                                        '2020-01-05 23:59']))
+    result = datetime_from_HHMM(x)
+    assert result.iloc[:3].isna().all()
+    assert result.iloc[3] == pd.Timestamp('2020-01-05 00:00')
+    assert result.iloc[4] == pd.Timestamp('2020-01-05 06:42')
+
+
+@pytest.mark.parametrize('file, expected', [
+    ('3876540.csv', {'2020-01-01 00:00' : ('2020-01-01 07:42', '2020-01-01 17:41'),
+                     '2020-01-02 00:00' : ('2020-01-02 07:43', '2020-01-02 17:41'),
+                     '2020-01-11 00:00' : ('2020-01-11 07:43', '2020-01-11 17:49'),
+                     '2020-01-11 23:00' : ('2020-01-11 07:43', '2020-01-11 17:49'),
+                     # last date has no sunrise / sunset, previous day's carried forward
+                     '2020-02-22 00:00' : ('2020-02-21 07:16', '2020-02-21 18:27')}),
+    ('LCD_USW00014939_2020.csv', {'2023-01-01 00:00' : ('2023-01-01 07:51', '2023-01-01 17:09'),
+                                  '2023-01-02 00:00' : ('2023-01-02 07:52', '2023-01-02 17:10'),
+                                  '2023-01-11 00:00' : ('2023-01-11 07:51', '2023-01-11 17:18'),
+                                  '2023-01-11 12:00' : ('2023-01-11 07:51', '2023-01-11 17:18'),
+                                  '2023-02-26 00:00' : ('2023-02-26 07:08', '2023-02-26 18:13')})])
+@pytest.mark.parametrize('kwargs', [{}, {'chunksize' : 300}])
+def test_sunrise_sunset_output(file, expected, kwargs):
+    """'Sunrise' / 'Sunset' of the output match the original on the samples"""
+    df_out, report = process_lcd([dir_data / file], **kwargs)
+    assert df_out[['Sunrise', 'Sunset']].notna().all().all()
+    for time_, (sunrise_, sunset_) in expected.items():
+        assert df_out.loc[time_, 'Sunrise'] == pd.Timestamp(sunrise_)
+        assert df_out.loc[time_, 'Sunset'] == pd.Timestamp(sunset_)
+    # one value per date, the same for every hour of the date
+    assert (df_out['Sunrise'].groupby(df_out.index.normalize()).nunique() == 1).all()
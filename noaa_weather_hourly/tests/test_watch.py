@@ -0,0 +1,138 @@
+# test_watch.py
+# noaa_weather_hourly
+# Watch mode (-watch, see watch.py):  files are used once they have settled
+# and stations are processed again after a worker process ends abruptly.
+# The scans run on a controlled clock, so the tests do not wait for
+# 'interval' or 'settle_seconds'.
+import concurrent.futures
+import os
+import pathlib
+from noaa_weather_hourly import watch
+from noaa_weather_hourly.batch import new_summary
+from noaa_weather_hourly.watch import settled_files, watch_directory
+
+time_start = 1_000_000_000
+
+
+class Clock:
+    """Clock of watch.py:  sleep() advances time() and then runs the actions
+    of that scan (the number of sleep() calls so far)"""
+    def __init__(self, actions):
+        self.now = float(time_start)
+        self.n_scans = 0
+        self.actions = actions
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.n_scans += 1
+        for action_ in self.actions.get(self.n_scans, []):
+            action_(self)
+
+
+def write_file(file, text):
+    """Returns action writing 'text' to 'file', modified at the time of the clock"""
+    def action(clock):
+        file.write_text(text)
+        os.utime(file, (clock.now, clock.now))
+    return action
+
+
+def touch_file(file):
+    """Returns action setting the modified time of 'file' to the clock"""
+    def action(clock):
+        os.utime(file, (clock.now, clock.now))
+    return action
+
+
+def fake_process_station(files, dir_out, process_kwargs, file_format=None,
+                         profile=False, gaps=False, freqstrs=None):
+    """Returns summary of process_station() without processing 'files', and
+    ends the worker process abruptly for station '2000002'"""
+    if any(pathlib.Path(f_).stem == '2000002' for f_ in files):
+        os._exit(1)
+    summary = new_summary(files)
+    summary.update({'file_out' : 'out.csv', 'records' : 1, 'seconds' : 0})
+    return summary
+
+
+def test_settled_files():
+    """Files are settled once unchanged since the previous scan and not
+    modified for 'settle_seconds'"""
+    ns = 10**9
+    signatures_previous = {'same' : (10, 100 * ns), 'grown' : (10, 100 * ns),
+                           'recent' : (10, 108 * ns)}
+    signatures = {'same' : (10, 100 * ns), 'grown' : (20, 100 * ns),
+                  'recent' : (10, 108 * ns), 'new' : (10, 100 * ns)}
+    assert settled_files(signatures, signatures_previous, 10, 110) == {'same'}
+    assert settled_files(signatures, signatures_previous, 10, 118) == {'same', 'recent'}
+    assert settled_files(signatures, signatures_previous, 0, 110) == {'same', 'recent'}
+
+
+def test_watch_debounce(tmp_path, monkeypatch, capsys):
+    """A station is processed once its file has not changed for
+    'settle_seconds', again only after the file is modified, and files in the
+    directory when watching starts are not processed"""
+    file_existing, file_new = tmp_path / '1000001.csv', tmp_path / '1000002.csv'
+    file_existing.write_text('DATE\n')
+    clock = Clock({1 : [write_file(file_new, 'DATE\n')],
+                   # still being written
+                   2 : [write_file(file_new, 'DATE\n2020-01-01T00:52:00\n')],
+                   7 : [touch_file(file_new)]})
+    times_submitted = []
+
+    def new_worker_pool(workers):
+        pool = concurrent.futures.ThreadPoolExecutor(1)
+        submit = pool.submit
+
+        def submit_at_time(fn, files, *args):
+            times_submitted.append((clock.now, [f_.name for f_ in files]))
+            return submit(fn, files, *args)
+        pool.submit = submit_at_time
+        return pool
+    monkeypatch.setattr(watch, 'time', clock)
+    monkeypatch.setattr(watch, 'process_station', fake_process_station)
+    monkeypatch.setattr(watch, 'new_worker_pool', new_worker_pool)
+    summaries = watch_directory(tmp_path, tmp_path, interval=1, settle_seconds=3,
+                                max_scans=12)
+    # written at 1 and 2, settled 3 seconds later;  modified at 7, settled at 10
+    assert times_submitted == [(time_start + 5, ['1000002.csv']),
+                               (time_start + 10, ['1000002.csv'])]
+    assert [s_['error'] for s_ in summaries] == [None, None]
+    assert capsys.readouterr().out.count('1000002  out.csv') == 2
+
+
+def test_watch_broken_pool(tmp_path, monkeypatch, capsys):
+    """A station whose worker process ends abruptly is reported as an error and
+    the following stations are processed on a new pool"""
+    file_crash, file_ok = tmp_path / '2000002.csv', tmp_path / '2000003.csv'
+    pools, futures = [], []
+
+    def new_worker_pool(workers):
+        pool = concurrent.futures.ProcessPoolExecutor(1)
+        submit = pool.submit
+        pool.submit = lambda *args: futures.append(submit(*args)) or futures[-1]
+        pools.append(pool)
+        return pool
+
+    def wait_for_crash(clock):
+        concurrent.futures.wait(futures, timeout=60)
+        assert all(f_.done() for f_ in futures)
+    clock = Clock({1 : [write_file(file_crash, 'DATE\n')],
+                   # submitted at 3 and collected at 5, once the worker has ended
+                   5 : [wait_for_crash],
+                   6 : [write_file(file_ok, 'DATE\n')]})
+    monkeypatch.setattr(watch, 'time', clock)
+    monkeypatch.setattr(watch, 'process_station', fake_process_station)
+    monkeypatch.setattr(watch, 'new_worker_pool', new_worker_pool)
+    summaries = watch_directory(tmp_path, tmp_path, interval=1, settle_seconds=2,
+                                max_scans=10)
+    assert [(s_['files'], s_['error'] is None) for s_ in summaries] == \
+        [('2000002.csv', False), ('2000003.csv', True)]
+    assert summaries[0]['error'].startswith('BrokenProcessPool')
+    assert len(pools) == 2
+    out = capsys.readouterr().out
+    assert '2000002  ERROR  BrokenProcessPool' in out
+    assert '2000003  out.csv' in out
@@ -0,0 +1,137 @@
+# test_window.py
+# noaa_weather_hourly
+# -start / -end date window:  byte offsets of the records of the window found
+# by binary search (find_date_offset(), plan_lcd_files()) and the output of a
+# window compared with the full output trimmed to the same dates.
+import datetime
+import pathlib
+import pandas as pd
+import pytest
+from noaa_weather_hourly import discovery
+from noaa_weather_hourly.discovery import find_date_offset, read_file_window, plan_lcd_files
+from noaa_weather_hourly.pipeline import process_lcd
+
+dir_data = pathlib.Path(__file__).parents[1] / 'data'
+
+
+def lcd_file(dir_out, newline='\n', drop_dates=()):
+    """Returns path of a copy of the v1 sample saved to 'dir_out' with line
+    endings 'newline' and without the records of the dates (YYYY-MM-DD) in
+    'drop_dates'"""
+    lines = (dir_data / '3876540.csv').read_text().splitlines()
+    lines = [l_ for l_ in lines if not any(f',{d_}T' in l_ for d_ in drop_dates)]
+    file = pathlib.Path(dir_out) / ('3876540.csv' if newline == '\n' else '3876540_crlf.csv')
+    file.write_bytes(newline.join(lines + ['']).encode())
+    return file
+
+
+def offset_by_scan(file, dt, side='left'):
+    """Returns the byte offset of find_date_offset() found by reading every line"""
+    with open(file, 'rb') as infile:
+        header = infile.readline()
+        i_date = next(discovery.csv.reader([header.decode()])).index('DATE')
+        while True:
+            position = infile.tell()
+            line = infile.readline()
+            if not line:
+                return position
+            dt_ = discovery.read_line_date(line, i_date)
+            if dt_ is not None and (dt_ >= dt if side == 'left' else dt_ > dt):
+                return position
+
+
+@pytest.fixture(params=['\n', '\r\n'], ids=['LF', 'CRLF'])
+def file_gap(request, tmp_path):
+    """Returns v1 sample file without the records of 2020-01-10 to 2020-01-12"""
+    return lcd_file(tmp_path, request.param, ['2020-01-10', '2020-01-11', '2020-01-12'])
+
+
+@pytest.mark.parametrize('dt', ['2019-12-01 00:00', '2020-01-01 00:00', '2020-01-01 00:52',
+                                '2020-01-05 12:00', '2020-01-11 00:00', '2020-01-13 00:00',
+                                '2020-02-22 16:52', '2020-03-01 00:00'])
+@pytest.mark.parametrize('side', ['left', 'right'])
+@pytest.mark.parametrize('block_bytes', [256, 65536])
+def test_find_date_offset(file_gap, dt, side, block_bytes, monkeypatch):
+    """The binary search finds the offset of a line by line scan, for times
+    before the first record, after the last record, of a record and in a gap
+    in the records, with both short and long linear searches at the end"""
+    monkeypatch.setattr(discovery, 'tail_block_bytes', block_bytes)
+    dt = datetime.datetime.fromisoformat(dt)
+    assert find_date_offset(file_gap, dt, side) == offset_by_scan(file_gap, dt, side)
+
+
+def test_find_date_offset_limits(file_gap):
+    """Times before the first record are at the first record and after the
+    last record at the end of the file"""
+    header_bytes = len(open(file_gap, 'rb').readline())
+    assert find_date_offset(file_gap, datetime.datetime(2019, 1, 1)) == header_bytes
+    assert find_date_offset(file_gap, datetime.datetime(2021, 1, 1)) == file_gap.stat().st_size
+
+
+def test_read_file_window(file_gap):
+    """The window holds the header and whole records of the dates"""
+    offsets = (find_date_offset(file_gap, datetime.datetime(2020, 1, 5)),
+               find_date_offset(file_gap, datetime.datetime(2020, 1, 6, 23, 59, 59), 'right'))
+    df = pd.read_csv(read_file_window(file_gap, offsets), dtype=str)
+    df_full = pd.read_csv(file_gap, dtype=str)
+    df_expected = df_full.loc[(df_full['DATE'] >= '2020-01-05') &
+                              (df_full['DATE'] < '2020-01-07')].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, df_expected)
+
+
+@pytest.mark.parametrize('start, end, skip, offsets', [
+    # the whole file
+    ('2019-12-01', None, None, False),
+    ('2019-12-01', '2020-03-01', None, False),
+    # part of the file
+    ('2020-01-05', '2020-01-06', None, True),
+    ('2020-01-09', '2020-01-13', None, True),
+    # before the first or after the last record
+    ('2019-12-01', '2019-12-31', 'outside date range', False),
+    ('2020-03-01', None, 'outside date range', False),
+    # between records of the file
+    ('2020-01-10', '2020-01-12', 'outside date range', True)])
+def test_plan_lcd_files_window(file_gap, start, end, skip, offsets):
+    """Files are read in full, in part or skipped by the date window"""
+    window = [None if d_ is None else datetime.datetime.combine(
+                  datetime.date.fromisoformat(d_), time_)
+              for d_, time_ in [(start, datetime.time.min), (end, datetime.time.max)]]
+    entry = plan_lcd_files([file_gap], *window)[0]
+    assert entry['skip'] == skip
+    assert (entry['offsets'] is not None) == offsets
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'], ids=['LF', 'CRLF'])
+@pytest.mark.parametrize('start, end', [('2020-01-05', '2020-01-06'), ('2019-12-01', '2020-01-03'),
+                                        ('2020-02-20', None), (None, '2020-01-15'),
+                                        ('2020-01-09', '2020-01-14')])
+@pytest.mark.parametrize('kwargs', [{}, {'chunksize' : 300}])
+def test_window_output_matches_trimmed_full_output(tmp_path, newline, start, end, kwargs):
+    """The output of -start / -end is the full output limited to the same dates,
+    including for a window next to a gap in the records"""
+    file = lcd_file(tmp_path, newline, ['2020-01-12', '2020-01-13'])
+    df_full, report_full = process_lcd([file], **kwargs)
+    dates_ = {name_ : None if d_ is None else datetime.date.fromisoformat(d_)
+              for name_, d_ in [('start', start), ('end', end)]}
+    df_out, report = process_lcd([file], **dates_, **kwargs)
+    df_expected = df_full.loc[start : None if end is None else f'{end} 23:59']
+    pd.testing.assert_frame_equal(df_out, df_expected)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'chunksize' : 300}])
+def test_window_starting_in_gap(tmp_path, kwargs):
+    """A window starting in a gap in the records has the dates of the window
+    and the values of the full output, except the sunrise / sunset times of
+    the gap, which the full output carries from the records before the gap"""
+    file = lcd_file(tmp_path, '\n', ['2020-01-12', '2020-01-13'])
+    df_full, report_full = process_lcd([file], **kwargs)
+    df_out, report = process_lcd([file], start=datetime.date(2020, 1, 13),
+                                 end=datetime.date(2020, 1, 20), **kwargs)
+    df_expected = df_full.loc['2020-01-13' : '2020-01-20 23:59']
+    pd.testing.assert_index_equal(df_out.index, df_expected.index)
+    cols_sun = ['Sunrise', 'Sunset']
+    pd.testing.assert_frame_equal(df_out.drop(columns=cols_sun),
+                                  df_expected.drop(columns=cols_sun))
+    assert df_out.loc['2020-01-13', cols_sun].isna().all().all()
+    pd.testing.assert_frame_equal(df_out.loc['2020-01-14' :, cols_sun],
+                                  df_expected.loc['2020-01-14' :, cols_sun])
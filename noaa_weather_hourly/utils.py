@@ -3,7 +3,7 @@
 import pathlib
 import re
 import unicodedata
-import pandas as pd
+from .config import ns_minute, ns_hour, ns_day
 
 def say_hello():
     print('Hello from the Utils.py module')
@@ -51,20 +51,24 @@ def datetime_from_HHMM(x):
     must have a datetime index and is expected to hold time data in
     the '%H%M' format.  For example  '0751' or '751.0' is interpreted as
     07:51:00."""
-    
-    time = pd.to_datetime(pd.to_numeric(x.dropna().ffill()\
-                             .bfill()), format = '%H%M')
-    YMDHMS = pd.DataFrame({'Year': x.index.year,
-                         'Month' : x.index.month,
-                        'Day' : x.index.day,
-                        'Hour' : time.dt.hour,
-                         'Minute' : time.dt.minute,
-                          'Second' : time.dt.second})
+    # imported here so that file discovery does not import pandas (see discovery.py)
+    import numpy as np
+    import pandas as pd
+    values = pd.to_numeric(x, errors='coerce').to_numpy(dtype=float)
+    filter_valid = ~np.isnan(values)
+    ns = np.full(values.shape[0], np.datetime64('NaT').view('int64'))
+    ns[filter_valid] = ns_from_HHMM(x.index.asi8[filter_valid],
+                                    values[filter_valid].astype(np.int64))
+    return pd.Series(ns.view('datetime64[ns]'), index=x.index)
+
+
+def ns_from_HHMM(ns, hhmm):
+    """Returns int64 nanosecond timestamps of the HHMM integer time of day
+    'hhmm' (ie. 751 --> 07:51) on the date of the int64 nanosecond
+    timestamps 'ns'.  Integer arithmetic only, no string parsing."""
+    ns_date = ns - ns % ns_day
+    return ns_date + hhmm // 100 * ns_hour + hhmm % 100 * ns_minute
 
-    return pd.to_datetime(YMDHMS)
-    del time
-    del YMDHM
-    
 
 def slugify(value, allow_unicode=False):
     """
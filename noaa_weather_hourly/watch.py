@@ -0,0 +1,154 @@
+# watch.py
+# noaa_weather_hourly
+# Watch mode (-watch).  A long-running process scans a directory for new or
+# modified LCD files every 'watch_interval_seconds' and processes the station
+# of each (see group_station_files()) with process_station() on a pool of
+# worker processes, saving each output as soon as its station completes.
+# Worker processes are kept between scans, so pandas, numpy and the station
+# index are imported and loaded once per worker rather than once per file.
+# Files are found by comparing the size and modified time of every LCD file
+# with those of the previous scan, and a file is only used once they have
+# not changed for 'watch_settle_seconds' (a file that is still being written
+# or copied is not read part way).  A station is processed once all of its
+# files have settled and is not queued again while it is being processed.
+# LCD files that are already in the directory when watching starts are not
+# processed (see -batch).  A worker process that ends abruptly (ie. killed for
+# running out of memory) breaks the pool:  its stations are reported as errors
+# and a new pool is started for the following stations.
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import datetime
+import signal
+import time
+# import modules specific to this package
+from .config import *
+from .discovery import discover_lcd_files, group_station_files
+from .stations import load_station_index
+from .batch import process_station, new_summary
+
+
+def file_signatures(version_files):
+    """Returns dictionary of (size, modified time in ns) by file for every file
+    in 'version_files' (see discover_lcd_files()).  Files removed since the
+    directory was listed are left out."""
+    signatures = {}
+    for files_ in version_files.values():
+        for file_ in files_:
+            try:
+                stat_ = file_.stat()
+            except FileNotFoundError:
+                continue
+            signatures[file_] = (stat_.st_size, stat_.st_mtime_ns)
+    return signatures
+
+
+def settled_files(signatures, signatures_previous, settle_seconds, time_now):
+    """Returns set of the files of 'signatures' (see file_signatures()) that are
+    unchanged since 'signatures_previous' and were last modified at least
+    'settle_seconds' before 'time_now' (seconds since the epoch)"""
+    return {f_ for f_, signature_ in signatures.items()
+            if signatures_previous.get(f_) == signature_ and
+            time_now - signature_[1] / 10**9 >= settle_seconds}
+
+
+def warm_worker():
+    """Loads the station index in a new worker process of the watch pool, so
+    that the first station processed by the worker does not pay for it.
+    Ctrl+C is left to the watching process, which then waits for the stations
+    being processed to complete."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    load_station_index()
+
+
+def new_worker_pool(workers=None):
+    """Returns pool of 'workers' processes (default is the number of CPUs) that
+    the stations of watch_directory() are processed on"""
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                  initializer=warm_worker)
+
+
+def station_summary(future, files):
+    """Returns summary dictionary (see process_station()) of the completed
+    'future' of the station with LCD 'files'.  If the worker pool broke before
+    the station completed, the summary holds the error."""
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        summary = new_summary(files)
+        summary['error'] = f'{type(e).__name__}: {e}'
+        return summary
+
+
+def print_watch_summary(key, summary):
+    """Prints one line for station 'key' processed by process_station()"""
+    time_ = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if summary['error'] is not None:
+        print(f"{time_}  {key}  ERROR  {summary['error']}")
+    else:
+        print(f"{time_}  {key}  {summary['file_out']}  "
+              f"({summary['records']:,} records, {summary['seconds']} s)")
+
+
+def watch_directory(dir_source, dir_out, workers=None, file_format=output_format,
+                    profile=False, gaps=False, interval=watch_interval_seconds,
+                    settle_seconds=watch_settle_seconds, max_scans=None, freqstrs=None,
+                    **process_kwargs):
+    """Returns list of the summary dictionaries (see process_station()) of the
+    stations processed while watching directory 'dir_source' for new or
+    modified LCD files every 'interval' seconds.  Stations are processed on a
+    pool of 'workers' processes (default is the number of CPUs) and saved to
+    'dir_out' in 'file_format' as they complete, with -profile and -gaps
+    files if 'profile' and 'gaps'.  Files are used once unchanged for
+    'settle_seconds'.  Watches until interrupted (Ctrl+C) or for 'max_scans'
+    scans, then waits for the stations being processed.  If list 'freqstrs'
+    is provided, an output file is saved for each of its frequencies.
+    'process_kwargs' are passed on to process_lcd()."""
+    # files in the directory when watching starts are current
+    signatures_done = file_signatures(discover_lcd_files(dir_source))
+    signatures_previous = dict(signatures_done)
+    # future : (station key, files), of the stations being processed
+    futures = {}
+    summaries = []
+    n_scans = 0
+    executor = new_worker_pool(workers)
+    try:
+        while max_scans is None or n_scans < max_scans:
+            time.sleep(interval)
+            n_scans += 1
+            for future_ in [f_ for f_ in futures if f_.done()]:
+                key_, files_ = futures.pop(future_)
+                summaries.append(station_summary(future_, files_))
+                print_watch_summary(key_, summaries[-1])
+            version_files = discover_lcd_files(dir_source)
+            signatures = file_signatures(version_files)
+            files_settled = settled_files(signatures, signatures_previous,
+                                          settle_seconds, time.time())
+            signatures_previous = signatures
+            stations_running = {k_ for k_, f_ in futures.values()}
+            for key_, files_ in group_station_files(version_files).items():
+                files_ = [f_ for f_ in files_ if f_ in signatures]
+                if key_ in stations_running or len(files_) < 1 or \
+                        not all(f_ in files_settled for f_ in files_) or \
+                        all(signatures_done.get(f_) == signatures[f_] for f_ in files_):
+                    continue
+                signatures_done.update({f_ : signatures[f_] for f_ in files_})
+                args_ = (process_station, files_, dir_out, process_kwargs, file_format,
+                         profile, gaps, freqstrs)
+                try:
+                    future_ = executor.submit(*args_)
+                except BrokenProcessPool:
+                    # the stations of the broken pool are reported as they are
+                    # collected, the following stations use a new pool
+                    executor.shutdown(wait=False)
+                    executor = new_worker_pool(workers)
+                    future_ = executor.submit(*args_)
+                futures[future_] = (key_, files_)
+    except KeyboardInterrupt:
+        pass
+    try:
+        for future_ in concurrent.futures.as_completed(futures):
+            summaries.append(station_summary(future_, futures[future_][1]))
+            print_watch_summary(futures[future_][0], summaries[-1])
+    finally:
+        executor.shutdown()
+    return summaries